@@ -0,0 +1,130 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT_DIR, 'core'))
+from qdrant_collections import ensure_collection, build_search_params
+
+COLLECTION_PREFIX = "bench_quantization"
+UPSERT_BATCH_SIZE = 512
+
+
+def clustered_vectors(n, dimension, n_clusters, rng):
+    """Unit vectors around random centroids, a rough stand-in for embeddings of related job postings."""
+    centroids = rng.standard_normal((n_clusters, dimension)).astype(np.float32)
+    assignments = rng.integers(0, n_clusters, n)
+    vectors = centroids[assignments] + 0.6 * rng.standard_normal((n, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def estimated_vector_ram_mb(n, dimension, quantization, on_disk, hnsw_m):
+    """RAM for vectors + HNSW links: originals only count when not on disk, quantized copies are always_ram."""
+    original = 0 if on_disk else n * dimension * 4
+    quantized = {"none": 0, "scalar": n * dimension, "binary": n * dimension / 8}[quantization]
+    links = n * hnsw_m * 2 * 4
+    return (original + quantized + links) / (1024 * 1024)
+
+
+def load_collection(client, name, vectors, quantization, on_disk, hnsw_m, ef_construct):
+    ensure_collection(client, name, vectors.shape[1], recreate=True, quantization=quantization,
+                      on_disk=on_disk, hnsw_m=hnsw_m, hnsw_ef_construct=ef_construct)
+    start = time.perf_counter()
+    for i in range(0, len(vectors), UPSERT_BATCH_SIZE):
+        client.upsert(collection_name=name, wait=False, points=models.Batch(
+            ids=list(range(i, min(i + UPSERT_BATCH_SIZE, len(vectors)))),
+            vectors=vectors[i:i + UPSERT_BATCH_SIZE].tolist()
+        ))
+    # Wait for the optimizer to finish building the HNSW graph and quantized vectors
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(0.5)
+    return time.perf_counter() - start
+
+
+def run_queries(client, name, queries, top_k, search_params):
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        points = client.query_points(collection_name=name, query=query.tolist(), limit=top_k,
+                                     search_params=search_params, with_payload=False).points
+        latencies.append(time.perf_counter() - start)
+        results.append([point.id for point in points])
+    return np.array(latencies) * 1000, results
+
+
+def recall_at_k(results, ground_truth):
+    return float(np.mean([len(set(r) & set(g)) / len(g) for r, g in zip(results, ground_truth) if g]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency of quantized / on-disk Qdrant layouts against exact search.")
+    parser.add_argument('--url', default=os.getenv("QDRANT_URL") or "http://localhost:6333",
+                        help="Qdrant server (':memory:' only smoke-tests the code: local mode ignores quantization and HNSW).")
+    parser.add_argument('--api-key', default=os.getenv("QDRANT_API_KEY"))
+    parser.add_argument('--points', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--dimension', type=int, default=1536)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--quantization', default="none,scalar,binary")
+    parser.add_argument('--on-disk', action='store_true', help="Keep original vectors on disk (quantized copies stay in RAM).")
+    parser.add_argument('--hnsw-m', type=int, default=16)
+    parser.add_argument('--ef-construct', type=int, default=100)
+    parser.add_argument('--hnsw-ef', default="64,128,256", help="Search-time ef values to sweep.")
+    parser.add_argument('--oversampling', default="1,2,4", help="Rescoring oversampling factors to sweep for quantized layouts.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep', action='store_true', help="Keep the benchmark collections afterwards.")
+    args = parser.parse_args()
+
+    client = QdrantClient(location=":memory:") if args.url == ":memory:" else QdrantClient(url=args.url, api_key=args.api_key, timeout=300)
+    rng = np.random.default_rng(args.seed)
+    n_clusters = max(1, args.points // 200)
+    vectors = clustered_vectors(args.points, args.dimension, n_clusters, rng)
+    queries = clustered_vectors(args.queries, args.dimension, n_clusters, np.random.default_rng(args.seed))
+    modes = args.quantization.split(',')
+    ef_values = [int(ef) for ef in args.hnsw_ef.split(',')]
+    oversampling_values = [float(o) for o in args.oversampling.split(',')]
+
+    print(f"{args.points} vectors x {args.dimension} dims, {args.queries} queries, top-{args.top_k}, "
+          f"HNSW m={args.hnsw_m} ef_construct={args.ef_construct}, originals on disk: {args.on_disk}")
+    rows = []
+    ground_truth = None
+    try:
+        for mode in modes:
+            name = f"{COLLECTION_PREFIX}_{mode}"
+            load_s = load_collection(client, name, vectors, mode, args.on_disk, args.hnsw_m, args.ef_construct)
+            ram_mb = estimated_vector_ram_mb(args.points, args.dimension, mode, args.on_disk, args.hnsw_m)
+            print(f"\n[{mode}] loaded and indexed in {load_s:.1f}s, estimated vector RAM {ram_mb:,.0f} MB")
+            if ground_truth is None:
+                # Exact (brute-force) search over the original vectors is the reference for every layout;
+                # ignore=True keeps it from scoring quantized vectors when the first layout is quantized
+                exact_params = models.SearchParams(exact=True, quantization=models.QuantizationSearchParams(ignore=True))
+                exact_ms, ground_truth = run_queries(client, name, queries, args.top_k, exact_params)
+                rows.append(("exact", "-", "-", 1.0, np.percentile(exact_ms, 50), np.percentile(exact_ms, 95), ram_mb))
+            variants = [(ef, None, True) for ef in ef_values] if mode == "none" else \
+                [(ef, o, rescore) for ef in ef_values for o in oversampling_values for rescore in (True, False) if rescore or o == 1.0]
+            for ef, oversampling, rescore in variants:
+                if mode == "none":
+                    params = build_search_params("none", hnsw_ef=ef)
+                elif rescore:
+                    params = build_search_params(mode, hnsw_ef=ef, oversampling=oversampling)
+                else:
+                    params = models.SearchParams(hnsw_ef=ef, quantization=models.QuantizationSearchParams(rescore=False))
+                latencies, results = run_queries(client, name, queries, args.top_k, params)
+                label = mode if mode == "none" else f"{mode}{'+rescore' if rescore else ''}"
+                rows.append((label, ef, oversampling or "-", recall_at_k(results, ground_truth),
+                             np.percentile(latencies, 50), np.percentile(latencies, 95), ram_mb))
+    finally:
+        if not args.keep:
+            for mode in modes:
+                client.delete_collection(f"{COLLECTION_PREFIX}_{mode}")
+
+    print(f"\n{'layout':<18}{'hnsw_ef':>8}{'oversample':>11}{'recall@' + str(args.top_k):>11}{'p50 ms':>9}{'p95 ms':>9}{'RAM MB':>9}")
+    for label, ef, oversampling, recall, p50, p95, ram_mb in rows:
+        print(f"{label:<18}{ef:>8}{oversampling:>11}{recall:>11.3f}{p50:>9.2f}{p95:>9.2f}{ram_mb:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+from thefuzz import fuzz
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from utils.title_matcher import title_similarity, title_similarity_matrix, _title_score_cache
+
+CANDIDATE_CSV = os.path.join(ROOT_DIR, 'data/candidates/JuiceboxExport_1743820890826.csv')
+PARA_JOB_CSV = os.path.join(ROOT_DIR, 'data/jobs/Paraform_Jobs.csv')
+
+
+def load_titles(n_rows):
+    """Replicates the Juicebox export's titles up to n_rows."""
+    titles = pd.read_csv(CANDIDATE_CSV)['Current Title'].tolist()
+    reps = n_rows // len(titles) + 1
+    return (titles * reps)[:n_rows]
+
+
+def baseline_scores(titles, roles):
+    """Current score_candidate_fit behaviour: one thefuzz call per candidate/role pair."""
+    return [[fuzz.token_set_ratio(t.lower(), r.lower()) / 100.0 if isinstance(t, str) and t and r else 0.0
+             for r in roles] for t in titles]
+
+
+def memoized_scores(titles, roles):
+    _title_score_cache.clear()
+    return [[title_similarity(t, r) for r in roles] for t in titles]
+
+
+def bulk_scores(titles, roles):
+    _title_score_cache.clear()
+    return title_similarity_matrix(titles, roles)
+
+
+def run(n_rows, n_roles, skip_baseline):
+    titles = load_titles(n_rows)
+    roles = pd.read_csv(PARA_JOB_CSV)['Role'].tolist()[:n_roles]
+    print(f"Title similarity: {len(titles)} candidate titles x {len(roles)} job roles "
+          f"({len(set(titles))} distinct titles)")
+
+    timings = {}
+    results = {}
+    variants = [('memoized', memoized_scores), ('bulk matrix', bulk_scores)]
+    if not skip_baseline:
+        variants.insert(0, ('baseline thefuzz', baseline_scores))
+    for name, fn in variants:
+        start = time.perf_counter()
+        results[name] = fn(titles, roles)
+        timings[name] = time.perf_counter() - start
+        print(f"  {name:<16} {timings[name]:8.3f} s  ({len(titles) * len(roles) / timings[name]:,.0f} pairs/s)")
+
+    # Sanity check: every variant must produce the same 0-1 scores
+    reference = pd.DataFrame(results['memoized']).to_numpy()
+    for name, scores in results.items():
+        diff = abs(pd.DataFrame(scores).to_numpy() - reference).max()
+        print(f"  max |{name} - memoized| = {diff:.6f}")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark candidate title x job role similarity.")
+    parser.add_argument('--rows', type=int, default=100_000, help="Candidate rows after replicating the export.")
+    parser.add_argument('--roles', type=int, default=25, help="Number of job roles to score against.")
+    parser.add_argument('--skip-baseline', action='store_true', help="Skip the slow per-pair thefuzz baseline.")
+    args = parser.parse_args()
+    run(args.rows, args.roles, args.skip_baseline)
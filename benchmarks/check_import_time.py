@@ -0,0 +1,95 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORE_DIR = os.path.join(ROOT_DIR, 'core')
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fake_azure_openai import FakeAzureOpenAIServer
+from run_benchmarks import configure_environment
+
+DEFAULT_MODULES = "main_task_1,main_task_2"
+DEFAULT_BUDGET_MS = 2500.0
+# Dependencies that headless pipeline imports must not pull in: notebook display, NLTK (BM25 tokenizes without it)
+# and the reranking model runtime (loaded only when reranking is enabled)
+FORBIDDEN_MODULES = ("IPython", "tabulate", "nltk", "fastembed", "onnxruntime")
+
+# Runs in a fresh interpreter from core/, like the pipelines themselves
+PROBE = """
+import io, contextlib, json, sys, time
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    __import__({module!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {forbidden!r} if name in sys.modules]}}))
+"""
+
+
+def measure_import(module, env, runs):
+    """Median wall time of importing module in fresh interpreters, plus any forbidden modules it loaded."""
+    timings, loaded = [], set()
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, forbidden=FORBIDDEN_MODULES)],
+            cwd=CORE_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["seconds"] * 1000)
+        loaded.update(result["loaded"])
+    return statistics.median(timings), sorted(loaded)
+
+
+def slowest_imports(module, env, limit):
+    """Top-level imports of module by cumulative time, from python -X importtime."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=CORE_DIR, env=env, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and name.startswith("   ") and not name.startswith("     "):
+            rows.append((int(cumulative) / 1000, name.strip())) # Direct imports of the module only
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fails if importing the pipeline modules exceeds an import-time budget.")
+    parser.add_argument('--modules', default=DEFAULT_MODULES, help="Comma-separated modules in core/ to import.")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help="Maximum median import time per module.")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8, help="Show this many of the slowest direct imports.")
+    args = parser.parse_args()
+
+    # clients.py checks the Azure connection at import; the fake server keeps that off the measurement
+    server = FakeAzureOpenAIServer(embedding_latency=0, chat_latency=0)
+    server.start()
+    failures = []
+    try:
+        configure_environment(server.url)
+        env = dict(os.environ)
+        for module in args.modules.split(','):
+            median_ms, loaded = measure_import(module, env, args.runs)
+            status = "OK" if median_ms <= args.budget_ms else "OVER BUDGET"
+            print(f"{module}: {median_ms:.0f} ms median over {args.runs} runs (budget {args.budget_ms:.0f} ms) {status}")
+            for cumulative_ms, name in slowest_imports(module, env, args.top):
+                print(f"  {cumulative_ms:8.1f} ms  {name}")
+            if median_ms > args.budget_ms:
+                failures.append(f"{module} took {median_ms:.0f} ms")
+            if loaded:
+                failures.append(f"{module} imported forbidden modules {loaded}")
+    finally:
+        server.stop()
+
+    if failures:
+        print("FAILED: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
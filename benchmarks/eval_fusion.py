@@ -0,0 +1,205 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import math
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+CORE_DIR = os.path.join(ROOT_DIR, 'core')
+sys.path.append(BENCH_DIR)
+sys.path.insert(0, CORE_DIR)
+from fusion import RRF_K, DENSE_WEIGHT, SPARSE_WEIGHT, DENSE_DEPTH, SPARSE_DEPTH, content_key, fuse_ranked_lists
+
+RESUME_DIR = os.path.join(ROOT_DIR, 'data/resumes/')
+PARA_JOB_CSV = os.path.join(ROOT_DIR, 'data/jobs/Paraform_Jobs.csv')
+SRN_JOBS_DIR = os.path.join(ROOT_DIR, 'utils/scrape-pdf/output/')
+CAPTURE_DEPTH = 100 # Hits captured per leg; the sweep can only evaluate depths up to this
+
+
+def capture_runs(output_path, depth, fake_azure):
+    """Runs the dense and sparse legs once per resume and writes their raw hits to a JSONL run file.
+
+    This is the only step that calls Azure and Qdrant; every fusion setting is
+    then evaluated offline from the file. Jobs are identified by their content
+    key, so judgments carry over to the same text indexed under another job ID
+    (e.g. from another source or link, see data_loader.load_all_jobs).
+    """
+    server = None
+    if fake_azure:
+        from fake_azure_openai import FakeAzureOpenAIServer
+        from run_benchmarks import configure_environment
+        server = FakeAzureOpenAIServer(embedding_latency=0, chat_latency=0).start()
+        configure_environment(server.url)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            from data_loader import load_all_jobs, parse_pdf_resume
+            from vector_db import (QDRANT_COLLECTION_NAME, build_bm25_index, embed_text, index_jobs_to_qdrant,
+                                   perform_dense_search, perform_sparse_search)
+            jobs = load_all_jobs(PARA_JOB_CSV, SRN_JOBS_DIR)
+            index_jobs_to_qdrant(jobs, QDRANT_COLLECTION_NAME)
+            bm25 = build_bm25_index([job['text'] for job in jobs])
+        job_corpus_ids = [job['id'] for job in jobs]
+        jobs_by_id = {job['id']: job for job in jobs}
+        resume_files = sorted(f for f in os.listdir(RESUME_DIR) if f.lower().endswith('.pdf'))
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for resume_file in resume_files:
+                resume_text = parse_pdf_resume(os.path.join(RESUME_DIR, resume_file))
+                if not resume_text:
+                    continue
+                query_vector = embed_text(resume_text)
+                dense = perform_dense_search(resume_text, top_k=depth, query_vector=query_vector) if query_vector else []
+                sparse = perform_sparse_search(resume_text, bm25, job_corpus_ids, top_k=depth)
+                hits = {str(hit['id']) for hit in dense + sparse}
+                f.write(json.dumps({
+                    "query_id": resume_file,
+                    "legs": [[[str(hit['id']), float(hit['score'])] for hit in leg] for leg in (dense, sparse)],
+                    "jobs": {job_id: {"key": content_key(jobs_by_id[job_id]['payload'], job_id),
+                                      "role": jobs_by_id[job_id].get('role'), "company": jobs_by_id[job_id].get('company')}
+                             for job_id in hits if job_id in jobs_by_id},
+                }) + "\n")
+                print(f"Captured {len(dense)} dense / {len(sparse)} sparse hits for {resume_file}")
+    finally:
+        if server is not None:
+            server.stop()
+    print(f"Run file written to {output_path}")
+
+
+def load_runs(path):
+    with open(path, encoding='utf-8') as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    for run in runs:
+        run['legs'] = [[{"id": job_id, "score": score} for job_id, score in leg] for leg in run['legs']]
+        run['keys'] = {job_id: job['key'] for job_id, job in run['jobs'].items()}
+    return runs
+
+
+def load_qrels(path):
+    """{query_id: {content_key: grade}}; grades may also be given as {"grade": g, ...} (as in the template)."""
+    with open(path, encoding='utf-8') as f:
+        qrels = json.load(f)
+    return {query_id: {key: (value['grade'] if isinstance(value, dict) else value) for key, value in judged.items()}
+            for query_id, judged in qrels.items()}
+
+
+def ranked_keys(run, config, cutoff):
+    fused = fuse_ranked_lists(run['legs'], config['weights'], keys=run['keys'], method=config['method'],
+                              k=config['k'], depths=config['depths'], dedup=config['dedup'])
+    return [run['keys'].get(result['id'], result['id']) for result in fused[:cutoff]]
+
+
+def ndcg(ranking, judged, cutoff):
+    dcg = sum((2 ** judged.get(key, 0) - 1) / math.log2(position + 2) for position, key in enumerate(ranking[:cutoff]))
+    ideal = sorted(judged.values(), reverse=True)[:cutoff]
+    idcg = sum((2 ** grade - 1) / math.log2(position + 2) for position, grade in enumerate(ideal))
+    return dcg / idcg if idcg else 0.0
+
+
+def reciprocal_rank(ranking, judged):
+    return next((1.0 / position for position, key in enumerate(ranking, start=1) if judged.get(key, 0) > 0), 0.0)
+
+
+def recall(ranking, judged, cutoff):
+    relevant = {key for key, grade in judged.items() if grade > 0}
+    return len(relevant & set(ranking[:cutoff])) / len(relevant) if relevant else 0.0
+
+
+def config_grid(args):
+    """Every combination of the swept settings; k only varies for RRF."""
+    grid = []
+    for method, dense_weight, dense_depth, sparse_depth, dedup in itertools.product(
+            args.methods.split(','), [float(w) for w in args.dense_weights.split(',')],
+            [int(d) for d in args.dense_depths.split(',')], [int(d) for d in args.sparse_depths.split(',')],
+            [dedup == 'on' for dedup in args.dedup.split(',')]):
+        for k in ([float(k) for k in args.k.split(',')] if method == 'rrf' else [RRF_K]):
+            grid.append({"method": method, "k": k, "weights": (dense_weight, args.sparse_weight),
+                         "depths": (dense_depth, sparse_depth), "dedup": dedup})
+    return grid
+
+
+def describe(config):
+    k = f" k={config['k']:g}" if config['method'] == 'rrf' else ""
+    return (f"{config['method']}{k} w={config['weights'][0]:g}/{config['weights'][1]:g} "
+            f"depth={config['depths'][0]}/{config['depths'][1]} dedup={'on' if config['dedup'] else 'off'}")
+
+
+def evaluate(runs, grid, qrels, cutoff):
+    """Scores every config against the judgments, or (without qrels) by overlap with the current default config."""
+    default = {"method": "rrf", "k": RRF_K, "weights": (DENSE_WEIGHT, SPARSE_WEIGHT),
+               "depths": (DENSE_DEPTH, SPARSE_DEPTH), "dedup": True}
+    reference = {run['query_id']: ranked_keys(run, default, cutoff) for run in runs}
+    rows = []
+    for config in grid:
+        start = time.perf_counter()
+        rankings = {run['query_id']: ranked_keys(run, config, cutoff) for run in runs}
+        fuse_us = (time.perf_counter() - start) / max(len(runs), 1) * 1e6
+        row = {"config": describe(config), "fuse_us": fuse_us}
+        if qrels:
+            judged_runs = [query_id for query_id in rankings if qrels.get(query_id)]
+            for name, metric in (("ndcg", lambda r, j: ndcg(r, j, cutoff)), ("mrr", reciprocal_rank),
+                                 ("recall", lambda r, j: recall(r, j, cutoff))):
+                row[name] = sum(metric(rankings[q], qrels[q]) for q in judged_runs) / max(len(judged_runs), 1)
+        row["overlap"] = sum(len(set(rankings[q]) & set(reference[q])) / max(len(reference[q]), 1)
+                             for q in rankings) / max(len(rankings), 1)
+        rows.append(row)
+    rows.sort(key=lambda row: (-row.get("ndcg", row["overlap"]), row["config"]))
+    return rows
+
+
+def write_qrels_template(runs, grid, cutoff, path):
+    """Pools the top hits of every config per query into a judgment file to be graded by hand (0 = not relevant)."""
+    template = {}
+    for run in runs:
+        pooled = {key for config in grid for key in ranked_keys(run, config, cutoff)}
+        jobs_by_key = {job['key']: job for job in run['jobs'].values()}
+        template[run['query_id']] = {key: {"grade": 0, "role": jobs_by_key.get(key, {}).get('role'),
+                                           "company": jobs_by_key.get(key, {}).get('company')}
+                                     for key in sorted(pooled)}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(template, f, indent=2)
+    print(f"Judgment template with {sum(len(judged) for judged in template.values())} pooled jobs written to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline tuning of hybrid fusion settings from captured search legs.")
+    parser.add_argument('runs', help="JSONL run file (written with --capture, read otherwise).")
+    parser.add_argument('--capture', action='store_true', help="Search the indexed jobs with every resume in data/ and write the run file.")
+    parser.add_argument('--capture-depth', type=int, default=CAPTURE_DEPTH)
+    parser.add_argument('--fake-azure', action='store_true', help="Capture against the fake Azure server and in-process Qdrant (smoke test only).")
+    parser.add_argument('--qrels', default=None, help="Graded judgments {query_id: {content_key: grade}}; without them configs are compared to the default.")
+    parser.add_argument('--write-qrels-template', default=None, metavar='PATH', help="Pool the swept configs' top hits into a judgment file to grade.")
+    parser.add_argument('--cutoff', type=int, default=10, help="Evaluate the top N fused results.")
+    parser.add_argument('--methods', default="rrf,minmax,zscore")
+    parser.add_argument('--k', default="10,30,60,100", help="RRF constants to sweep.")
+    parser.add_argument('--dense-weights', default="0.5,1,2", help="Dense leg weights to sweep (relative to --sparse-weight).")
+    parser.add_argument('--sparse-weight', type=float, default=1.0)
+    parser.add_argument('--dense-depths', default="10,20,50")
+    parser.add_argument('--sparse-depths', default="10,20,50")
+    parser.add_argument('--dedup', default="on", help="Comma-separated on/off values to sweep.")
+    parser.add_argument('--top', type=int, default=15, help="Show this many of the best configs.")
+    args = parser.parse_args()
+
+    if args.capture:
+        capture_runs(args.runs, args.capture_depth, args.fake_azure)
+    runs = load_runs(args.runs)
+    grid = config_grid(args)
+    if args.write_qrels_template:
+        write_qrels_template(runs, grid, args.cutoff, args.write_qrels_template)
+        return
+    qrels = load_qrels(args.qrels) if args.qrels else None
+
+    rows = evaluate(runs, grid, qrels, args.cutoff)
+    print(f"{len(grid)} fusion configs over {len(runs)} queries, top {args.cutoff}"
+          + ("" if qrels else " (no --qrels: overlap with the default config only)"))
+    metrics = ["ndcg", "mrr", "recall", "overlap"] if qrels else ["overlap"]
+    print(f"  {'config':<52}" + "".join(f"{name:>9}" for name in metrics) + f"{'fuse us':>10}")
+    for row in rows[:args.top]:
+        print(f"  {row['config']:<52}" + "".join(f"{row[name]:9.3f}" for name in metrics) + f"{row['fuse_us']:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
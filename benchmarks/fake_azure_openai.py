@@ -0,0 +1,163 @@
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+EMBEDDING_DIMENSION = 1536
+FAKE_COMPLETION = "The candidate's experience with the listed technologies aligns with the core requirements of this role."
+FAKE_OUTREACH = "Hi, your background looks like a strong match for a role we are hiring for. Open to a quick chat?"
+
+
+def _token_count(text):
+    return max(1, len(text) // 4)
+
+
+def fake_embedding(text, dimension=EMBEDDING_DIMENSION):
+    """Deterministic hashed bag-of-words embedding, so similar texts get similar vectors."""
+    vector = np.zeros(dimension, dtype=np.float32)
+    for token in re.findall(r'\w+', text.lower()):
+        digest = hashlib.md5(token.encode('utf-8')).digest()
+        index = int.from_bytes(digest[:4], 'little') % dimension
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector
+
+
+class FakeAzureOpenAIServer:
+    """Local stand-in for the Azure OpenAI embedding and chat endpoints with configurable latency.
+
+    Serves the routes the AzureOpenAI client calls (…/embeddings, …/chat/completions,
+    …/models), so the pipelines run unmodified against it via AZURE_OPENAI_*_ENDPOINT.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, embedding_latency=0.05, chat_latency=0.5,
+                 jitter=0.2, error_rate=0.0, seed=0):
+        self.embedding_latency = embedding_latency
+        self.chat_latency = chat_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters = {"embedding_requests": 0, "embedded_texts": 0, "chat_requests": 0,
+                         "prompt_tokens": 0, "completion_tokens": 0, "errors": 0}
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-azure-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _sleep(self, base_latency):
+        with self._lock:
+            factor = 1.0 + self._random.uniform(-self.jitter, self.jitter)
+            fail = self._random.random() < self.error_rate
+        time.sleep(max(0.0, base_latency * factor))
+        return fail
+
+    def _count(self, **increments):
+        with self._lock:
+            for key, value in increments.items():
+                self.counters[key] += value
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True # Headers and body are separate writes; avoid ~40ms delayed-ACK stalls
+
+            def _send_json(self, status, body, headers=None):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.split('?')[0].endswith('/models'):
+                    self._send_json(200, {"object": "list", "data": []})
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def do_POST(self):
+                path = self.path.split('?')[0]
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                if path.endswith('/embeddings'):
+                    self._embeddings(request)
+                elif path.endswith('/chat/completions'):
+                    self._chat(request)
+                else:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def _rate_limited(self):
+                server._count(errors=1)
+                self._send_json(429, {"error": {"code": "429", "message": "Rate limit exceeded (fake)."}},
+                                headers={"Retry-After": "1"})
+
+            def _embeddings(self, request):
+                texts = request.get('input', [])
+                texts = [texts] if isinstance(texts, str) else texts
+                if server._sleep(server.embedding_latency):
+                    self._rate_limited()
+                    return
+                as_base64 = request.get('encoding_format') == 'base64'
+                data = []
+                for index, text in enumerate(texts):
+                    vector = fake_embedding(text, request.get('dimensions') or EMBEDDING_DIMENSION)
+                    embedding = base64.b64encode(vector.tobytes()).decode('ascii') if as_base64 else vector.tolist()
+                    data.append({"object": "embedding", "index": index, "embedding": embedding})
+                tokens = sum(_token_count(text) for text in texts)
+                server._count(embedding_requests=1, embedded_texts=len(texts), prompt_tokens=tokens)
+                self._send_json(200, {"object": "list", "data": data, "model": "fake-embedding",
+                                      "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+            def _chat(self, request):
+                if server._sleep(server.chat_latency):
+                    self._rate_limited()
+                    return
+                prompt_tokens = sum(_token_count(str(m.get('content', ''))) for m in request.get('messages', []))
+                content = FAKE_COMPLETION
+                if (request.get('response_format') or {}).get('type') == 'json_object':
+                    # Batched candidate prompts: one entry per "### Candidate <id>" block
+                    prompt = " ".join(str(m.get('content', '')) for m in request.get('messages', []))
+                    content = json.dumps({"candidates": [
+                        {"id": int(candidate_id), "justification": FAKE_COMPLETION, "linkedin_message": FAKE_OUTREACH}
+                        for candidate_id in re.findall(r'### Candidate (\d+)', prompt)
+                    ]})
+                completion_tokens = _token_count(content)
+                server._count(chat_requests=1, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+                self._send_json(200, {
+                    "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+                    "model": "fake-chat",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                              "total_tokens": prompt_tokens + completion_tokens}
+                })
+
+            def log_message(self, format, *args):
+                pass # Keep benchmark output readable
+
+        return Handler
@@ -0,0 +1,246 @@
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+CORE_DIR = os.path.join(ROOT_DIR, 'core')
+sys.path.append(BENCH_DIR)
+from fake_azure_openai import FakeAzureOpenAIServer
+from synthetic_data import generate_corpus
+
+# Functions timed as pipeline stages: (module, attribute, stage name).
+# Modules that star-import a function get their own binding patched as well.
+TASK1_STAGES = [
+    ('main_task_1', 'load_all_jobs', 'load_jobs'),
+    ('main_task_1', 'deduplicate_jobs', 'dedup_jobs'),
+    ('main_task_1', 'index_jobs_to_qdrant', 'index_jobs'),
+    ('main_task_1', 'build_bm25_index', 'bm25_build'),
+    ('main_task_1', 'parse_pdf_resume', 'parse_resume'),
+    ('vector_db', 'embed_text', 'embed'),
+    ('main_task_1', 'embed_text', 'embed'),
+    ('main_task_1', 'perform_dense_search', 'dense_search'),
+    ('main_task_1', 'perform_sparse_search', 'sparse_search'),
+    ('main_task_1', 'combine_results_rrf', 'rrf_fusion'),
+    ('main_task_1', 'rerank_results', 'rerank'),
+    ('main_task_1', 'generate_justification_azure', 'justification'),
+    ('main_task_1', 'write_task1_result', 'html_report'),
+]
+TASK2_STAGES = [
+    ('main_task_2', 'load_candidates', 'load_candidates'),
+    ('main_task_2', 'load_linkedin_profiles', 'load_linkedin'),
+    ('main_task_2', 'title_similarity_matrix', 'title_matrix'),
+    ('main_task_2', 'build_candidate_profile', 'build_profile'),
+    ('main_task_2', 'extract_skills', 'extract_skills'),
+    ('main_task_2', 'score_candidate_fit', 'score_candidate'),
+    ('main_task_2', 'generate_candidate_justification_azure', 'justification'),
+    ('main_task_2', 'generate_linkedin_message_azure', 'linkedin_message'),
+    ('main_task_2', 'generate_candidate_batch_azure', 'candidate_batch'),
+    ('main_task_2', 'generate_task2_html_table', 'html_report'),
+]
+
+
+class StageStats:
+    """Thread-safe call counts and wall-clock totals per stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.stages = {}
+
+    def record(self, stage, elapsed):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"calls": 0, "total_s": 0.0, "max_s": 0.0})
+            entry["calls"] += 1
+            entry["total_s"] += elapsed
+            entry["max_s"] = max(entry["max_s"], elapsed)
+
+
+STATS = StageStats()
+
+
+def _timed(func, stage):
+    if getattr(func, '_bench_stage', None):
+        return func
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            STATS.record(stage, time.perf_counter() - start)
+    wrapper._bench_stage = stage
+    return wrapper
+
+
+def instrument(stage_specs):
+    for module_name, attribute, stage in stage_specs:
+        module = sys.modules[module_name]
+        setattr(module, attribute, _timed(getattr(module, attribute), stage))
+
+
+def configure_environment(fake_url):
+    """Points the Azure clients at the fake server and Qdrant at an in-process instance."""
+    os.environ.update({
+        'AZURE_OPENAI_ENDPOINT': fake_url,
+        'AZURE_OPENAI_API_KEY': 'fake-key',
+        'AZURE_OPENAI_API_VERSION': '2024-02-01',
+        'AZURE_OPENAI_CHAT_DEPLOYMENT_NAME': 'fake-chat',
+        'AZURE_OPENAI_EMBEDDING_ENDPOINT': fake_url,
+        'AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME': 'fake-embedding',
+        'EMBEDDING_CLIENT_API_KEY': 'fake-key',
+        'QDRANT_URL': ':memory:',
+        'QDRANT_API_KEY': '',
+    })
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def run_measured(name, func, verbose, trace_memory, profile_prefix=None):
+    """Runs func with stage stats reset, returning wall time, stage stats and memory figures."""
+    from profiling import profile_run
+    STATS.reset()
+    if trace_memory:
+        tracemalloc.start()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with output, profile_run(profile_prefix) as profiler:
+        func()
+    wall = time.perf_counter() - start
+    if profiler is not None:
+        print(f"Profile written to {profile_prefix}.*")
+    report = {"name": name, "wall_s": wall, "stages": dict(STATS.stages), "peak_rss_mb": _peak_rss_mb()}
+    if trace_memory:
+        report["peak_python_heap_mb"] = tracemalloc.get_traced_memory()[1] / (1024.0 * 1024.0)
+        tracemalloc.stop()
+    return report
+
+
+def print_report(report, units, unit_name):
+    print(f"\n{report['name']}: {report['wall_s']:.2f}s wall, {units} {unit_name} "
+          f"({units / report['wall_s']:.2f} {unit_name}/s), peak RSS {report['peak_rss_mb']:.0f} MB"
+          + (f", peak Python heap {report['peak_python_heap_mb']:.0f} MB" if 'peak_python_heap_mb' in report else ""))
+    print(f"  {'stage':<18}{'calls':>8}{'total s':>10}{'mean ms':>10}{'max ms':>10}{'% wall':>8}")
+    for stage, entry in sorted(report['stages'].items(), key=lambda item: -item[1]['total_s']):
+        mean_ms = entry['total_s'] / entry['calls'] * 1000
+        print(f"  {stage:<18}{entry['calls']:>8}{entry['total_s']:>10.2f}{mean_ms:>10.1f}"
+              f"{entry['max_s'] * 1000:>10.1f}{entry['total_s'] / report['wall_s'] * 100:>7.0f}%")
+
+
+def _profile_prefix(args, scale, task):
+    return f"{args.profile}_task{task}_scale{scale}" if args.profile else None
+
+
+def run_scale(scale, work_root, args):
+    work_dir = os.path.join(work_root, f"scale_{scale}")
+    corpus = generate_corpus(scale, os.path.join(work_dir, 'data'), seed=args.seed)
+    # The pipelines write to ../output relative to the working directory
+    os.makedirs(os.path.join(work_dir, 'core'), exist_ok=True)
+    os.makedirs(os.path.join(work_dir, 'output'), exist_ok=True)
+    os.chdir(os.path.join(work_dir, 'core'))
+
+    import vector_db
+    import main_task_1
+    import main_task_2
+    instrument(TASK1_STAGES + TASK2_STAGES)
+    main_task_2.OUTPUT_HTML_FILE = os.path.join(work_dir, 'output', 'task2_candidate_results.html')
+
+    reports = []
+    n_resumes = len([f for f in os.listdir(corpus['resume_dir']) if f.lower().endswith('.pdf')])
+    if 1 in args.tasks:
+        with contextlib.suppress(Exception):
+            vector_db.qdrant_client.delete_collection(vector_db.QDRANT_COLLECTION_NAME)
+        report = run_measured(
+            f"Task 1 @ {scale}x",
+            lambda: main_task_1.main_task1_hybrid_pipeline(
+                corpus['resume_dir'], corpus['para_job_csv'], corpus['srn_job_dir'], async_stages=args.async_stages,
+                rerank=args.rerank, dedup=args.job_dedup),
+            args.verbose, args.trace_memory, _profile_prefix(args, scale, 1))
+        report.update(scale=scale, task=1, units=n_resumes)
+        print_report(report, n_resumes, "resumes")
+        reports.append(report)
+
+    if 2 in args.tasks:
+        random.seed(args.seed) # main_task2_pipeline picks a random job
+        with open(corpus['candidate_csv'], encoding='utf-8') as f:
+            n_candidates = sum(1 for _ in f) - 1
+        report = run_measured(
+            f"Task 2 @ {scale}x",
+            lambda: main_task_2.main_task2_pipeline(
+                corpus['para_job_csv'], corpus['candidate_csv'], corpus['linkedin_json'], async_stages=args.async_stages,
+                batched=args.batched_generation),
+            args.verbose, args.trace_memory, _profile_prefix(args, scale, 2))
+        report.update(scale=scale, task=2, units=n_candidates)
+        print_report(report, n_candidates, "candidates")
+        reports.append(report)
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmarks against local Azure OpenAI and Qdrant stand-ins.")
+    parser.add_argument('--scales', default='1,10', help="Comma-separated corpus multipliers of data/ (e.g. 1,10,100,1000).")
+    parser.add_argument('--tasks', default='1,2', help="Comma-separated pipelines to run (1, 2).")
+    parser.add_argument('--embedding-latency-ms', type=float, default=50.0)
+    parser.add_argument('--chat-latency-ms', type=float, default=500.0)
+    parser.add_argument('--jitter', type=float, default=0.2, help="Relative latency jitter (0.2 = +/-20%%).")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of fake API calls answered with 429.")
+    parser.add_argument('--async-stages', action='store_true', help="Run the pipelines with overlapping stages.")
+    parser.add_argument('--embedding-provider', default=None, help="Embed with this provider ('azure' = the fake server, 'local' = CPU model, needs fastembed). Defaults to $EMBEDDING_PROVIDER.")
+    parser.add_argument('--job-dedup', action='store_true', help="Task 1: collapse near-duplicate jobs before indexing (off by default: the scaled corpora are replicas by design).")
+    parser.add_argument('--rerank', action='store_true', help="Task 1: rerank the fused results with the local cross-encoder (needs fastembed).")
+    parser.add_argument('--batched-generation', action='store_true', help="Task 2: one chat call per batch of candidates instead of two per candidate.")
+    parser.add_argument('--trace-memory', action='store_true', help="Also report peak Python heap via tracemalloc (slower).")
+    parser.add_argument('--profile', default=None, metavar='OUTPUT_PREFIX', help="Sample each run and write <prefix>_task<N>_scale<S>.{collapsed,speedscope.json,summary.txt}.")
+    parser.add_argument('--work-dir', default=None, help="Where to write corpora and outputs (default: a temp dir).")
+    parser.add_argument('--json', default=None, help="Write all reports to this JSON file.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help="Show the pipelines' own output.")
+    args = parser.parse_args()
+    args.tasks = {int(t) for t in args.tasks.split(',')}
+    if args.json:
+        args.json = os.path.abspath(args.json) # The pipelines chdir into the work directory
+    if args.profile:
+        args.profile = os.path.abspath(args.profile)
+
+    server = FakeAzureOpenAIServer(
+        embedding_latency=args.embedding_latency_ms / 1000.0, chat_latency=args.chat_latency_ms / 1000.0,
+        jitter=args.jitter, error_rate=args.error_rate, seed=args.seed
+    ).start()
+    configure_environment(server.url)
+    if args.embedding_provider:
+        os.environ['EMBEDDING_PROVIDER'] = args.embedding_provider
+    sys.path.insert(0, CORE_DIR)
+    sys.path.insert(0, ROOT_DIR)
+
+    work_root = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix='synapse-bench-'))
+    all_reports = []
+    try:
+        for scale in (int(s) for s in args.scales.split(',')):
+            all_reports.extend(run_scale(scale, work_root, args))
+    finally:
+        server.stop()
+
+    print(f"\nFake API totals: {server.counters}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"reports": all_reports, "fake_api": server.counters, "args": vars(args) | {"tasks": sorted(args.tasks)}}, f, indent=2)
+        print(f"Benchmark report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import json
+import os
+import random
+import re
+import fitz
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARA_JOB_CSV = os.path.join(ROOT_DIR, 'data/jobs/Paraform_Jobs.csv')
+SRN_JOBS_DIR = os.path.join(ROOT_DIR, 'utils/scrape-pdf/output/')
+RESUME_DIR = os.path.join(ROOT_DIR, 'data/resumes/')
+CANDIDATE_CSV = os.path.join(ROOT_DIR, 'data/candidates/JuiceboxExport_1743820890826.csv')
+LINKEDIN_JSON = os.path.join(ROOT_DIR, 'data/candidates/first_five_profiles.json')
+
+PDF_PAGE_CHARS = 3000 # Characters of text written per synthetic PDF page
+TECH_POOL = ['AWS', 'Azure', 'Docker', 'Django', 'FastAPI', 'GCP', 'Go', 'GraphQL', 'Java', 'Kafka',
+             'Kubernetes', 'MongoDB', 'Next.js', 'NodeJS', 'PostgreSQL', 'PyTorch', 'Python', 'React',
+             'Redis', 'Rust', 'Snowflake', 'TensorFlow', 'Terraform', 'TypeScript']
+ROLE_PREFIXES = ['', 'Senior ', 'Staff ', 'Lead ', 'Founding ']
+
+
+def _pdf_text(path):
+    with fitz.open(path) as doc:
+        return "\n".join(page.get_text() for page in doc)
+
+
+def _write_pdf(path, text):
+    """Writes text into a simple multi-page PDF that PyMuPDF can parse back."""
+    doc = fitz.open()
+    for start in range(0, max(len(text), 1), PDF_PAGE_CHARS):
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (36, 36, -36, -36), text[start:start + PDF_PAGE_CHARS], fontsize=6)
+    doc.save(path)
+    doc.close()
+
+
+def _shuffle_sentences(text, rng):
+    sentences = re.split(r'(?<=[.!?])\s+', text)
+    head, tail = sentences[:3], sentences[3:]
+    rng.shuffle(tail)
+    return " ".join(head + tail)
+
+
+def generate_jobs(scale, out_dir, rng):
+    """Paraform rows replicated `scale` times with varied roles and tech stacks."""
+    df = pd.read_csv(PARA_JOB_CSV)
+    replicas = []
+    for replica in range(scale):
+        copy = df.copy()
+        if replica:
+            copy['Role'] = [rng.choice(ROLE_PREFIXES) + str(role) for role in copy['Role']]
+            copy['Company'] = [f"{company} {replica}" for company in copy['Company']]
+            copy['Tech Stack'] = [", ".join(rng.sample(TECH_POOL, rng.randint(3, 6))) for _ in range(len(copy))]
+        replicas.append(copy)
+    path = os.path.join(out_dir, 'Paraform_Jobs.csv')
+    pd.concat(replicas, ignore_index=True).to_csv(path, index=False)
+    return path
+
+
+def generate_srn_pdfs(scale, out_dir, rng):
+    """Each SRN job PDF re-emitted `scale` times with fresh SRN IDs and shuffled requirement bullets."""
+    srn_dir = os.path.join(out_dir, 'srn')
+    os.makedirs(srn_dir, exist_ok=True)
+    sources = sorted(f for f in os.listdir(SRN_JOBS_DIR) if f.endswith('.pdf'))
+    texts = {name: _pdf_text(os.path.join(SRN_JOBS_DIR, name)) for name in sources}
+    next_id = 10000
+    for replica in range(scale):
+        for name, text in texts.items():
+            def new_id(_):
+                nonlocal next_id
+                next_id += 1
+                return f"ID: SRN2025-{next_id}"
+            variant = re.sub(r'ID: SRN\d{4}-\d+', new_id, text)
+            if replica:
+                variant = _shuffle_sentences(variant, rng)
+            _write_pdf(os.path.join(srn_dir, f"{replica:04d}_{name}"), variant)
+    return srn_dir
+
+
+def generate_resumes(scale, out_dir, rng):
+    """Each sample resume re-emitted `scale` times with shuffled sentences."""
+    resume_dir = os.path.join(out_dir, 'resumes')
+    os.makedirs(resume_dir, exist_ok=True)
+    sources = sorted(f for f in os.listdir(RESUME_DIR) if f.lower().endswith('.pdf'))
+    texts = {name: _pdf_text(os.path.join(RESUME_DIR, name)) for name in sources}
+    for replica in range(scale):
+        for name, text in texts.items():
+            variant = text if replica == 0 else _shuffle_sentences(text, rng)
+            _write_pdf(os.path.join(resume_dir, f"{replica:04d}_{name}"), variant)
+    return resume_dir
+
+
+def generate_candidates(scale, out_dir, rng):
+    """Juicebox rows and scraped LinkedIn profiles replicated `scale` times with unique LinkedIn URLs."""
+    df = pd.read_csv(CANDIDATE_CSV)
+    with open(LINKEDIN_JSON, 'r') as f:
+        profiles = json.load(f)
+
+    rows, all_profiles = [], []
+    for replica in range(scale):
+        copy = df.copy()
+        if replica:
+            copy['LinkedIn'] = [f"{url.strip()}-{replica}" if isinstance(url, str) else url for url in copy['LinkedIn']]
+            copy['Current Title'] = [rng.choice(ROLE_PREFIXES) + str(title).replace('Senior ', '')
+                                     if isinstance(title, str) else title for title in copy['Current Title']]
+        rows.append(copy)
+        for profile in profiles:
+            variant = dict(profile)
+            if replica:
+                variant['public_identifier'] = f"{profile.get('public_identifier', '')}-{replica}"
+            all_profiles.append(variant)
+
+    candidate_csv = os.path.join(out_dir, 'candidates.csv')
+    pd.concat(rows, ignore_index=True).to_csv(candidate_csv, index=False)
+    linkedin_json = os.path.join(out_dir, 'linkedin_profiles.json')
+    with open(linkedin_json, 'w', encoding='utf-8') as f:
+        json.dump(all_profiles, f)
+    return candidate_csv, linkedin_json
+
+
+def generate_corpus(scale, out_dir, seed=0):
+    """Builds a job/resume/candidate corpus `scale` times the size of data/. Returns the input paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    print(f"Generating {scale}x synthetic corpus in {out_dir}...")
+    para_job_csv = generate_jobs(scale, out_dir, rng)
+    srn_job_dir = generate_srn_pdfs(scale, out_dir, rng)
+    resume_dir = generate_resumes(scale, out_dir, rng)
+    candidate_csv, linkedin_json = generate_candidates(scale, out_dir, rng)
+    return {
+        'para_job_csv': para_job_csv,
+        'srn_job_dir': srn_job_dir,
+        'resume_dir': resume_dir,
+        'candidate_csv': candidate_csv,
+        'linkedin_json': linkedin_json,
+    }
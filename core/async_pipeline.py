@@ -0,0 +1,133 @@
+import asyncio
+
+# --- Constants --- #
+DEFAULT_QUEUE_SIZE = 4
+
+_STOP = object() # Sentinel telling a stage worker that its input is exhausted
+
+
+class PipelineStage:
+    """One step of a staged pipeline: a blocking function applied to each item.
+
+    The function receives the item produced by the previous stage and returns the
+    item for the next one, or None to drop it (e.g. a resume that failed to parse).
+    `workers` controls how many items the stage processes concurrently.
+    """
+
+    def __init__(self, name, func, workers=1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+
+async def _run_stage(stage, in_queue, out_queue):
+    """Runs the stage's workers until each has received a stop sentinel."""
+    async def worker():
+        while True:
+            item = await in_queue.get()
+            if item is _STOP:
+                return
+            index, value = item
+            try:
+                # Stage functions do blocking network/disk I/O, so run them off the event loop
+                result = await asyncio.to_thread(stage.func, value)
+            except Exception as e:
+                print(f"Error in pipeline stage '{stage.name}' for item {index}: {e}")
+                continue
+            if result is not None:
+                await out_queue.put((index, result))
+
+    await asyncio.gather(*(worker() for _ in range(stage.workers)))
+
+
+async def run_staged_pipeline(items, stages, queue_size=DEFAULT_QUEUE_SIZE, on_result=None):
+    """Streams items through the stages, connected by bounded queues.
+
+    While one item is in a late stage (e.g. justification), the next ones are
+    already being parsed and embedded, so a batch takes roughly as long as its
+    slowest stage rather than the sum of all stages. Results are returned in input
+    order; dropped or failed items are omitted. With on_result, each result is
+    passed to it in completion order instead, and only the count is returned.
+    """
+    if not stages:
+        return _deliver(list(items), on_result)
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    results = {}
+
+    async def feed():
+        for index, item in enumerate(items):
+            await queues[0].put((index, item))
+        for _ in range(stages[0].workers):
+            await queues[0].put(_STOP)
+
+    async def run(position, stage):
+        await _run_stage(stage, queues[position], queues[position + 1])
+        next_workers = stages[position + 1].workers if position + 1 < len(stages) else 1
+        for _ in range(next_workers):
+            await queues[position + 1].put(_STOP)
+
+    async def collect():
+        while True:
+            item = await queues[-1].get()
+            if item is _STOP:
+                return
+            if on_result is None:
+                results[item[0]] = item[1]
+            else:
+                _handle_result(on_result, item[0], item[1])
+                delivered[0] += 1
+
+    delivered = [0]
+    await asyncio.gather(feed(), *(run(i, stage) for i, stage in enumerate(stages)), collect())
+    if on_result is not None:
+        return delivered[0]
+    return [results[index] for index in sorted(results)]
+
+
+def _handle_result(on_result, index, result):
+    try:
+        on_result(result)
+    except Exception as e:
+        print(f"Error handling pipeline result for item {index}: {e}")
+
+
+def _deliver(results, on_result):
+    if on_result is None:
+        return results
+    for index, result in enumerate(results):
+        _handle_result(on_result, index, result)
+    return len(results)
+
+
+def run_stages_sequentially(items, stages, on_result=None):
+    """Synchronous equivalent of run_staged_pipeline: each item passes through every stage in turn."""
+    results = []
+    delivered = 0
+    for index, value in enumerate(items):
+        for stage in stages:
+            try:
+                value = stage.func(value)
+            except Exception as e:
+                print(f"Error in pipeline stage '{stage.name}' for item {index}: {e}")
+                value = None
+            if value is None:
+                break
+        if value is None:
+            continue
+        if on_result is None:
+            results.append(value)
+        else:
+            _handle_result(on_result, index, value)
+            delivered += 1
+    return results if on_result is None else delivered
+
+
+def run_pipeline(items, stages, async_stages=False, queue_size=DEFAULT_QUEUE_SIZE, on_result=None):
+    """Runs the stages over the items, overlapping them with asyncio when async_stages is set.
+
+    Pass on_result to stream results (e.g. into a report) rather than collecting
+    them; the number of results is returned instead of the list.
+    """
+    if async_stages:
+        return asyncio.run(run_staged_pipeline(items, stages, queue_size=queue_size, on_result=on_result))
+    return run_stages_sequentially(items, stages, on_result=on_result)
@@ -0,0 +1,191 @@
+import argparse
+import json
+import os
+import threading
+from datetime import datetime, timezone
+import numpy as np
+from dotenv import load_dotenv
+from fusion import FUSION_METHOD, RRF_K, DENSE_WEIGHT, SPARSE_WEIGHT, DENSE_DEPTH, SPARSE_DEPTH, FUSION_DEDUP, fuse_ranked_lists
+
+load_dotenv()
+
+# --- Constants --- #
+# Fitted score -> fit score mapping; without it score_fit_hybrid uses its fixed log curve
+FIT_CALIBRATION_FILE = os.getenv("FIT_CALIBRATION_FILE", "../output/fit_calibration.json")
+CALIBRATION_METHODS = ("quantile", "isotonic")
+CALIBRATION_KNOTS = 41 # Quantile knots (every 2.5th percentile)
+MIN_FIT_SCORE, MAX_FIT_SCORE = 1.0, 10.0
+MIN_SAMPLE_SIZE = 20
+
+
+def current_fusion_settings():
+    """The fusion settings a calibration is only valid for (fused scores move with the method, k, weights and depths)."""
+    return {"method": FUSION_METHOD, "k": RRF_K, "weights": [DENSE_WEIGHT, SPARSE_WEIGHT], "depths": [DENSE_DEPTH, SPARSE_DEPTH], "dedup": FUSION_DEDUP}
+
+
+def _merge_ties(x, y):
+    """Averages y over equal x, so the knots are strictly increasing for np.interp."""
+    unique_x, inverse = np.unique(x, return_inverse=True)
+    sums = np.bincount(inverse, weights=y)
+    return unique_x, sums / np.bincount(inverse)
+
+
+def fit_quantile(scores, knots=CALIBRATION_KNOTS):
+    """Maps a score to its percentile in the sample, spread linearly over the fit-score range."""
+    levels = np.linspace(0.0, 1.0, knots)
+    x = np.quantile(scores, levels)
+    return _merge_ties(x, MIN_FIT_SCORE + (MAX_FIT_SCORE - MIN_FIT_SCORE) * levels)
+
+
+def fit_isotonic(scores, labels):
+    """Least-squares non-decreasing fit of labels (fit scores, 1-10) on scores, by pool-adjacent-violators."""
+    x, inverse = np.unique(np.asarray(scores, dtype=float), return_inverse=True) # Equal scores get the same fit score
+    counts = np.bincount(inverse).astype(float)
+    y = np.bincount(inverse, weights=np.clip(np.asarray(labels, dtype=float), MIN_FIT_SCORE, MAX_FIT_SCORE)) / counts
+    values, weights, sizes = [], [], []
+    for value, weight in zip(y, counts):
+        values.append(value)
+        weights.append(weight)
+        sizes.append(1)
+        while len(values) > 1 and values[-2] > values[-1]: # Pool a violating block into its predecessor
+            weight = weights[-2] + weights[-1]
+            values[-2:] = [(values[-2] * weights[-2] + values[-1] * weights[-1]) / weight]
+            weights[-2:] = [weight]
+            sizes[-2:] = [sizes[-2] + sizes[-1]]
+    return x, np.repeat(values, sizes)
+
+
+class FitCalibration:
+    """Monotone piecewise-linear mapping from fused scores ('fusion_score') to 1-10 fit scores."""
+
+    def __init__(self, x, y, method, fusion=None, sample_size=0, fitted_at=None):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.method = method
+        self.fusion = fusion or current_fusion_settings()
+        self.sample_size = sample_size
+        self.fitted_at = fitted_at or datetime.now(timezone.utc).isoformat()
+
+    @classmethod
+    def fit(cls, scores, labels=None, method="quantile"):
+        scores = np.asarray(scores, dtype=float)
+        valid = np.isfinite(scores)
+        if labels is not None:
+            labels = np.asarray(labels, dtype=float)
+            valid &= np.isfinite(labels)
+        if valid.sum() < MIN_SAMPLE_SIZE:
+            raise ValueError(f"Need at least {MIN_SAMPLE_SIZE} scored matches to calibrate, got {int(valid.sum())}.")
+        if method == "isotonic":
+            if labels is None:
+                raise ValueError("Isotonic calibration needs labels (target fit scores).")
+            x, y = fit_isotonic(scores[valid], labels[valid])
+        elif method == "quantile":
+            x, y = fit_quantile(scores[valid])
+        else:
+            raise ValueError(f"Unknown calibration method '{method}'; expected one of {CALIBRATION_METHODS}.")
+        return cls(x, y, method, sample_size=int(valid.sum()))
+
+    def apply(self, scores):
+        """Fit scores for a score or an array of scores, in half points; scores outside the sample are clamped."""
+        fit_scores = np.round(np.interp(scores, self.x, self.y) * 2) / 2.0
+        return np.clip(fit_scores, MIN_FIT_SCORE, MAX_FIT_SCORE)
+
+    def save(self, path=FIT_CALIBRATION_FILE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"method": self.method, "fusion": self.fusion, "sample_size": self.sample_size,
+                       "fitted_at": self.fitted_at, "x": self.x.tolist(), "y": self.y.tolist()}, f, indent=2)
+
+    @classmethod
+    def load(cls, path=FIT_CALIBRATION_FILE):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('fusion') is not None:
+            data['fusion'].setdefault('method', "rrf") # Fitted before the method was recorded, when only RRF scores were calibrated
+        return cls(data['x'], data['y'], data['method'], data.get('fusion'), data.get('sample_size', 0), data.get('fitted_at'))
+
+
+_calibration_lock = threading.Lock()
+_calibration_cache = {}
+
+
+def get_fit_calibration(path=FIT_CALIBRATION_FILE):
+    """The calibration stored at path, loaded once per process (None if there is none)."""
+    with _calibration_lock:
+        if path not in _calibration_cache:
+            calibration = None
+            if path and os.path.isfile(path):
+                try:
+                    calibration = FitCalibration.load(path)
+                    print(f"Using {calibration.method} fit-score calibration from {path} ({calibration.sample_size} matches).")
+                    if calibration.fusion != current_fusion_settings():
+                        print(f"Warning: {path} was fitted for fusion settings {calibration.fusion}, "
+                              f"but the current ones are {current_fusion_settings()}; refit it.")
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Error loading fit-score calibration from {path}: {e}. Using the default curve.")
+            _calibration_cache[path] = calibration
+        return _calibration_cache[path]
+
+
+def load_sample(path, score_field='fusion_score', label_field=None):
+    """Scores (and labels) of past matches from a Task 1 export (.jsonl file or .parquet directory, see result_export).
+
+    Rows of schema 1 exports have no fusion_score; their rrf_score is used
+    instead, which is the same score under the default RRF method.
+    """
+    if path.lower().rstrip('/\\').endswith('.parquet'):
+        import pyarrow.parquet as pq
+        rows = pq.read_table(path).to_pylist()
+    else:
+        with open(path, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    fallback_field = 'rrf_score' if score_field == 'fusion_score' else None
+    scores = [row.get(score_field) if row.get(score_field) is not None else row.get(fallback_field) for row in rows]
+    labels = [row.get(label_field) for row in rows] if label_field else None
+    to_float = lambda values: np.array([np.nan if value is None else float(value) for value in values])
+    return to_float(scores), (to_float(labels) if labels is not None else None)
+
+
+def load_run_scores(path):
+    """Fused scores of every result in a benchmarks/eval_fusion.py run file, fused with the current settings.
+
+    Unlike an export (top matches only) this covers the whole fused list, so
+    weak matches are calibrated from real data too.
+    """
+    scores = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            run = json.loads(line)
+            legs = [[{"id": job_id, "score": score} for job_id, score in leg] for leg in run['legs']]
+            keys = {job_id: job['key'] for job_id, job in run['jobs'].items()}
+            fused = fuse_ranked_lists(legs, (DENSE_WEIGHT, SPARSE_WEIGHT), keys=keys, method=FUSION_METHOD,
+                                      k=RRF_K, depths=(DENSE_DEPTH, SPARSE_DEPTH), dedup=FUSION_DEDUP)
+            scores.extend(result['fusion_score'] for result in fused)
+    return np.array(scores)
+
+
+# --- Fit a Calibration --- #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fits the fused score -> fit score calibration used by score_fit_hybrid.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--export', help="Task 1 results export (.jsonl or .parquet) to take past matches from.")
+    source.add_argument('--runs', help="Run file from benchmarks/eval_fusion.py --capture (all fused results, not just the top matches).")
+    parser.add_argument('--method', choices=CALIBRATION_METHODS, default="quantile",
+                        help="quantile: score percentile in the sample; isotonic: monotone fit to --label-field.")
+    parser.add_argument('--label-field', default=None, help="Export column with target fit scores (1-10), e.g. recruiter ratings.")
+    parser.add_argument('--output', default=FIT_CALIBRATION_FILE, help="Defaults to $FIT_CALIBRATION_FILE.")
+    args = parser.parse_args()
+    if args.export:
+        scores, labels = load_sample(args.export, label_field=args.label_field)
+    else:
+        scores, labels = load_run_scores(args.runs), None
+    calibration = FitCalibration.fit(scores, labels, method=args.method)
+    calibration.save(args.output)
+    print(f"Fitted {args.method} calibration on {calibration.sample_size} matches ({len(calibration.x)} knots) -> {args.output}")
+    for quantile in (0.1, 0.5, 0.9, 0.99):
+        score = float(np.quantile(scores[np.isfinite(scores)], quantile))
+        print(f"  p{int(quantile * 100):<2} score {score:.5f} -> fit {float(calibration.apply(score)):.1f}")
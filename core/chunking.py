@@ -0,0 +1,60 @@
+import re
+from metrics import increment
+
+# --- Constants --- #
+CHUNK_WORDS = 180         # ~240 tokens per chunk, well inside the embedding model's input limit
+CHUNK_OVERLAP_WORDS = 30  # Words repeated between consecutive windows of a long section
+MIN_CHUNK_WORDS = 25      # Shorter sections are merged into the following one
+MAX_CHUNKS = 24           # Cap on chunks (embedding calls) per document; longer documents keep evenly spaced chunks
+
+# Section starts: resume headings (parse_pdf_resume collapses whitespace, so they are matched inline)
+# and the field labels used in the job texts built by data_loader
+SECTION_PATTERN = re.compile(
+    r'\b(?:(?:PROFESSIONAL |WORK )?EXPERIENCE|EMPLOYMENT|EDUCATION|(?:TECHNICAL )?SKILLS|PROJECTS|SUMMARY|'
+    r'CERTIFICATIONS|PUBLICATIONS|AWARDS)\b|'
+    r'\b(?:About|Responsibilities|Requirements|Tech Stack|One Liner|About the Company|Job Requirements):'
+)
+
+
+def split_sections(text):
+    """Splits text at section headings; the first section is whatever precedes the first heading."""
+    starts = sorted({0} | {match.start() for match in SECTION_PATTERN.finditer(text)})
+    sections = [text[start:end].strip() for start, end in zip(starts, starts[1:] + [len(text)])]
+    return [section for section in sections if section]
+
+
+def _windows(words, size=CHUNK_WORDS, overlap=CHUNK_OVERLAP_WORDS):
+    step = max(1, size - overlap)
+    for start in range(0, max(len(words) - overlap, 1), step):
+        yield words[start:start + size]
+
+
+def chunk_text(text, max_chunks=MAX_CHUNKS):
+    """Section-aware chunks of at most CHUNK_WORDS words, with overlapping windows inside long sections.
+
+    Past max_chunks, chunks are kept evenly spaced from the first to the last,
+    so the end of a long document still takes part in matching; the dropped
+    chunks are counted in the 'chunks_dropped' metric.
+    """
+    if not isinstance(text, str) or not text.strip():
+        return []
+    chunks = []
+    carry = []
+    for section in split_sections(text):
+        words = carry + section.split()
+        if len(words) < MIN_CHUNK_WORDS:
+            carry = words
+            continue
+        carry = []
+        chunks.extend(" ".join(window) for window in _windows(words))
+    if carry:
+        if chunks and len(chunks[-1].split()) + len(carry) <= CHUNK_WORDS:
+            chunks[-1] = f"{chunks[-1]} {' '.join(carry)}"
+        else:
+            chunks.append(" ".join(carry))
+    if len(chunks) > max_chunks:
+        increment("chunks_dropped", len(chunks) - max_chunks)
+        if max_chunks < 2:
+            return chunks[:max_chunks]
+        chunks = [chunks[round(i * (len(chunks) - 1) / (max_chunks - 1))] for i in range(max_chunks)]
+    return chunks
@@ -4,6 +4,11 @@ import re
 import uuid
 import os
 from rank_bm25 import BM25Okapi
+from metrics import timed
+from job_filters import structured_job_fields
+from fusion import content_key
+
+JOB_ID_NAMESPACE = uuid.UUID('6f1c2a8e-3b5d-4c7a-9e2f-8d4b1a6c0e37') # Job IDs are derived from the job source, link and text within this namespace
 
 
 def load_paraform_jobs(csv_path):
@@ -107,6 +112,7 @@ def extract_srn_jobs_from_text(full_text, job_name):
     print(f"Extracted {len(extracted_jobs)} potential jobs from SRN PDF text.")
     return extracted_jobs
 
+@timed("parse_pdf")
 def parse_pdf_resume(pdf_path):
     """Parse PDF and extract text using PyMuPDF."""
     if not os.path.isfile(pdf_path):
@@ -129,4 +135,32 @@ def load_srn_jobs(pdf_path):
     job_name = re.sub(r'[^a-zA-Z0-9_]', '', job_name)  # Remove special characters
     if not srn_text:
         return []
-    return extract_srn_jobs_from_text(srn_text, job_name)
\ No newline at end of file
+    return extract_srn_jobs_from_text(srn_text, job_name)
+
+@timed("load_jobs")
+def load_all_jobs(para_job_csv, srn_job_dir):
+    """Loads Paraform CSV jobs and every SRN job PDF in srn_job_dir.
+
+    Each job's ID is a UUID derived from its source, link and normalized text,
+    so loading the same postings again overwrites their Qdrant points instead
+    of adding copies. Postings that share all three are numbered in load order,
+    so IDs stay unique when deduplication is off.
+    """
+    paraform_jobs = load_paraform_jobs(para_job_csv)
+    srn_jobs = []
+    for filename in os.listdir(srn_job_dir):
+        if filename.endswith(".pdf"):
+            srn_jobs.extend(load_srn_jobs(os.path.join(srn_job_dir, filename)))
+    all_jobs = paraform_jobs + srn_jobs
+
+    seen_keys = {}
+    for job in all_jobs:
+        text_key = content_key(job['payload'], None)
+        if text_key:
+            key = f"{job['payload'].get('source')}|{job['payload'].get('link')}|{text_key}"
+            seen_keys[key] = seen_keys.get(key, 0) + 1
+            if seen_keys[key] > 1:
+                key = f"{key}|{seen_keys[key]}"
+        job['id'] = str(uuid.uuid5(JOB_ID_NAMESPACE, key) if text_key else uuid.uuid4())
+        job['payload'].update(structured_job_fields(job['payload'])) # Filterable salary/YOE/location/source fields
+    return all_jobs
\ No newline at end of file
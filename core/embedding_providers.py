@@ -0,0 +1,159 @@
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from metrics import increment, timed
+
+load_dotenv()
+
+# --- Constants --- #
+EMBEDDING_PROVIDERS = ("azure", "local")
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "azure").lower() # azure | local
+AZURE_EMBEDDING_DIMENSION = 1536 # text-embedding-ada-002 / text-embedding-3-small
+AZURE_EMBEDDING_API_VERSION = "2023-05-15"
+# Local CPU backend: a small ONNX model run with fastembed, one model instance per worker thread
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+# Output sizes of common fastembed models; set EMBEDDING_DIMENSION for any other model
+LOCAL_MODEL_DIMENSIONS = {
+    "BAAI/bge-small-en-v1.5": 384,
+    "BAAI/bge-base-en-v1.5": 768,
+    "sentence-transformers/all-MiniLM-L6-v2": 384,
+    "nomic-ai/nomic-embed-text-v1.5": 768,
+}
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", 32)) # Texts per forward pass
+LOCAL_EMBEDDING_WORKERS = int(os.getenv("LOCAL_EMBEDDING_WORKERS", 2))
+# Vector size; defaults to the provider's model. For Azure, other sizes need a text-embedding-3 deployment.
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", 0)) or None
+
+
+class EmbeddingProvider(ABC):
+    """Turns texts into vectors of a fixed dimension.
+
+    Subclasses implement embed_batch(), which keeps the input order and
+    returns None for texts that are invalid or failed to embed;
+    rate_controller is only used by remote providers. collection_tag tells
+    apart collections built with different models or dimensions.
+    """
+
+    name = None
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+
+    @property
+    def collection_tag(self):
+        return f"{self.name}_{self.dimension}"
+
+    def embed(self, text):
+        return self.embed_batch([text])[0]
+
+    @abstractmethod
+    def embed_batch(self, texts, rate_controller=None):
+        """Vectors for texts in input order, None where a text is invalid or failed to embed."""
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """Embeds on the local CPU with an ONNX model: no network calls, rate limits or API cost.
+
+    Batches are split into LOCAL_EMBEDDING_BATCH_SIZE forward passes spread
+    over a pool of worker threads (ONNX Runtime releases the GIL), each with
+    its own model instance and a share of the CPU cores.
+    """
+
+    name = "local"
+
+    def __init__(self, model_name=LOCAL_EMBEDDING_MODEL, dimension=EMBEDDING_DIMENSION,
+                 batch_size=LOCAL_EMBEDDING_BATCH_SIZE, workers=LOCAL_EMBEDDING_WORKERS):
+        dimension = dimension or LOCAL_MODEL_DIMENSIONS.get(model_name)
+        if dimension is None:
+            raise ValueError(f"Set EMBEDDING_DIMENSION to the output size of the local model '{model_name}'.")
+        super().__init__(dimension)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self._threads_per_model = max(1, (os.cpu_count() or 1) // self.workers)
+        self._local = threading.local()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def collection_tag(self):
+        model_slug = re.sub(r'[^a-z0-9]+', '_', self.model_name.lower()).strip('_')
+        return f"{self.name}_{model_slug}_{self.dimension}"
+
+    def _model(self):
+        """This worker thread's model, loaded on first use."""
+        model = getattr(self._local, 'model', None)
+        if model is None:
+            try:
+                # Imported here: fastembed loads ONNX Runtime, which the Azure provider does not need
+                from fastembed import TextEmbedding
+            except ImportError as e:
+                raise ImportError("The local embedding provider needs fastembed (pip install fastembed).") from e
+            start = time.perf_counter()
+            model = TextEmbedding(model_name=self.model_name, threads=self._threads_per_model)
+            print(f"Loaded local embedding model {self.model_name} in {time.perf_counter() - start:.1f}s.")
+            self._local.model = model
+        return model
+
+    def _embed_chunk(self, texts):
+        vectors = [vector.tolist() for vector in self._model().embed(texts, batch_size=self.batch_size)]
+        if vectors and len(vectors[0]) != self.dimension:
+            raise ValueError(f"Local model '{self.model_name}' returns {len(vectors[0])}-d vectors, "
+                             f"but EMBEDDING_DIMENSION is {self.dimension}.")
+        return vectors
+
+    @timed("local_embed_batch")
+    def embed_batch(self, texts, rate_controller=None):
+        embeddings = [None for _ in texts]
+        valid_indices = [i for i, text in enumerate(texts) if text and isinstance(text, str)]
+        if len(valid_indices) < len(texts):
+            increment("embedding_failures", len(texts) - len(valid_indices), reason="invalid_text")
+        if not valid_indices:
+            return embeddings
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="local-embed")
+        chunks = [valid_indices[start:start + self.batch_size] for start in range(0, len(valid_indices), self.batch_size)]
+        futures = [self._executor.submit(self._embed_chunk, [texts[i] for i in chunk]) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            try:
+                vectors = future.result()
+            except Exception as e: # Like the Azure provider: a failed chunk yields None, callers degrade
+                print(f"Error getting local embeddings for {len(chunk)} texts: {e}")
+                increment("embedding_failures", len(chunk), reason="local_model")
+                continue
+            for i, vector in zip(chunk, vectors):
+                embeddings[i] = vector
+        return embeddings
+
+
+def create_azure_embedding_client(max_retries=None):
+    """Azure OpenAI client for the embedding deployment; raises ValueError if its environment variables are missing.
+
+    Only the Azure provider calls this, so EMBEDDING_PROVIDER=local runs need
+    no Azure credentials or network access for embeddings.
+    """
+    endpoint = os.getenv("AZURE_OPENAI_EMBEDDING_ENDPOINT")
+    deployment = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME")
+    api_key = os.getenv("EMBEDDING_CLIENT_API_KEY")
+    if not all([endpoint, deployment, api_key]):
+        raise ValueError("The Azure embedding provider needs AZURE_OPENAI_EMBEDDING_ENDPOINT, AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME "
+                         "and EMBEDDING_CLIENT_API_KEY; set them or use EMBEDDING_PROVIDER=local.")
+    from openai import AzureOpenAI # Imported here: local runs do not need the OpenAI SDK
+    options = {} if max_retries is None else {'max_retries': max_retries}
+    return AzureOpenAI(azure_endpoint=endpoint, azure_deployment=deployment, api_key=api_key,
+                       api_version=AZURE_EMBEDDING_API_VERSION, **options)
+
+
+def collection_name_for(base_name, provider):
+    """Qdrant collection for base_name and provider; vectors of different models or sizes never share one.
+
+    The default Azure setup keeps the bare name, so existing collections stay valid.
+    """
+    if provider.name == "azure" and provider.dimension == AZURE_EMBEDDING_DIMENSION:
+        return base_name
+    return f"{base_name}_{provider.collection_tag}"
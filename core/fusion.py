@@ -0,0 +1,131 @@
+import hashlib
+import os
+import re
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Constants --- #
+FUSION_METHODS = ("rrf", "minmax", "zscore")
+# How the dense and sparse legs are combined; each can be overridden from the environment
+FUSION_METHOD = os.getenv("FUSION_METHOD", "rrf").lower()          # rrf | minmax | zscore
+RRF_K = float(os.getenv("RRF_K", 60))                                # Rank constant of RRF
+DENSE_WEIGHT = float(os.getenv("FUSION_DENSE_WEIGHT", 1.0))
+SPARSE_WEIGHT = float(os.getenv("FUSION_SPARSE_WEIGHT", 1.0))
+DENSE_DEPTH = int(os.getenv("FUSION_DENSE_DEPTH", 20))               # Hits fetched from (and fused from) each leg
+SPARSE_DEPTH = int(os.getenv("FUSION_SPARSE_DEPTH", 20))
+# Collapse hits with the same content (e.g. a posting re-indexed under a new UUID) into one result
+FUSION_DEDUP = os.getenv("FUSION_DEDUP", "true").lower() == "true"
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def content_key(payload, fallback):
+    """Stable key of a job's content (hash of its normalized text); fallback (usually the ID) when there is no text."""
+    text = (payload or {}).get('text')
+    if not isinstance(text, str) or not text.strip():
+        return fallback
+    normalized = WHITESPACE_PATTERN.sub(' ', text).strip().lower()
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def result_id(result):
+    """ID of a search hit, whether a dict or a Qdrant ScoredPoint (None if missing)."""
+    if isinstance(result, dict):
+        return result.get('id')
+    return getattr(result, 'id', None)
+
+
+def rrf_scores(ranks, weights, k=RRF_K):
+    """Weighted RRF over a (legs, docs) matrix of 1-based ranks, with inf where a doc is missing from a leg."""
+    return (np.asarray(weights, dtype=float)[:, None] / (k + ranks)).sum(axis=0)
+
+
+def normalized_scores(scores, weights, method):
+    """Weighted sum of per-leg normalized raw scores over a (legs, docs) matrix with NaN where a doc is missing.
+
+    minmax maps each leg onto [0, 1] and counts a missing doc as 0; zscore
+    standardizes each leg and counts a missing doc as that leg's lowest z-score.
+    """
+    present = ~np.isnan(scores)
+    counts = present.sum(axis=1, keepdims=True)
+    filled = np.where(present, scores, 0.0)
+    if method == "minmax":
+        low = np.where(present, scores, np.inf).min(axis=1, keepdims=True)
+        high = np.where(present, scores, -np.inf).max(axis=1, keepdims=True)
+        span = high - low
+        # A leg whose hits all score the same gives each of them full credit
+        normalized = np.where(span > 0, (filled - low) / np.where(span > 0, span, 1.0), 1.0)
+        normalized = np.where(present, normalized, 0.0)
+    elif method == "zscore":
+        mean = filled.sum(axis=1, keepdims=True) / np.maximum(counts, 1)
+        std = np.sqrt((np.where(present, filled - mean, 0.0) ** 2).sum(axis=1, keepdims=True) / np.maximum(counts, 1))
+        normalized = np.where(std > 0, (filled - mean) / np.where(std > 0, std, 1.0), 0.0)
+        floor = np.where(present, normalized, np.inf).min(axis=1, keepdims=True)
+        normalized = np.where(present, normalized, np.where(counts > 0, floor, 0.0))
+    else:
+        raise ValueError(f"Unknown fusion method '{method}'; expected one of {FUSION_METHODS}.")
+    return (np.asarray(weights, dtype=float)[:, None] * normalized).sum(axis=0)
+
+
+def fuse_ranked_lists(legs, weights, keys=None, method=FUSION_METHOD, k=RRF_K, depths=None, dedup=FUSION_DEDUP):
+    """Fuses ranked result lists (one per leg, best first) into one ranking.
+
+    Each result is a dict (or object) with an 'id' and optionally a raw
+    'score'. keys maps IDs to content keys (see content_key); with dedup,
+    results sharing a key count once per leg at their best rank. depths caps
+    how many hits of each leg are used. Returns dicts with the 'id' (first
+    one seen for the key), 'fusion_score' (what the list is sorted by),
+    'rrf_score' (weighted RRF, whatever the method), 1-based 'ranks' per leg
+    (None if absent) and 'duplicate_ids', best first; ties keep the order in
+    which results first appear.
+    """
+    keys = keys or {}
+    depths = depths or [None] * len(legs)
+    doc_index, doc_ids = {}, []
+    members = []
+    leg_positions, leg_docs, leg_raw = [], [], []
+    for leg, depth in zip(legs, depths):
+        positions, docs, raw = [], [], []
+        for rank, result in enumerate(leg[:depth] if depth is not None else leg, start=1):
+            doc_id_raw = result_id(result)
+            if doc_id_raw is None:
+                print(f"Warning: Skipping result at rank {rank} due to missing ID.")
+                continue
+            doc_id = str(doc_id_raw)
+            key = keys.get(doc_id, doc_id) if dedup else doc_id
+            index = doc_index.setdefault(key, len(doc_ids))
+            if index == len(doc_ids):
+                doc_ids.append(doc_id)
+                members.append([doc_id])
+            elif doc_id not in members[index]:
+                members[index].append(doc_id)
+            score = result.get('score') if isinstance(result, dict) else getattr(result, 'score', None)
+            positions.append(rank)
+            docs.append(index)
+            raw.append(np.nan if score is None else float(score))
+        leg_positions.append(positions)
+        leg_docs.append(docs)
+        leg_raw.append(raw)
+    if not doc_ids:
+        return []
+
+    ranks = np.full((len(legs), len(doc_ids)), np.inf)
+    scores = np.full((len(legs), len(doc_ids)), np.nan)
+    for leg, (positions, docs, raw) in enumerate(zip(leg_positions, leg_docs, leg_raw)):
+        if docs:
+            # Duplicates of a key keep their best rank and score within the leg
+            np.minimum.at(ranks[leg], docs, positions)
+            np.fmax.at(scores[leg], docs, raw)
+
+    rrf = rrf_scores(ranks, weights, k)
+    fused = rrf if method == "rrf" else normalized_scores(scores, weights, method)
+    order = np.argsort(-fused, kind='stable')
+    return [{
+        "id": doc_ids[index],
+        "fusion_score": float(fused[index]),
+        "rrf_score": float(rrf[index]),
+        "ranks": [int(rank) if np.isfinite(rank) else None for rank in ranks[:, index]],
+        "duplicate_ids": members[index][1:],
+    } for index in order]
@@ -1,37 +1,14 @@
-import pandas as pd
-from tabulate import tabulate
 import os
-from IPython.display import HTML, display
+import html
 
-def format_results_for_table(results):
-    table_data = []
-    
-    for result in results:
-        resume_name = result['resume_name']
-        
-        if result['top_matches']:
-            for i, match in enumerate(result['top_matches']):
-                table_data.append({
-                    'Resume': resume_name if i == 0 else '',
-                    'Job': match['job_details'],
-                    'Fit Score': f"{match['fit_score']}/10",
-                    'RRF Score': f"{match['rrf_score']:.4f}",
-                    'Justification': match['justification']
-                })
-        else:
-            table_data.append({
-                'Resume': resume_name,
-                'Job': 'No suitable matches found.',
-                'Fit Score': 'N/A',
-                'RRF Score': 'N/A',
-                'Justification': 'N/A'
-            })
-    
-    return table_data
+# --- Constants --- #
+# Rows per report file before the writer continues in <name>_part2.html, ... (0 = single file)
+REPORT_ROWS_PER_FILE = int(os.getenv("REPORT_ROWS_PER_FILE", 5000))
+TASK1_COLUMNS = ['Resume', 'Job', 'Fit Score', 'RRF Score', 'Justification']
+TASK2_COLUMNS = ['Rank', 'Name', 'LinkedIn', 'Score', 'Why (Justification)', 'LinkedIn Message (Optional)']
+NO_MATCH_TEXT = 'No suitable matches found.'
 
-def generate_html_table(data, df):
-    # CSS for dark theme
-    css = """
+TASK1_CSS = """
     <style>
     .results-table {
         width: 100%;
@@ -101,51 +78,9 @@ def generate_html_table(data, df):
     }
     </style>
     """
-    
-    # HTML table generation
-    html = "<html><head><title>Resume Job Matching Results</title>" + css + "</head><body style='background-color: #121212; padding: 20px;'>"
-    html += "<h1 style='color: #e1e1e1; text-align: center; margin-bottom: 30px;'>Resume Job Matching Results</h1>"
-    html += "<table class='results-table'>"
-    
-    # Table headers
-    html += "<thead><tr>"
-    for column in df.columns:
-        html += f"<th>{column}</th>"
-    html += "</tr></thead><tbody>"
-    
-    # Table body
-    for _, row in df.iterrows():
-        html += "<tr>"
-        
-        for i, col in enumerate(df.columns):
-            value = row[col]
-            
-            if col == 'Resume' and value:
-                html += f"<td class='resume-name'>{value}</td>"
-            elif col == 'Job' and value == 'No suitable matches found.':
-                html += f"<td class='no-match'>{value}</td>"
-            elif col == 'Fit Score':
-                if value == 'N/A':
-                    html += f"<td class='no-match'>{value}</td>"
-                else:
-                    score = float(value.split('/')[0])
-                    class_name = 'high-score' if score >= 8 else 'medium-score' if score >= 6 else 'low-score'
-                    html += f"<td class='fit-score {class_name}'>{value}</td>"
-            else:
-                html += f"<td>{value}</td>"
-                
-        html += "</tr>"
-    
-    html += "</tbody></table></body></html>"
-    return html
-
-
-#### TASK 2 #####
-
-def generate_task2_html_table(df, output_filename):
-    """Generates an HTML table with dark theme for Task 2 results and saves it."""
+TASK1_PAGE_STYLE = "<style>body { background-color: #121212; padding: 20px; } h1 { color: #e1e1e1; text-align: center; margin-bottom: 30px; }</style>"
 
-    css = """
+TASK2_CSS = """
     <style>
     body {
         background-color: #121212;
@@ -227,48 +162,219 @@ def generate_task2_html_table(df, output_filename):
     </style>
     """
 
-    html = f"<html><head><title>Top Candidate Matches</title>{css}</head><body>"
-    html += "<h1>Top Candidate Matches</h1>"
-    html += "<table class='results-table'>"
-
-    html += "<thead><tr>"
-    headers = ['Rank', 'Name', 'LinkedIn', 'Score', 'Why (Justification)', 'LinkedIn Message (Optional)']
-    for header in headers:
-        html += f"<th>{header}</th>"
-    html += "</tr></thead><tbody>"
-
-    for _, row in df.iterrows():
-        html += "<tr>"
-        html += f"<td class='rank'>{row.get('Rank', 'N/A')}</td>"
-        html += f"<td class='candidate-name'>{row.get('Name', 'N/A')}</td>"
-        linkedin_url = row.get('LinkedIn', '')
-        if linkedin_url and isinstance(linkedin_url, str) and linkedin_url.startswith('http'):
-            html += f"<td class='linkedin-link'><a href='{linkedin_url}' target='_blank'>{linkedin_url}</a></td>"
+PAGE_NAV_CSS = """
+    <style>
+    .page-nav {
+        text-align: center;
+        margin: 10px 0;
+    }
+    .page-nav a {
+        color: #03dac6;
+        text-decoration: none;
+        margin: 0 10px;
+    }
+    </style>
+    """
+
+
+def score_class(score):
+    return 'high-score' if score >= 8 else 'medium-score' if score >= 6 else 'low-score'
+
+
+def _cell(value, css_class=None):
+    """One escaped <td>; css_class is trusted markup from this module."""
+    text = html.escape('' if value is None else str(value))
+    return f"<td class='{css_class}'>{text}</td>" if css_class else f"<td>{text}</td>"
+
+
+def _link_cell(url, css_class):
+    if isinstance(url, str) and url.startswith(('http://', 'https://')):
+        url = html.escape(url, quote=True)
+        return f"<td class='{css_class}'><a href='{url}' target='_blank' rel='noopener'>{url}</a></td>"
+    return _cell(url if url else 'N/A')
+
+
+class HtmlReportWriter:
+    """Writes an HTML results table row by row, so reports never have to be held in memory.
+
+    Once a file holds rows_per_file rows the table continues in
+    <name>_part2.html, <name>_part3.html, ... with previous/next links between
+    pages. Row groups passed to write_rows are never split across pages. Use as
+    a context manager; the document is completed on exit.
+    """
+
+    def __init__(self, output_filename, title, columns, css, rows_per_file=REPORT_ROWS_PER_FILE):
+        self.output_filename = output_filename
+        self.title = title
+        self.columns = columns
+        self.css = css
+        self.rows_per_file = rows_per_file
+        self.paths = []
+        self.row_count = 0
+        self._page_rows = 0
+        self._file = None
+
+    def _page_path(self, page):
+        if page == 1:
+            return self.output_filename
+        base, ext = os.path.splitext(self.output_filename)
+        return f"{base}_part{page}{ext or '.html'}"
+
+    def _nav(self, previous_page=None, next_page=None):
+        links = []
+        if previous_page:
+            links.append(f"<a href='{html.escape(os.path.basename(self._page_path(previous_page)), quote=True)}'>&larr; Previous</a>")
+        if next_page:
+            links.append(f"<a href='{html.escape(os.path.basename(self._page_path(next_page)), quote=True)}'>Next &rarr;</a>")
+        return f"<div class='page-nav'>{''.join(links)}</div>" if links else ""
+
+    def _open_page(self):
+        page = len(self.paths) + 1
+        path = self._page_path(page)
+        self._file = open(path, 'w', encoding='utf-8')
+        self.paths.append(path)
+        self._page_rows = 0
+        title = html.escape(self.title)
+        heading = title if page == 1 else f"{title} (page {page})"
+        self._file.write(f"<html><head><meta charset='utf-8'><title>{heading}</title>{self.css}{PAGE_NAV_CSS}</head><body>")
+        self._file.write(f"<h1>{heading}</h1>{self._nav(previous_page=page - 1)}")
+        self._file.write("<table class='results-table'><thead><tr>")
+        self._file.write("".join(f"<th>{html.escape(column)}</th>" for column in self.columns))
+        self._file.write("</tr></thead><tbody>")
+
+    def _close_page(self, next_page=None):
+        self._file.write(f"</tbody></table>{self._nav(next_page=next_page)}</body></html>")
+        self._file.close()
+        self._file = None
+
+    def write_rows(self, rows):
+        """Appends rows (each a list of rendered <td> cells), starting a new page first if this one is full."""
+        if not rows:
+            return
+        if self._file is None:
+            self._open_page()
+        elif self.rows_per_file and self._page_rows and self._page_rows + len(rows) > self.rows_per_file:
+            self._close_page(next_page=len(self.paths) + 1)
+            self._open_page()
+        self._file.write("".join(f"<tr>{''.join(cells)}</tr>" for cells in rows))
+        self._page_rows += len(rows)
+        self.row_count += len(rows)
+
+    def close(self):
+        if self._file is None and not self.paths:
+            self._open_page() # An empty report is still a valid document
+        if self._file is not None:
+            self._close_page()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+
+def format_results_for_table(results):
+    table_data = []
+    
+    for result in results:
+        resume_name = result['resume_name']
+        
+        if result['top_matches']:
+            for i, match in enumerate(result['top_matches']):
+                table_data.append({
+                    'Resume': resume_name if i == 0 else '',
+                    'Job': match['job_details'],
+                    'Fit Score': f"{match['fit_score']}/10",
+                    'RRF Score': f"{match['rrf_score']:.4f}",
+                    'Justification': match['justification']
+                })
         else:
-            html += f"<td>{linkedin_url if linkedin_url else 'N/A'}</td>"
-        score = row.get('Score', 0.0)
-        if score == 'N/A':
-             score_val = 0
-             score_display = 'N/A'
+            table_data.append({
+                'Resume': resume_name,
+                'Job': NO_MATCH_TEXT,
+                'Fit Score': 'N/A',
+                'RRF Score': 'N/A',
+                'Justification': 'N/A'
+            })
+    
+    return table_data
+
+
+def task1_row_cells(row):
+    """Rendered cells for one format_results_for_table row."""
+    cells = []
+    for col in TASK1_COLUMNS:
+        value = row[col]
+        if col == 'Resume' and value:
+            cells.append(_cell(value, 'resume-name'))
+        elif col == 'Job' and value == NO_MATCH_TEXT:
+            cells.append(_cell(value, 'no-match'))
+        elif col == 'Fit Score':
+            if value == 'N/A':
+                cells.append(_cell(value, 'no-match'))
+            else:
+                score = float(value.split('/')[0])
+                cells.append(_cell(value, f"fit-score {score_class(score)}"))
         else:
-            try:
-                score_val = float(score)
-                score_display = f"{score_val:.1f}/10"
-            except ValueError:
-                score_val = 0
-                score_display = 'N/A'
-
-        class_name = 'high-score' if score_val >= 8 else 'medium-score' if score_val >= 6 else 'low-score'
-        html += f"<td class='fit-score {class_name}'>{score_display}</td>"
-        html += f"<td class='justification'>{row.get('Why', 'N/A')}</td>"
-        html += f"<td class='message'>{row.get('LinkedIn Message (Optional)', '')}</td>"
-        html += "</tr>"
-
-    html += "</tbody></table></body></html>"
+            cells.append(_cell(value))
+    return cells
+
+
+def write_task1_result(report, result):
+    """Streams one resume's matches into a Task 1 report as a single row group."""
+    report.write_rows([task1_row_cells(row) for row in format_results_for_table([result])])
+
+
+def task1_report_writer(output_filename, rows_per_file=REPORT_ROWS_PER_FILE):
+    return HtmlReportWriter(output_filename, "Resume Job Matching Results", TASK1_COLUMNS,
+                            TASK1_CSS + TASK1_PAGE_STYLE, rows_per_file=rows_per_file)
+
+
+def generate_html_table(data, df):
+    """Whole Task 1 report as one HTML string (for notebooks and small result sets)."""
+    rows = "".join(f"<tr>{''.join(task1_row_cells(row))}</tr>" for row in df.to_dict('records'))
+    html_doc = "<html><head><title>Resume Job Matching Results</title>" + TASK1_CSS + TASK1_PAGE_STYLE + "</head><body>"
+    html_doc += "<h1>Resume Job Matching Results</h1>"
+    html_doc += "<table class='results-table'><thead><tr>"
+    html_doc += "".join(f"<th>{html.escape(str(column))}</th>" for column in df.columns)
+    html_doc += f"</tr></thead><tbody>{rows}</tbody></table></body></html>"
+    return html_doc
+
+
+#### TASK 2 #####
+
+def task2_row_cells(row):
+    """Rendered cells for one Task 2 result row (a dict with the TASK2 result keys)."""
+    score = row.get('Score', 0.0)
+    try:
+        score_val = float(score)
+        score_display = f"{score_val:.1f}/10"
+    except (TypeError, ValueError):
+        score_val = 0
+        score_display = 'N/A'
+    return [
+        _cell(row.get('Rank', 'N/A'), 'rank'),
+        _cell(row.get('Name', 'N/A'), 'candidate-name'),
+        _link_cell(row.get('LinkedIn', ''), 'linkedin-link'),
+        _cell(score_display, f"fit-score {score_class(score_val)}"),
+        _cell(row.get('Why', 'N/A'), 'justification'),
+        _cell(row.get('LinkedIn Message (Optional)', ''), 'message'),
+    ]
+
+
+def task2_report_writer(output_filename, rows_per_file=REPORT_ROWS_PER_FILE):
+    return HtmlReportWriter(output_filename, "Top Candidate Matches", TASK2_COLUMNS, TASK2_CSS, rows_per_file=rows_per_file)
+
+
+def generate_task2_html_table(df, output_filename):
+    """Generates an HTML table with dark theme for Task 2 results and saves it."""
     try:
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            f.write(html)
-        print(f"Results successfully saved to {output_filename}")
+        with task2_report_writer(output_filename) as report:
+            for row in df.to_dict('records'):
+                report.write_rows([task2_row_cells(row)])
+        print(f"Results successfully saved to {', '.join(report.paths)}")
+        return report.paths
     except Exception as e:
         print(f"Error saving HTML file: {e}")
-    return html
\ No newline at end of file
+        return []
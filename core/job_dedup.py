@@ -0,0 +1,204 @@
+import argparse
+import os
+import re
+import zlib
+import numpy as np
+from dotenv import load_dotenv
+from metrics import increment, timed
+from text_processing import preprocess_text_for_bm25
+
+load_dotenv()
+
+# --- Constants --- #
+# Collapse near-duplicate postings (same role from Paraform and SRN, re-scraped pages) into one canonical job at ingest
+JOB_DEDUP = os.getenv("JOB_DEDUP", "true").lower() == "true"
+DEDUP_SHINGLE_SIZE = 3   # Word n-grams of the BM25 tokens
+DEDUP_NUM_PERM = 128     # MinHash signature length
+DEDUP_LSH_BANDS = 32     # 32 bands of 4 rows: pairs above ~0.45 Jaccard usually share a bucket
+DEDUP_JACCARD_THRESHOLD = float(os.getenv("DEDUP_JACCARD_THRESHOLD", 0.85))     # Merged on text alone
+DEDUP_CANDIDATE_THRESHOLD = float(os.getenv("DEDUP_CANDIDATE_THRESHOLD", 0.5))  # Between the two: merged if the embeddings agree
+DEDUP_COSINE_THRESHOLD = float(os.getenv("DEDUP_COSINE_THRESHOLD", 0.95))
+VARIANT_FIELDS = ('name', 'source', 'company', 'role', 'link') # Kept on the canonical job for each variant
+MINHASH_PRIME = 4294967291 # Largest prime below 2**32, so (a * x + b) stays exact in uint64
+MINHASH_SEED = 1
+
+SPACE_PATTERN = re.compile(r'\s+')
+
+
+def shingle_hashes(tokens, size=DEDUP_SHINGLE_SIZE):
+    """Distinct 32-bit hashes of the token n-grams (the whole text as one shingle if it is shorter)."""
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    grams = {" ".join(tokens[i:i + size]) for i in range(max(1, len(tokens) - size + 1))}
+    return np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash_signatures(shingle_sets, num_perm=DEDUP_NUM_PERM, seed=MINHASH_SEED):
+    """(docs, num_perm) MinHash signatures, one row per shingle set; empty sets get a row of the maximum hash."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MINHASH_PRIME, num_perm, dtype=np.uint64)[:, None]
+    b = rng.integers(0, MINHASH_PRIME, num_perm, dtype=np.uint64)[:, None]
+    signatures = np.full((len(shingle_sets), num_perm), MINHASH_PRIME, dtype=np.uint64)
+    for row, hashes in enumerate(shingle_sets):
+        if len(hashes):
+            signatures[row] = ((a * hashes[None, :] + b) % MINHASH_PRIME).min(axis=1)
+    return signatures
+
+
+def lsh_buckets(signatures, bands=DEDUP_LSH_BANDS):
+    """Groups of row indices whose signatures agree on at least one band."""
+    rows = signatures.shape[1] // bands
+    buckets = []
+    for band in range(bands):
+        band_buckets = {}
+        for index, key in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+            band_buckets.setdefault(key.tobytes(), []).append(index)
+        buckets.extend(members for members in band_buckets.values() if len(members) > 1)
+    return buckets
+
+
+def _title_key(job):
+    payload = job.get('payload') or {}
+    company, role = payload.get('company'), payload.get('role')
+    if any(not isinstance(value, str) or not value.strip() or value.startswith('N/A') for value in (company, role)):
+        return None # Placeholders the loaders use when a field could not be parsed
+    return SPACE_PATTERN.sub(' ', f"{company}|{role}").strip().lower()
+
+
+def _variant_link(job):
+    payload = job.get('payload') or {}
+    return {field: payload[field] for field in VARIANT_FIELDS if isinstance(payload.get(field), str) and payload[field]}
+
+
+class _Clusters:
+    """Union-find over job indices."""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, index):
+        while self.parent[index] != index:
+            self.parent[index] = self.parent[self.parent[index]]
+            index = self.parent[index]
+        return index
+
+    def union(self, first, second):
+        self.parent[self.find(second)] = self.find(first)
+
+
+def find_duplicate_pairs(jobs):
+    """Near-duplicate pairs of job indices, split into (merged, borderline) lists of (first, second, jaccard).
+
+    Candidates are jobs sharing an LSH bucket, plus jobs with the same company
+    and role (which often differ in wording between sources). Candidates
+    are scored by exact shingle Jaccard: pairs at DEDUP_JACCARD_THRESHOLD or
+    above are merged, and borderline ones (at DEDUP_CANDIDATE_THRESHOLD, or
+    any same-title pair) are left for an embedding check.
+    """
+    shingle_sets = [shingle_hashes(preprocess_text_for_bm25(job.get('text'))) for job in jobs]
+    buckets = [(members, False) for members in lsh_buckets(minhash_signatures(shingle_sets))]
+    title_blocks = {}
+    for index, job in enumerate(jobs):
+        key = _title_key(job)
+        if key is not None:
+            title_blocks.setdefault(key, []).append(index)
+    buckets.extend((members, True) for members in title_blocks.values() if len(members) > 1)
+
+    clusters = _Clusters(len(jobs))
+    merged, borderline, scored = {}, {}, {}
+    for members, same_title in buckets:
+        # Each member is compared with the distinct clusters seen so far in the bucket, not with every other member
+        representatives = []
+        for member in members:
+            if not len(shingle_sets[member]):
+                continue
+            for representative in representatives:
+                if clusters.find(member) == clusters.find(representative):
+                    break
+                pair = (representative, member)
+                if pair not in scored:
+                    common = np.intersect1d(shingle_sets[representative], shingle_sets[member], assume_unique=True).size
+                    scored[pair] = common / (len(shingle_sets[representative]) + len(shingle_sets[member]) - common)
+                if scored[pair] >= DEDUP_JACCARD_THRESHOLD:
+                    merged[pair] = scored[pair]
+                    clusters.union(representative, member)
+                    break
+                if scored[pair] >= DEDUP_CANDIDATE_THRESHOLD or same_title:
+                    borderline[pair] = scored[pair]
+            else:
+                representatives.append(member)
+    return ([pair + (jaccard,) for pair, jaccard in merged.items()],
+            [pair + (jaccard,) for pair, jaccard in borderline.items()])
+
+
+@timed("dedup_jobs")
+def deduplicate_jobs(jobs, embed=None):
+    """Collapses near-duplicate jobs into one canonical job each, which lists the others under payload 'variants'.
+
+    Pairs of near-identical text are merged on MinHash/LSH alone; borderline
+    pairs are merged if the cosine similarity of their embeddings reaches
+    DEDUP_COSINE_THRESHOLD. embed(texts) returns vectors in input order (None
+    where it failed); only the jobs in borderline pairs are embedded, and
+    their vectors are kept as job['embedding'] so indexing does not embed
+    them again. Without embed, borderline pairs are kept apart. The canonical
+    job is the one with the longest text; jobs keep their original order.
+    """
+    if len(jobs) < 2:
+        return jobs
+    merged, borderline = find_duplicate_pairs(jobs)
+    clusters = _Clusters(len(jobs))
+    for first, second, _ in merged:
+        clusters.union(first, second)
+    minhash_count = sum(1 for index in range(len(jobs)) if clusters.find(index) != index)
+
+    borderline = [(first, second) for first, second, _ in borderline if clusters.find(first) != clusters.find(second)]
+    if borderline and embed is not None:
+        positions = sorted({index for pair in borderline for index in pair})
+        for index, vector in zip(positions, embed([jobs[index]['text'] for index in positions])):
+            if vector is not None:
+                jobs[index]['embedding'] = vector
+        for first, second in borderline:
+            first_vector, second_vector = jobs[first].get('embedding'), jobs[second].get('embedding')
+            if first_vector is None or second_vector is None or clusters.find(first) == clusters.find(second):
+                continue
+            first_vector, second_vector = np.asarray(first_vector), np.asarray(second_vector)
+            cosine = first_vector @ second_vector / (np.linalg.norm(first_vector) * np.linalg.norm(second_vector) or 1.0)
+            if cosine >= DEDUP_COSINE_THRESHOLD:
+                clusters.union(first, second)
+    cosine_count = sum(1 for index in range(len(jobs)) if clusters.find(index) != index) - minhash_count
+
+    members = {}
+    for index in range(len(jobs)):
+        members.setdefault(clusters.find(index), []).append(index)
+    canonical_jobs = []
+    for cluster in members.values():
+        canonical = max(cluster, key=lambda index: (len(jobs[index].get('text') or ""), -index))
+        variants = [_variant_link(jobs[index]) for index in cluster if index != canonical]
+        if variants:
+            jobs[canonical]['payload']['variants'] = variants
+        canonical_jobs.append(canonical)
+    kept = [jobs[index] for index in sorted(canonical_jobs)]
+
+    if minhash_count:
+        increment("jobs_deduplicated", minhash_count, reason="minhash")
+    if cosine_count:
+        increment("jobs_deduplicated", cosine_count, reason="cosine")
+    print(f"Deduplicated {len(jobs)} jobs into {len(kept)} ({minhash_count} near-identical, "
+          f"{cosine_count} by embedding; {len(borderline)} borderline pairs {'checked' if embed else 'kept apart'}).")
+    return kept
+
+
+# --- Inspect Duplicates --- #
+if __name__ == "__main__":
+    from data_loader import load_all_jobs
+    parser = argparse.ArgumentParser(description="Lists the near-duplicate job pairs found by MinHash/LSH (no embedding check).")
+    parser.add_argument('--jobs-csv', default='../data/jobs/Paraform_Jobs.csv')
+    parser.add_argument('--srn-dir', default='../utils/scrape-pdf/output/')
+    args = parser.parse_args()
+    jobs = load_all_jobs(args.jobs_csv, args.srn_dir)
+    merged, borderline = find_duplicate_pairs(jobs)
+    describe = lambda job: f"{job['payload'].get('role')} @ {job['payload'].get('company')} ({job['payload'].get('source')})"
+    for label, pairs in (("Merged", merged), ("Borderline (needs the embedding check)", borderline)):
+        print(f"\n{label}: {len(pairs)} pairs")
+        for first, second, jaccard in sorted(pairs, key=lambda pair: -pair[2]):
+            print(f"  {jaccard:.2f}  {describe(jobs[first])}  ~  {describe(jobs[second])}")
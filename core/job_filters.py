@@ -0,0 +1,187 @@
+import re
+import numpy as np
+from qdrant_client import models
+
+# --- Constants --- #
+# Open-ended ranges ("5+ years", "$200k+") are stored with this upper bound so range filters stay simple
+OPEN_RANGE_MAX = 1e9
+LOCATION_ALIASES = {
+    'nyc': 'new york', 'new york city': 'new york', 'ny': 'new york',
+    'sf': 'san francisco', 'san francisco bay area': 'bay area', 'sf bay area': 'bay area',
+    'la': 'los angeles', 'remote (us)': 'remote', 'remote us': 'remote', 'us remote': 'remote',
+}
+# Payload fields derived at ingest time and indexed in Qdrant
+NUMERIC_FIELDS = ('salary_min', 'salary_max', 'yoe_min', 'yoe_max')
+KEYWORD_FIELDS = ('location_keys', 'source_key')
+FILTER_KEYS = ('locations', 'sources', 'min_salary', 'max_salary', 'candidate_yoe')
+
+SALARY_PATTERN = re.compile(r'\$?\s*(\d+(?:[.,]\d+)*)\s*([km])?', re.IGNORECASE)
+YOE_PATTERN = re.compile(r'(\d+(?:\.\d+)?)')
+
+
+def _salary_amount(number, suffix):
+    value = float(number.replace(',', ''))
+    if suffix and suffix.lower() == 'k':
+        value *= 1_000
+    elif suffix and suffix.lower() == 'm':
+        value *= 1_000_000
+    return value
+
+
+def parse_salary_range(salary_text):
+    """Parses '$150k - $180k', '$120,000', '$200k+' into (min, max) dollars; (None, None) if unparseable."""
+    if not isinstance(salary_text, str):
+        return None, None
+    matches = SALARY_PATTERN.findall(salary_text)
+    if not matches:
+        return None, None
+    # '150-180k': a bare number takes the unit written on the other end of the range
+    default_suffix = next((suffix for _, suffix in reversed(matches) if suffix), '')
+    amounts = [_salary_amount(number, suffix or default_suffix) for number, suffix in matches]
+    if '+' in salary_text:
+        return amounts[0], OPEN_RANGE_MAX
+    return min(amounts), max(amounts)
+
+
+def parse_yoe_range(yoe_text):
+    """Parses '3 - 6 years', '5+ years', '2 years' into (min, max) years; (None, None) if unparseable."""
+    if not isinstance(yoe_text, str):
+        return None, None
+    numbers = [float(n) for n in YOE_PATTERN.findall(yoe_text)]
+    if not numbers:
+        return None, None
+    if '+' in yoe_text:
+        return numbers[0], OPEN_RANGE_MAX
+    return min(numbers), max(numbers)
+
+
+def normalize_location(location):
+    location = re.sub(r'\s+', ' ', location.strip().lower())
+    return LOCATION_ALIASES.get(location, location)
+
+
+def normalize_locations(locations_text):
+    """Splits 'New York, San Francisco' / 'NYC or Remote' into normalized location keys."""
+    if not isinstance(locations_text, str):
+        return []
+    parts = re.split(r'[,;/|]| or ', locations_text, flags=re.IGNORECASE)
+    return sorted({normalize_location(part) for part in parts if part.strip()})
+
+
+def normalize_source(source):
+    """'SRN PDF' -> 'srn_pdf', 'Paraform' -> 'paraform'."""
+    if not isinstance(source, str):
+        return None
+    return re.sub(r'[^a-z0-9]+', '_', source.strip().lower()).strip('_') or None
+
+
+def structured_job_fields(payload):
+    """Numeric salary/YOE ranges and normalized location/source keys derived from a job payload's raw fields."""
+    salary_min, salary_max = parse_salary_range(payload.get('salary'))
+    yoe_min, yoe_max = parse_yoe_range(payload.get('yoe'))
+    return {
+        'salary_min': salary_min,
+        'salary_max': salary_max,
+        'yoe_min': yoe_min,
+        'yoe_max': yoe_max,
+        'location_keys': normalize_locations(payload.get('locations')),
+        'source_key': normalize_source(payload.get('source')),
+    }
+
+
+def build_job_filter(locations=None, sources=None, min_salary=None, max_salary=None, candidate_yoe=None):
+    """Normalized filter dict (None when nothing is filtered).
+
+    Jobs match when they list one of the locations, come from one of the
+    sources, have a salary range overlapping [min_salary, max_salary] and a YOE
+    range containing candidate_yoe. Jobs without a filtered field never match it.
+    """
+    if isinstance(locations, str):
+        locations = [locations]
+    if isinstance(sources, str):
+        sources = [sources]
+    job_filter = {
+        'locations': sorted({normalize_location(loc) for loc in locations}) if locations else None,
+        'sources': sorted({normalize_source(src) for src in sources}) if sources else None,
+        'min_salary': float(min_salary) if min_salary is not None else None,
+        'max_salary': float(max_salary) if max_salary is not None else None,
+        'candidate_yoe': float(candidate_yoe) if candidate_yoe is not None else None,
+    }
+    return job_filter if any(value is not None for value in job_filter.values()) else None
+
+
+def to_qdrant_filter(job_filter):
+    """Translates a build_job_filter dict into a Qdrant payload filter."""
+    if not job_filter:
+        return None
+    must = []
+    if job_filter.get('locations'):
+        must.append(models.FieldCondition(key='location_keys', match=models.MatchAny(any=job_filter['locations'])))
+    if job_filter.get('sources'):
+        must.append(models.FieldCondition(key='source_key', match=models.MatchAny(any=job_filter['sources'])))
+    if job_filter.get('min_salary') is not None:
+        must.append(models.FieldCondition(key='salary_max', range=models.Range(gte=job_filter['min_salary'])))
+    if job_filter.get('max_salary') is not None:
+        must.append(models.FieldCondition(key='salary_min', range=models.Range(lte=job_filter['max_salary'])))
+    if job_filter.get('candidate_yoe') is not None:
+        must.append(models.FieldCondition(key='yoe_min', range=models.Range(lte=job_filter['candidate_yoe'])))
+        must.append(models.FieldCondition(key='yoe_max', range=models.Range(gte=job_filter['candidate_yoe'])))
+    return models.Filter(must=must) if must else None
+
+
+def create_job_payload_indexes(client, collection_name):
+    """Payload indexes backing the structured filters (creating an existing index is a no-op in Qdrant)."""
+    for field in NUMERIC_FIELDS:
+        client.create_payload_index(collection_name, field_name=field, field_schema=models.PayloadSchemaType.FLOAT)
+    for field in KEYWORD_FIELDS:
+        client.create_payload_index(collection_name, field_name=field, field_schema=models.PayloadSchemaType.KEYWORD)
+
+
+class JobFieldIndex:
+    """Column arrays and keyword bitmaps over the BM25 corpus, so the sparse leg applies the same filters as Qdrant."""
+
+    def __init__(self, payloads):
+        fields = [structured_job_fields(payload or {}) for payload in payloads]
+        self.size = len(fields)
+        # NaN marks a missing value; comparisons with NaN are False, so such jobs never match a range filter
+        self.columns = {
+            name: np.array([f[name] if f[name] is not None else np.nan for f in fields], dtype=np.float64)
+            for name in NUMERIC_FIELDS
+        }
+        self.bitmaps = {'location_keys': {}, 'source_key': {}}
+        for i, f in enumerate(fields):
+            for key in f['location_keys']:
+                self.bitmaps['location_keys'].setdefault(key, np.zeros(self.size, dtype=bool))[i] = True
+            if f['source_key']:
+                self.bitmaps['source_key'].setdefault(f['source_key'], np.zeros(self.size, dtype=bool))[i] = True
+        self._mask_cache = {}
+
+    def _any_of(self, field, keys):
+        mask = np.zeros(self.size, dtype=bool)
+        for key in keys:
+            bitmap = self.bitmaps[field].get(key)
+            if bitmap is not None:
+                mask |= bitmap
+        return mask
+
+    def mask(self, job_filter):
+        """Boolean mask of corpus positions matching the filter (None when unfiltered)."""
+        if not job_filter:
+            return None
+        cache_key = tuple((key, tuple(value) if isinstance(value, list) else value) for key, value in sorted(job_filter.items()))
+        mask = self._mask_cache.get(cache_key)
+        if mask is not None:
+            return mask
+        mask = np.ones(self.size, dtype=bool)
+        if job_filter.get('locations'):
+            mask &= self._any_of('location_keys', job_filter['locations'])
+        if job_filter.get('sources'):
+            mask &= self._any_of('source_key', job_filter['sources'])
+        if job_filter.get('min_salary') is not None:
+            mask &= self.columns['salary_max'] >= job_filter['min_salary']
+        if job_filter.get('max_salary') is not None:
+            mask &= self.columns['salary_min'] <= job_filter['max_salary']
+        if job_filter.get('candidate_yoe') is not None:
+            mask &= (self.columns['yoe_min'] <= job_filter['candidate_yoe']) & (self.columns['yoe_max'] >= job_filter['candidate_yoe'])
+        self._mask_cache[cache_key] = mask
+        return mask
@@ -1,16 +1,26 @@
 from clients import azure_client, azure_chat_deployment
-from prompts import TASK_1_PROMPT, TASK_2_PROMPT, LINKEDIN_OUTREACH
+from prompts import TASK_1_PROMPT, TASK_2_PROMPT, LINKEDIN_OUTREACH, BATCH_CANDIDATE_PROMPT, BATCH_CANDIDATE_BLOCK
+from metrics import timed, increment, record_token_usage
+from prompt_budget import budget_snippets, cap_skills, select_passages, count_tokens, JOB_REQUIREMENTS_TOKENS
+import json
+
+# --- Constants --- #
+BATCH_TOKENS_PER_CANDIDATE = 200 # Completion budget per candidate in a batched call (justification + message)
+LINKEDIN_MESSAGE_MAX_CHARS = 250
 
 ###### TASK 1 #######
+@timed("justification")
 def generate_justification_azure(resume_text, job_payload, score, model_deployment=azure_chat_deployment):
     """Generates justification using Azure OpenAI ChatCompletion."""
     try:
-        resume_snippet = resume_text # Increase snippet size slightly
         job_text = job_payload.get('text', 'N/A') if job_payload else 'N/A'
-        job_snippet = job_text
+        # Only the resume and job passages most relevant to each other, within the prompt token budget
+        resume_snippet, job_snippet = budget_snippets(resume_text, job_text)
+        increment("prompt_tokens_trimmed", count_tokens(resume_text) + count_tokens(job_text)
+                  - count_tokens(resume_snippet) - count_tokens(job_snippet), call="justification")
 
         prompt = TASK_1_PROMPT.format(
-            resume_snippet=resume_text,
+            resume_snippet=resume_snippet,
             role=job_payload.get('name', 'N/A') if job_payload else 'N/A',
             company=job_payload.get('company', 'N/A') if job_payload else 'N/A',
             job_source=job_payload.get('source', 'N/A') if job_payload else 'N/A',
@@ -29,32 +39,62 @@ def generate_justification_azure(resume_text, job_payload, score, model_deployme
             temperature=0.5,
             max_tokens=512
         )
+        record_token_usage("justification", response)
         justification = response.choices[0].message.content.strip()
         return justification
     except Exception as e:
         print(f"Error generating justification via Azure: {e}")
+        increment("api_errors", api="chat", call="justification")
         return "Could not generate justification due to an API error."
     
     
 ###### TASK 2 #######
+def _job_text(job_summary):
+    return " ".join(value for value in (job_summary.get('Requirements'), job_summary.get('Tech Stack')) if isinstance(value, str))
+
+
+def _budget_job_fields(job_summary, query_text):
+    """Job requirements / tech stack cut to the passages most relevant to query_text, within their token budgets."""
+    requirements = job_summary.get('Requirements', '')
+    tech_stack = job_summary.get('Tech Stack', '')
+    if isinstance(requirements, str):
+        requirements = select_passages(requirements, query_text, JOB_REQUIREMENTS_TOKENS)
+    if isinstance(tech_stack, str):
+        tech_stack = select_passages(tech_stack, query_text, JOB_REQUIREMENTS_TOKENS // 2)
+    return requirements, tech_stack
+
+
+def _budget_candidate_fields(candidate_summary, job_summary):
+    """Skills (job-relevant first) and job requirements / tech stack, capped to their token budgets."""
+    skills_str = cap_skills(candidate_summary.get('skills', []), _job_text(job_summary))
+    requirements, tech_stack = _budget_job_fields(job_summary, skills_str)
+    return skills_str, requirements, tech_stack
+
+
+def _format_score_details(score_details):
+    return "\n".join([f"- {key.replace('_', ' ').title()}: {value}" for key, value in score_details.items()])
+
+
+@timed("candidate_justification")
 def generate_candidate_justification_azure(candidate_summary, job_summary, score, score_details, model_deployment=azure_chat_deployment):
     """Generates justification for a candidate match using Azure OpenAI."""
     try:
         # Format score details for the prompt
-        details_str = "\n".join([f"- {key.replace('_', ' ').title()}: {value}" for key, value in score_details.items()])
+        details_str = _format_score_details(score_details)
+        skills_str, requirements, tech_stack = _budget_candidate_fields(candidate_summary, job_summary)
 
         prompt = TASK_2_PROMPT.format(
             candidate_summary.get('name', 'Candidate'),
             candidate_summary.get('current_title', 'your current role'),
             candidate_summary.get('location', 'your location'),
             candidate_summary.get('years_of_experience', 'N/A'),
-            ', '.join(candidate_summary.get('skills', [])),
+            skills_str,
             candidate_summary.get('linkedin_url', 'N/A'),
             job_summary.get('Role', 'an exciting role'),
             job_summary.get('Company', 'our company'),
             job_summary.get('YOE', 'N/A'),
-            job_summary.get('Requirements', ''),
-            job_summary.get('Tech Stack', ''),
+            requirements,
+            tech_stack,
             score,
             details_str,
             score
@@ -69,25 +109,28 @@ def generate_candidate_justification_azure(candidate_summary, job_summary, score
             temperature=0.5,
             max_tokens=100
         )
+        record_token_usage("candidate_justification", response)
         justification = response.choices[0].message.content.strip()
         return justification
     except Exception as e:
         print(f"Error generating justification via Azure: {e}")
+        increment("api_errors", api="chat", call="candidate_justification")
         return "Could not generate justification due to an API error."
     
 
+@timed("linkedin_message")
 def generate_linkedin_message_azure(candidate_summary, job_summary, model_deployment=azure_chat_deployment):
     """Generates a concise LinkedIn outreach message using Azure OpenAI."""
     try:
-        
+        skills_str, requirements, tech_stack = _budget_candidate_fields(candidate_summary, job_summary)
         prompt = LINKEDIN_OUTREACH.format(
             candidate_summary.get('name', 'Candidate'),
             candidate_summary.get('current_title', 'your current role'),
-            ', '.join(candidate_summary.get('skills', [])),
+            skills_str,
             job_summary.get('Role', 'an exciting role'),
             job_summary.get('Company', 'our company'),
-            job_summary.get('Requirements', ''),
-            job_summary.get('Tech Stack', ''),
+            requirements,
+            tech_stack,
             candidate_summary.get('name', 'Candidate'),
             job_summary.get('Role', 'role'),
             job_summary.get('Company', 'our company')
@@ -102,8 +145,106 @@ def generate_linkedin_message_azure(candidate_summary, job_summary, model_deploy
             temperature=0.7, 
             max_tokens=70 
         )
+        record_token_usage("linkedin_message", response)
         message = response.choices[0].message.content.strip()
-        return message[:250]
+        return message[:LINKEDIN_MESSAGE_MAX_CHARS]
     except Exception as e:
         print(f"Error generating LinkedIn message via Azure: {e}")
-        return "Could not generate message due to an API error."
\ No newline at end of file
+        increment("api_errors", api="chat", call="linkedin_message")
+        return "Could not generate message due to an API error."
+
+
+def parse_candidate_batch(content, candidate_ids):
+    """Validated {id: (justification, linkedin_message)} from a batched completion.
+
+    Entries with an unknown or repeated id, or without both non-empty strings, are left out.
+    """
+    start, end = content.find('{'), content.rfind('}')
+    if start == -1 or end < start:
+        return {}
+    try:
+        data = json.loads(content[start:end + 1]) # Tolerates code fences or text around the JSON object
+    except json.JSONDecodeError:
+        return {}
+    entries = data.get('candidates') if isinstance(data, dict) else None
+    if not isinstance(entries, list):
+        return {}
+    parsed = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            candidate_id = int(entry.get('id'))
+        except (TypeError, ValueError):
+            continue
+        justification = entry.get('justification')
+        message = entry.get('linkedin_message')
+        if candidate_id not in candidate_ids or candidate_id in parsed:
+            continue
+        if not (isinstance(justification, str) and justification.strip() and isinstance(message, str) and message.strip()):
+            continue
+        parsed[candidate_id] = (justification.strip(), message.strip()[:LINKEDIN_MESSAGE_MAX_CHARS])
+    return parsed
+
+
+@timed("candidate_batch")
+def generate_candidate_batch_azure(candidates, job_summary, model_deployment=azure_chat_deployment):
+    """Justifications and LinkedIn messages for several candidates from one chat call that sends the job context once.
+
+    candidates is a list of (candidate_summary, score, score_details). Returns a
+    parallel list of (justification, linkedin_message), with None wherever the
+    output was missing or invalid (everywhere if the call failed), so callers can
+    fall back to the per-candidate functions.
+    """
+    if not candidates:
+        return []
+    candidate_ids = list(range(1, len(candidates) + 1))
+    parsed = {}
+    try:
+        job_text = _job_text(job_summary)
+        skills = [cap_skills(summary.get('skills', []), job_text) for summary, _, _ in candidates]
+        requirements, tech_stack = _budget_job_fields(job_summary, " ".join(skills))
+        blocks = [
+            BATCH_CANDIDATE_BLOCK.format(
+                id=candidate_id,
+                name=summary.get('name', 'Candidate'),
+                title=summary.get('current_title', 'N/A'),
+                location=summary.get('location', 'N/A'),
+                yoe=summary.get('years_of_experience', 'N/A'),
+                skills=skills_str,
+                score=score,
+                details=_format_score_details(score_details)
+            )
+            for candidate_id, (summary, score, score_details), skills_str in zip(candidate_ids, candidates, skills)
+        ]
+        prompt = BATCH_CANDIDATE_PROMPT.format(
+            role=job_summary.get('Role', 'an exciting role'),
+            company=job_summary.get('Company', 'our company'),
+            yoe=job_summary.get('YOE', 'N/A'),
+            requirements=requirements,
+            tech_stack=tech_stack,
+            candidates="\n".join(blocks),
+            candidate_ids=", ".join(str(candidate_id) for candidate_id in candidate_ids)
+        )
+
+        response = azure_client.chat.completions.create(
+            model=model_deployment,
+            messages=[
+                {"role": "system", "content": "You are an expert recruitment assistant explaining candidate-job fit and drafting concise LinkedIn outreach. Reply with JSON only."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.5,
+            max_tokens=BATCH_TOKENS_PER_CANDIDATE * len(candidates),
+            response_format={"type": "json_object"}
+        )
+        record_token_usage("candidate_batch", response)
+        parsed = parse_candidate_batch(response.choices[0].message.content or "", set(candidate_ids))
+    except Exception as e:
+        print(f"Error generating batched justifications via Azure: {e}")
+        increment("api_errors", api="chat", call="candidate_batch")
+    results = [parsed.get(candidate_id) for candidate_id in candidate_ids]
+    missing = results.count(None)
+    if missing:
+        print(f"Batched generation returned no valid output for {missing}/{len(candidates)} candidates; falling back per candidate.")
+        increment("batch_fallbacks", missing, call="candidate_batch")
+    return results
@@ -3,106 +3,98 @@ from data_loader import *
 from vector_db import *
 from justification import *
 from html_output import *
+from async_pipeline import PipelineStage, run_pipeline
+from metrics import write_metrics_report
+from profiling import profile_run
+from job_filters import JobFieldIndex, build_job_filter
+from fusion import DENSE_DEPTH, SPARSE_DEPTH
+from reranking import RERANK, get_reranker, rerank_results
+from job_dedup import JOB_DEDUP, deduplicate_jobs
+from result_export import TASK1_RESULTS_EXPORT, TASK1_FIELDS, open_exporter, task1_export_rows
+import argparse
 import uuid
 
 RESUME_DIR = '../data/resumes/'
 PARA_JOB_CSV = '../data/jobs/Paraform_Jobs.csv'
 SRN_JOBS_DIR = '../utils/scrape-pdf/output/'
+OUTPUT_HTML_FILE = '../output/resume_job_matches.html'
 
-def main_task1_hybrid_pipeline(resume_dir, para_job_csv, srn_job_dir):
-    """Runs the entire Task 1 pipeline using hybrid search."""
+def build_task1_stages(resume_dir, bm25, job_corpus_ids, job_filter=None, job_field_index=None, chunked=False, rerank=False):
+    """Splits per-resume matching into parse, embed, search, fuse and justify stages.
 
-    print("--- Loading & Indexing Jobs ---")
-    try:
-        paraform_jobs = load_paraform_jobs(para_job_csv)
-        srn_jobs = []
-        for filename in os.listdir(srn_job_dir):
-            if filename.endswith(".pdf"):
-                srn_jobs.extend(load_srn_jobs(os.path.join(srn_job_dir, filename)))
-        all_jobs = paraform_jobs + srn_jobs
-        
-        for job in all_jobs:
-            job['id'] = str(uuid.uuid4())
-            
-        if not all_jobs:
-            print("Halting pipeline: No job data loaded.")
-            return None, None
-        index_jobs_to_qdrant(all_jobs, QDRANT_COLLECTION_NAME)
-    except Exception as e:
-         print(f"Qdrant collection '{QDRANT_COLLECTION_NAME}' not found or error checking. Attempting to index jobs...")
-         paraform_jobs = load_paraform_jobs(para_job_csv)
-         srn_jobs = load_srn_jobs(srn_job_dir)
-         all_jobs = paraform_jobs + srn_jobs
-
-         if not all_jobs:
-             print("Halting pipeline: No job data loaded.")
-             return None, None
-         index_jobs_to_qdrant(all_jobs, QDRANT_COLLECTION_NAME)
-
-
-    # --- 2. Prepare BM25 Index (Needs job texts) --- #
-    print("\n--- Preparing BM25 Index ---")
-    job_corpus_texts = [job['text'] for job in all_jobs]
-    job_corpus_ids = [job['id'] for job in all_jobs]
+    job_filter restricts both search legs: server-side in Qdrant, and via a
+    bitmap mask from job_field_index (aligned with job_corpus_ids) for BM25.
+    With chunked=True the dense leg embeds resume chunks and matches them
+    against job chunks (MaxSim) instead of using one vector per document.
+    With rerank=True a cross-encoder reorders the fused results before the top 2 are justified.
+    """
+    sparse_mask = job_field_index.mask(job_filter) if job_field_index is not None else None
 
-    if not job_corpus_texts:
-         print("Error: No job text available for BM25 index. Sparse search disabled.")
-         bm25 = None
-    else:
-        tokenized_corpus = [preprocess_text_for_bm25(doc) for doc in job_corpus_texts]
-        bm25 = BM25Okapi(tokenized_corpus)
-        print("BM25 index prepared.")
-
-    # --- 3. Load Resumes --- #
-    print("\n--- Loading Resumes ---")
-    resume_files = [f for f in os.listdir(resume_dir) if f.lower().endswith('.pdf')]
-    if not resume_files:
-        print(f"Halting pipeline: No PDF resumes found in {resume_dir}")
-        return bm25, job_corpus_ids
-
-    results = []
-
-    # --- 4. Process Each Resume --- #
-    print("\n--- Processing Resumes ---")
-    for resume_filename in resume_files:
+    def parse_stage(resume_filename):
         print(f"\n--- Matching Resume: {resume_filename} ---")
-        resume_path = os.path.join(resume_dir, resume_filename)
-        resume_text = parse_pdf_resume(resume_path)
-
+        resume_text = parse_pdf_resume(os.path.join(resume_dir, resume_filename))
         if not resume_text:
             print(f"Skipping {resume_filename} due to parsing error.")
-            continue
+            return None
+        return {"resume_name": resume_filename, "resume_text": resume_text}
 
-        # --- 5. Perform Hybrid Search --- #
-        print("Performing dense search...")
-        dense_results = perform_dense_search(resume_text, top_k=20)
-        print(f"Dense search returned {len(dense_results)} results.")
+    def embed_stage(item):
+        if chunked:
+            item['query_vector'] = embed_query_chunks(item['resume_text']) # One vector per resume chunk
+        else:
+            item['query_vector'] = embed_text(item['resume_text'])
+        return item
+
+    # --- 5. Perform Hybrid Search --- #
+    def search_stage(item):
+        if item['query_vector'] is None:
+            print(f"Skipping dense search for {item['resume_name']} (embedding failed).")
+            item['dense_results'] = []
+        else:
+            print(f"Performing dense search for {item['resume_name']}...")
+            if chunked:
+                item['dense_results'] = perform_multivector_search(item['query_vector'], top_k=DENSE_DEPTH, job_filter=job_filter)
+            else:
+                item['dense_results'] = perform_dense_search(
+                    item['resume_text'], top_k=DENSE_DEPTH, query_vector=item['query_vector'], job_filter=job_filter
+                )
+            print(f"Dense search returned {len(item['dense_results'])} results.")
 
-        sparse_results = []
+        item['sparse_results'] = []
         if bm25:
-            print("Performing sparse search...")
-            sparse_results = perform_sparse_search(resume_text, bm25, job_corpus_ids, top_k=20)
-            print(f"Sparse search returned {len(sparse_results)} results.")
+            print(f"Performing sparse search for {item['resume_name']}...")
+            item['sparse_results'] = perform_sparse_search(item['resume_text'], bm25, job_corpus_ids, top_k=SPARSE_DEPTH, mask=sparse_mask)
+            print(f"Sparse search returned {len(item['sparse_results'])} results.")
         else:
             print("Skipping sparse search (BM25 index not available).")
-
-        print("Combining results using RRF...")
-        hybrid_results = combine_results_rrf(dense_results, sparse_results)
-        print(f"Hybrid search yielded {len(hybrid_results)} combined results.")
-
-        # --- 6. Generate Justifications for Top 2 ---
-        top_2_matches = hybrid_results[:2]
+        return item
+
+    def fuse_stage(item):
+        print(f"Combining results using RRF for {item['resume_name']}...")
+        item['hybrid_results'] = combine_results_rrf(item['dense_results'], item['sparse_results'])
+        print(f"Hybrid search yielded {len(item['hybrid_results'])} combined results.")
+        return item
+
+    def rerank_stage(item):
+        print(f"Reranking fused results for {item['resume_name']}...")
+        item['hybrid_results'] = rerank_results(item['resume_text'], item['hybrid_results'])
+        return item
+
+    # --- 6. Generate Justifications for Top 2 ---
+    def justify_stage(item):
+        resume_filename = item['resume_name']
+        top_2_matches = item['hybrid_results'][:2]
         match_details_with_justification = []
 
         if not top_2_matches:
             print(f"No matches found for {resume_filename}.")
         else:
-            print(f"Generating justifications for top {len(top_2_matches)} matches...")
-            for match in top_2_matches:
+            print(f"Generating justifications for top {len(top_2_matches)} matches of {resume_filename}...")
+            # Fit scores follow the fused ranking score (one calibrated lookup for all matches)
+            fit_scores = score_fit_hybrid([match['fusion_score'] for match in top_2_matches]).tolist()
+            for match, fit_score in zip(top_2_matches, fit_scores):
                 job_payload = match['payload']
-                # Use RRF score for fit scoring
-                fit_score = score_fit_hybrid(match['rrf_score'])
-                justification = generate_justification_azure(resume_text, job_payload, fit_score)
+                justification = generate_justification_azure(item['resume_text'], job_payload, fit_score)
 
                 # Construct job details string from payload
                 job_details_str = (
@@ -114,33 +106,125 @@ def main_task1_hybrid_pipeline(resume_dir, para_job_csv, srn_job_dir):
                     "job_details": job_details_str,
                     "fit_score": fit_score,
                     "justification": justification,
-                    "rrf_score": match['rrf_score'] # Keep for reference
+                    "rrf_score": match['rrf_score'], # Keep for reference
+                    "fusion_score": match['fusion_score'],
+                    # Raw fields for the machine-readable export
+                    "job_id": match['id'],
+                    "dense_rank": match.get('dense_rank'),
+                    "sparse_rank": match.get('sparse_rank'),
+                    "job_role": job_payload.get('role') or job_payload.get('name'),
+                    "job_company": job_payload.get('company'),
+                    "job_source": job_payload.get('source'),
                 })
 
-        results.append({
+        return {
             "resume_name": resume_filename,
             "top_matches": match_details_with_justification
-        })
+        }
+
+    stages = [
+        PipelineStage("parse", parse_stage),
+        PipelineStage("embed", embed_stage, workers=2),
+        PipelineStage("search", search_stage, workers=2),
+        PipelineStage("fuse", fuse_stage),
+    ]
+    if rerank:
+        stages.append(PipelineStage("rerank", rerank_stage)) # One worker: ONNX Runtime already uses every core
+    stages.append(PipelineStage("justify", justify_stage, workers=2))
+    return stages
+
+def main_task1_hybrid_pipeline(resume_dir, para_job_csv, srn_job_dir, async_stages=False, job_filter=None, chunked=CHUNKED_EMBEDDINGS,
+                               export_path=TASK1_RESULTS_EXPORT, rerank=RERANK, dedup=JOB_DEDUP):
+    """Runs the entire Task 1 pipeline using hybrid search.
+
+    With async_stages=True the per-resume stages run concurrently, connected by
+    bounded queues, so one resume is justified while the next one is embedded.
+    job_filter (see job_filters.build_job_filter) limits matches to e.g. a location or salary range.
+    chunked=True additionally indexes job chunks and matches resume chunks against them.
+    export_path (.jsonl file or .parquet directory) also appends every match as a row (see result_export).
+    rerank=True reorders the fused results with a local cross-encoder (see reranking) before justification.
+    dedup=True collapses near-duplicate postings into one canonical job each before indexing (see job_dedup).
+    """
+    if rerank:
+        get_reranker() # Load the model up front so its load time is not charged to the first resume's budget
+
+    print("--- Loading & Indexing Jobs ---")
+    all_jobs = load_all_jobs(para_job_csv, srn_job_dir)
+    if not all_jobs:
+        print("Halting pipeline: No job data loaded.")
+        return None, None
+    if dedup:
+        all_jobs = deduplicate_jobs(all_jobs, embed=lambda texts: embed_texts_in_order(texts, "dedup_embedding"))
+    index_jobs_to_qdrant(all_jobs, QDRANT_COLLECTION_NAME)
+    if chunked:
+        index_job_chunks_to_qdrant(all_jobs, QDRANT_CHUNK_COLLECTION_NAME)
+
+
+    # --- 2. Prepare BM25 Index (Needs job texts) --- #
+    print("\n--- Preparing BM25 Index ---")
+    job_corpus_texts = [job['text'] for job in all_jobs]
+    job_corpus_ids = [job['id'] for job in all_jobs]
+
+    bm25 = build_bm25_index(job_corpus_texts)
+    if bm25 is None:
+         print("Error: No job text available for BM25 index. Sparse search disabled.")
+    else:
+        print("BM25 index prepared.")
+
+    # --- 3. Load Resumes --- #
+    print("\n--- Loading Resumes ---")
+    resume_files = [f for f in os.listdir(resume_dir) if f.lower().endswith('.pdf')]
+    if not resume_files:
+        print(f"Halting pipeline: No PDF resumes found in {resume_dir}")
+        return bm25, job_corpus_ids
+
+    # --- 4. Process Each Resume --- #
+    print("\n--- Processing Resumes ---")
+    job_field_index = JobFieldIndex([job['payload'] for job in all_jobs]) if job_filter else None
+    stages = build_task1_stages(resume_dir, bm25, job_corpus_ids, job_filter, job_field_index, chunked, rerank)
+    # --- 7. Stream Results into the Report --- #
+    # Each resume's rows are written as soon as it leaves the pipeline, so results are never held in memory
+    with task1_report_writer(OUTPUT_HTML_FILE) as report, open_exporter(export_path, TASK1_FIELDS) as exporter:
+        def handle_result(result):
+            write_task1_result(report, result)
+            if exporter is not None:
+                exporter.add_rows(task1_export_rows(result))
+
+        result_count = run_pipeline(resume_files, stages, async_stages=async_stages, on_result=handle_result)
 
-    # --- 7. Display Results --- #
     print("\n\n--- FINAL RESULTS ---")
-    if not results:
+    if not result_count:
         print("No matching results were generated.")
     else:
-        table_data = format_results_for_table(results)
-        df = pd.DataFrame(table_data)
-        html_output = generate_html_table(results, df)
-        with open("../output/resume_job_matches.html", "w") as f:
-            f.write(html_output)
-
-        print(f"\nHTML table saved to: {os.path.abspath('task1_job_matches.html')}")
+        print(f"\nHTML table for {result_count} resumes ({report.row_count} rows) saved to: "
+              f"{', '.join(os.path.abspath(path) for path in report.paths)}")
     print("--- END OF RESULTS ---")
 
     return bm25, job_corpus_ids
 
 # --- Run the Pipeline --- #
 if __name__ == "__main__":
-    if not all([azure_endpoint, azure_api_key, azure_api_version, azure_chat_deployment, azure_embedding_deployment]):
+    parser = argparse.ArgumentParser(description="Task 1: match resumes to jobs with hybrid search.")
+    parser.add_argument('--async-stages', action='store_true', help="Overlap parsing, embedding, search and justification across resumes.")
+    parser.add_argument('--metrics-report', default=None, help="Write stage timings and counters here at the end of the run (.json for JSON, otherwise Prometheus text). Defaults to $METRICS_REPORT.")
+    parser.add_argument('--profile', default=None, metavar='OUTPUT_PREFIX', help="Sample the run and write <prefix>.collapsed, <prefix>.speedscope.json and a per-stage hot-function summary. Defaults to $SYNAPSE_PROFILE.")
+    parser.add_argument('--export', default=TASK1_RESULTS_EXPORT, metavar='PATH', help="Also append all matches to a .jsonl file or a .parquet dataset directory. Defaults to $TASK1_RESULTS_EXPORT.")
+    parser.add_argument('--chunked', action=argparse.BooleanOptionalAction, default=CHUNKED_EMBEDDINGS, help="Match resume chunks against job chunks (multi-vector MaxSim). Defaults to $CHUNKED_EMBEDDINGS.")
+    parser.add_argument('--rerank', action=argparse.BooleanOptionalAction, default=RERANK, help="Rerank the fused top-N with a local cross-encoder before justification. Defaults to $RERANK.")
+    parser.add_argument('--job-dedup', action=argparse.BooleanOptionalAction, default=JOB_DEDUP, help="Collapse near-duplicate jobs before indexing. Defaults to $JOB_DEDUP.")
+    parser.add_argument('--location', action='append', help="Only match jobs in this location (repeatable, e.g. 'New York', 'SF').")
+    parser.add_argument('--source', action='append', help="Only match jobs from this source (repeatable: 'Paraform', 'SRN PDF').")
+    parser.add_argument('--min-salary', type=float, help="Only match jobs whose salary range reaches this amount (USD/year).")
+    parser.add_argument('--max-salary', type=float, help="Only match jobs whose salary range starts at or below this amount.")
+    parser.add_argument('--yoe', type=float, help="Only match jobs whose required years of experience include this value.")
+    args = parser.parse_args()
+    job_filter = build_job_filter(args.location, args.source, args.min_salary, args.max_salary, args.yoe)
+    if not all([azure_endpoint, azure_api_key, azure_api_version, azure_chat_deployment]) or \
+            (EMBEDDING_PROVIDER == "azure" and not azure_embedding_deployment): # Local embeddings need no embedding deployment
          print("\nERROR: Azure OpenAI environment variables are not fully set. Please check your .env file or environment.")
     else:
-        _, _ = main_task1_hybrid_pipeline(RESUME_DIR, PARA_JOB_CSV, SRN_JOBS_DIR)
\ No newline at end of file
+        with profile_run(args.profile):
+            _, _ = main_task1_hybrid_pipeline(RESUME_DIR, PARA_JOB_CSV, SRN_JOBS_DIR, async_stages=args.async_stages,
+                                              job_filter=job_filter, chunked=args.chunked, export_path=args.export,
+                                              rerank=args.rerank, dedup=args.job_dedup)
+        write_metrics_report(args.metrics_report)
\ No newline at end of file
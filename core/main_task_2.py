@@ -1,22 +1,40 @@
 import pandas as pd
 import json
 import random
+import heapq
 from clients import *
 from justification import *
 from html_output import *
+from async_pipeline import PipelineStage, run_pipeline
+from metrics import increment, set_gauge, stage_timer, write_metrics_report
+from profiling import profile_run
+from result_export import TASK2_RESULTS_EXPORT, TASK2_FIELDS, open_exporter, task2_export_rows
+import argparse
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.helper_task_2 import *
+from utils.skill_matcher import extract_job_skills
+from utils.title_matcher import title_similarity_matrix, title_cache_info
 
 PARA_JOB_CSV = '../data/jobs/Paraform_Jobs.csv'
 CANDIDATE_CSV = '../data/candidates/JuiceboxExport_1743820890826.csv'
 LINKEDIN_JSON = '../data/candidates/first_five_profiles.json'
 OUTPUT_HTML_FILE = '../output/task2_candidate_results.html'
+TOP_K_CANDIDATES = 10
+CANDIDATE_BATCH_SIZE = 10 # Candidates per batched justification/outreach call
+# Skip skill extraction and scoring for candidates whose score upper bound cannot enter the top-k (never changes the ranking)
+SCORE_BOUND_PRUNING = os.getenv("SCORE_BOUND_PRUNING", "true").lower() == "true"
 
 
-def main_task2_pipeline(para_job_csv, candidate_csv, linkedin_json):
-    """Runs the entire Task 2 pipeline."""
+def main_task2_pipeline(para_job_csv, candidate_csv, linkedin_json, async_stages=False, batched=False, export_path=TASK2_RESULTS_EXPORT):
+    """Runs the entire Task 2 pipeline.
+
+    With async_stages=True the justification and outreach calls for the top
+    candidates overlap instead of running one after another. With batched=True
+    both are generated for up to CANDIDATE_BATCH_SIZE candidates per chat call.
+    export_path (.jsonl file or .parquet directory) also appends the ranked candidates as rows.
+    """
 
     # --- 1. Load Data --- #
     print("--- Loading Data ---")
@@ -30,31 +48,10 @@ def main_task2_pipeline(para_job_csv, candidate_csv, linkedin_json):
         print(f"Error loading jobs CSV: {e}")
         return
 
-    try:
-        candidates_df = pd.read_csv(candidate_csv)
-        candidates_df['Full Name'] = candidates_df['First name'].fillna('') + ' ' + candidates_df['Last name'].fillna('')
-        candidates_df['LinkedIn'] = candidates_df['LinkedIn'].str.strip()
-        print(f"Loaded {len(candidates_df)} candidates.")
-    except FileNotFoundError:
-        print(f"Error: Candidate CSV not found at {candidate_csv}")
-        return
-    except Exception as e:
-        print(f"Error loading candidates CSV: {e}")
+    candidates_df = load_candidates(candidate_csv)
+    if candidates_df is None:
         return
-
-    linkedin_profiles = {}
-    try:
-        with open(linkedin_json, 'r') as f:
-            linkedin_data_list = json.load(f)
-        for profile in linkedin_data_list:
-            profile_url = f"https://linkedin.com/in/{profile.get('public_identifier', '')}".strip()
-            if profile_url:
-                 linkedin_profiles[profile_url] = profile
-        print(f"Loaded {len(linkedin_profiles)} scraped LinkedIn profiles.")
-    except FileNotFoundError:
-        print(f"Warning: LinkedIn JSON not found at {linkedin_json}. Enhancement will be limited.")
-    except Exception as e:
-        print(f"Error loading LinkedIn JSON: {e}")
+    linkedin_profiles = load_linkedin_profiles(linkedin_json)
 
 
     # --- 2. Select Job --- #
@@ -62,55 +59,57 @@ def main_task2_pipeline(para_job_csv, candidate_csv, linkedin_json):
     selected_job_index = random.randint(0, len(jobs_df) - 1)
     selected_job = jobs_df.iloc[selected_job_index].to_dict()
     print(f"Selected Job: {selected_job.get('Role', 'N/A')} at {selected_job.get('Company', 'N/A')}")
-    job_summary = {
-        'Role': selected_job.get('Role'),
-        'Company': selected_job.get('Company'),
-        'YOE': selected_job.get('YOE'),
-        'Requirements': selected_job.get('Requirements', ''),
-        'Tech Stack': selected_job.get('Tech Stack', ''),
-        'Industry': selected_job.get('Industry', '')
-    }
+    job_summary = build_job_summary(selected_job)
 
 
     # --- 3. Process & Score Candidates --- #
     print("\n--- Processing and Scoring Candidates ---")
-    candidate_scores = []
+    # Score all distinct titles against the role in one bulk pass; per-candidate lookups then hit the cache
+    title_similarity_matrix(candidates_df['Current Title'].tolist(), [job_summary['Role']])
+    # Bounded min-heap of lightweight (score, -index, index, details) records for the current top-k
+    top_k_heap = []
+    pruned_count = 0
 
     for index, cand_row in candidates_df.iterrows():
         print(f"Processing candidate {index+1}/{len(candidates_df)}: {cand_row['Full Name']}")
         juicebox_info = cand_row.to_dict()
-        linkedin_url = juicebox_info.get('LinkedIn')
-        scraped_profile = None
-
-        if linkedin_url and linkedin_url in linkedin_profiles:
-            scraped_profile = linkedin_profiles[linkedin_url]
-        candidate_unified = {
-            'name': juicebox_info.get('Full Name'),
-            'linkedin': linkedin_url,
-            'location': juicebox_info.get('Location'),
-            'current_title': juicebox_info.get('Current Title')
-        }
+        scraped_profile = linkedin_profiles.get(juicebox_info.get('LinkedIn'))
+        candidate_unified = build_candidate_profile(juicebox_info, scraped_profile, job_summary)
         if scraped_profile:
-             candidate_unified['current_title'] = scraped_profile.get('occupation', candidate_unified['current_title'])
-             candidate_unified['headline'] = scraped_profile.get('headline')
-             candidate_unified['summary'] = scraped_profile.get('summary')
-             candidate_unified['experiences'] = scraped_profile.get('experiences', [])
-             candidate_unified['skills_direct'] = scraped_profile.get('skills', [])
-             yoe, hopping = calculate_experience_details(candidate_unified['experiences'])
-             candidate_unified['yoe'] = yoe
-             print(f"Calculated YOE: {yoe} years")
-             print(f"Job Hopping: {hopping}")
-             candidate_unified['job_hopping'] = hopping
-             candidate_unified['startup_fit'] = check_startup_fit(candidate_unified['experiences'], job_summary)
-        else:
-             candidate_unified['yoe'] = 0 
-             candidate_unified['job_hopping'] = False
-             candidate_unified['startup_fit'] = 0.5
-        candidate_unified['skills'] = extract_skills(scraped_profile, juicebox_info)
+             print(f"Calculated YOE: {candidate_unified['yoe']} years")
+             print(f"Job Hopping: {candidate_unified['job_hopping']}")
+
+        # Early cutoff: skip skill extraction and scoring if even a perfect tech stack match cannot enter the top-k
+        if SCORE_BOUND_PRUNING and len(top_k_heap) == TOP_K_CANDIDATES \
+                and score_upper_bound(candidate_unified, job_summary) <= top_k_heap[0][0]:
+            pruned_count += 1
+            continue
 
-        score, score_details, overlap_skills = score_candidate_fit(candidate_unified, job_summary)
+        with stage_timer("score_candidate"):
+            candidate_unified['skills'] = extract_skills(scraped_profile, juicebox_info)
+            score, score_details, overlap_skills = score_candidate_fit(candidate_unified, job_summary)
 
-        candidate_scores.append({
+        # Ties keep the earlier candidate, matching a stable descending sort
+        record = (score, -index, index, score_details)
+        if len(top_k_heap) < TOP_K_CANDIDATES:
+            heapq.heappush(top_k_heap, record)
+        elif record > top_k_heap[0]:
+            heapq.heapreplace(top_k_heap, record)
+
+
+    # --- 4. Rank Candidates --- #
+    print("\n--- Ranking Candidates ---")
+    if pruned_count:
+        increment("candidates_pruned", pruned_count)
+        print(f"Pruned {pruned_count} candidates by score upper bound.")
+    top_candidates = []
+    for score, _, index, score_details in sorted(top_k_heap, reverse=True):
+        # Materialize the full candidate summary only for the winners
+        juicebox_info = candidates_df.loc[index].to_dict()
+        scraped_profile = linkedin_profiles.get(juicebox_info.get('LinkedIn'))
+        candidate_unified = build_candidate_profile(juicebox_info, scraped_profile, job_summary)
+        candidate_unified['skills'] = extract_skills(scraped_profile, juicebox_info)
+        top_candidates.append({
             'Name': candidate_unified['name'],
             'LinkedIn': candidate_unified['linkedin'],
             'Score': score,
@@ -118,43 +117,99 @@ def main_task2_pipeline(para_job_csv, candidate_csv, linkedin_json):
             'Summary': candidate_unified
         })
 
-
-    # --- 4. Rank Candidates --- #
-    print("\n--- Ranking Candidates ---")
-    ranked_candidates = sorted(candidate_scores, key=lambda x: x['Score'], reverse=True)
-    top_candidates = ranked_candidates[:10]
-
     # --- 5. Generate Justifications & Messages for Top Candidates --- #
     print("\n--- Generating Justifications & Messages for Top Candidates ---")
-    results_table = []
-    for i, cand in enumerate(top_candidates):
-        print(f"Generating justification for: {cand['Name']} (Rank {i+1}, Score: {cand['Score']})")
+
+    def justify_stage(item):
+        rank, cand = item
+        print(f"Generating justification for: {cand['Name']} (Rank {rank}, Score: {cand['Score']})")
         justification = generate_candidate_justification_azure(
             cand['Summary'], job_summary, cand['Score'], cand['Details']
         )
+        return rank, cand, justification
+
+    def outreach_stage(item):
+        rank, cand, justification = item
         linkedin_message = generate_linkedin_message_azure(cand['Summary'], job_summary)
-        
-        results_table.append({
-            'Rank': i + 1,
-            'Name': cand['Name'],
-            'LinkedIn': cand['LinkedIn'],
-            'Score': cand['Score'],
-            'Why': justification,
-            'LinkedIn Message (Optional)': linkedin_message
-        })
+        return result_row(rank, cand, justification, linkedin_message)
+
+    def batch_stage(batch):
+        print(f"Generating justifications and messages for ranks {batch[0][0]}-{batch[-1][0]} in one call")
+        generated = generate_candidate_batch_azure(
+            [(cand['Summary'], cand['Score'], cand['Details']) for _, cand in batch], job_summary
+        )
+        rows = []
+        for (rank, cand), output in zip(batch, generated):
+            if output is None:
+                # Invalid or missing batch output: fall back to the per-candidate calls
+                _, _, justification = justify_stage((rank, cand))
+                rows.append(outreach_stage((rank, cand, justification)))
+            else:
+                rows.append(result_row(rank, cand, *output))
+        return rows
+
+    ranked = [(i + 1, cand) for i, cand in enumerate(top_candidates)]
+    if batched:
+        batches = [ranked[i:i + CANDIDATE_BATCH_SIZE] for i in range(0, len(ranked), CANDIDATE_BATCH_SIZE)]
+        batch_rows = run_pipeline(batches, [PipelineStage("generate_batch", batch_stage, workers=2)], async_stages=async_stages)
+        results_table = [row for rows in batch_rows for row in rows]
+    else:
+        stages = [
+            PipelineStage("justify", justify_stage, workers=2),
+            PipelineStage("outreach", outreach_stage, workers=2),
+        ]
+        results_table = run_pipeline(ranked, stages, async_stages=async_stages)
 
     # --- 6. Display Results --- #
     print("\n\n--- FINAL RESULTS (Top Candidates) ---")
     results_df = pd.DataFrame(results_table)
     generate_task2_html_table(results_df, OUTPUT_HTML_FILE)
+    with open_exporter(export_path, TASK2_FIELDS) as exporter:
+        if exporter is not None:
+            exporter.add_rows(task2_export_rows(results_table, top_candidates, job_summary, f"paraform_row_{selected_job_index}"))
     print("--- END OF RESULTS ---")
+    record_cache_metrics()
+
+
+def result_row(rank, cand, justification, linkedin_message):
+    return {
+        'Rank': rank,
+        'Name': cand['Name'],
+        'LinkedIn': cand['LinkedIn'],
+        'Score': cand['Score'],
+        'Why': justification,
+        'LinkedIn Message (Optional)': linkedin_message
+    }
+
+
+def record_cache_metrics():
+    """Copies the scoring caches' hit/miss counts into the metrics registry."""
+    title_cache = title_cache_info()
+    skills_cache = extract_job_skills.cache_info()
+    for cache, hits, misses, size in (
+        ("title_similarity", title_cache['hits'], title_cache['misses'], title_cache['size']),
+        ("job_skills", skills_cache.hits, skills_cache.misses, skills_cache.currsize),
+    ):
+        set_gauge("cache_hits", hits, cache=cache)
+        set_gauge("cache_misses", misses, cache=cache)
+        set_gauge("cache_size", size, cache=cache)
 
 
 # --- Run the Pipeline --- #
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Task 2: rank candidates for a job.")
+    parser.add_argument('--async-stages', action='store_true', help="Overlap justification and outreach generation across candidates.")
+    parser.add_argument('--batched-generation', action='store_true', help=f"Generate justifications and outreach messages for up to {CANDIDATE_BATCH_SIZE} candidates per chat call (JSON output, per-candidate fallback).")
+    parser.add_argument('--export', default=TASK2_RESULTS_EXPORT, metavar='PATH', help="Also append the ranked candidates to a .jsonl file or a .parquet dataset directory. Defaults to $TASK2_RESULTS_EXPORT.")
+    parser.add_argument('--metrics-report', default=None, help="Write stage timings and counters here at the end of the run (.json for JSON, otherwise Prometheus text). Defaults to $METRICS_REPORT.")
+    parser.add_argument('--profile', default=None, metavar='OUTPUT_PREFIX', help="Sample the run and write <prefix>.collapsed, <prefix>.speedscope.json and a per-stage hot-function summary. Defaults to $SYNAPSE_PROFILE.")
+    args = parser.parse_args()
     if '../data/' not in PARA_JOB_CSV or '../data/' not in CANDIDATE_CSV or '../data/' not in LINKEDIN_JSON:
          print("\nERROR: Please update the placeholder file paths (PARA_JOB_CSV, CANDIDATE_CSV, LINKEDIN_JSON) in the script before running.")
     elif not all([azure_endpoint, azure_api_key, azure_api_version, azure_chat_deployment]):
          print("\nERROR: Azure OpenAI environment variables are not fully set. Please check your .env file or environment.")
     else:
-        main_task2_pipeline(PARA_JOB_CSV, CANDIDATE_CSV, LINKEDIN_JSON)
\ No newline at end of file
+        with profile_run(args.profile):
+            main_task2_pipeline(PARA_JOB_CSV, CANDIDATE_CSV, LINKEDIN_JSON, async_stages=args.async_stages, batched=args.batched_generation,
+                                export_path=args.export)
+        write_metrics_report(args.metrics_report)
\ No newline at end of file
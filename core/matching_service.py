@@ -0,0 +1,338 @@
+from clients import *
+from data_loader import *
+from vector_db import *
+from justification import *
+from metrics import METRICS
+from profiling import profile_run
+from job_filters import FILTER_KEYS, JobFieldIndex, build_job_filter
+from fusion import DENSE_DEPTH, SPARSE_DEPTH
+from reranking import RERANK, get_reranker, rerank_results
+from job_dedup import JOB_DEDUP, deduplicate_jobs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import Future
+import argparse
+import heapq
+import json
+import queue
+import sys
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.helper_task_2 import *
+from utils.title_matcher import title_similarity_matrix
+
+RESUME_DIR = '../data/resumes/'
+PARA_JOB_CSV = '../data/jobs/Paraform_Jobs.csv'
+SRN_JOBS_DIR = '../utils/scrape-pdf/output/'
+CANDIDATE_CSV = '../data/candidates/JuiceboxExport_1743820890826.csv'
+LINKEDIN_JSON = '../data/candidates/first_five_profiles.json'
+
+# --- Constants --- #
+DEFAULT_PORT = 8080
+EMBEDDING_BATCH_SIZE = 16
+EMBEDDING_BATCH_WAIT_SECONDS = 0.02 # How long the batcher waits for more requests to coalesce
+
+
+def resolve_resume_path(resume_path, resume_dir=RESUME_DIR):
+    """Real path of a resume given relative to resume_dir; ValueError if it points anywhere outside resume_dir."""
+    root = os.path.realpath(resume_dir)
+    path = os.path.realpath(os.path.join(root, resume_path))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"'resume_path' must be a file inside the resume directory, got '{resume_path}'.")
+    return path
+
+
+def parse_top_k(request, default):
+    """The request's 'top_k' as a positive int (default when absent); ValueError if it is not one."""
+    try:
+        top_k = int(request.get('top_k', default))
+    except (TypeError, ValueError):
+        top_k = 0
+    if top_k < 1:
+        raise ValueError(f"'top_k' must be a positive integer, got {request.get('top_k')!r}.")
+    return top_k
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent embedding requests into batched provider calls on a background thread."""
+
+    def __init__(self, batch_size=EMBEDDING_BATCH_SIZE, max_wait=EMBEDDING_BATCH_WAIT_SECONDS):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def embed(self, texts):
+        """Returns embeddings for texts, batched together with other in-flight requests."""
+        futures = []
+        for text in texts:
+            future = Future()
+            self._requests.put((text, future))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def _run(self):
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                embeddings = embed_texts([text for text, _ in batch])
+                for (_, future), embedding in zip(batch, embeddings):
+                    future.set_result(embedding)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
+class MatchingService:
+    """Keeps the job catalog, BM25 index and candidate features warm between requests."""
+
+    def __init__(self, para_job_csv, srn_job_dir, candidate_csv, linkedin_json, reindex=False, chunked=CHUNKED_EMBEDDINGS,
+                 rerank=RERANK, dedup=JOB_DEDUP):
+        start = time.perf_counter()
+        self.chunked = chunked
+        self.rerank = rerank
+        if rerank:
+            get_reranker() # Loaded before serving, not on the first request
+
+        # --- Job catalog & BM25 --- #
+        jobs = [] if reindex else load_job_catalog_from_qdrant(QDRANT_COLLECTION_NAME)
+        if jobs:
+            print(f"Loaded {len(jobs)} indexed jobs from Qdrant collection '{QDRANT_COLLECTION_NAME}'.")
+        else:
+            print("No indexed jobs found (or reindex requested). Loading and indexing jobs...")
+            jobs = load_all_jobs(para_job_csv, srn_job_dir)
+            if dedup:
+                jobs = deduplicate_jobs(jobs, embed=lambda texts: embed_texts_in_order(texts, "dedup_embedding"))
+            index_jobs_to_qdrant(jobs, QDRANT_COLLECTION_NAME, recreate=reindex) # A reindex drops points from earlier runs
+        if chunked:
+            chunks_indexed = qdrant_client.collection_exists(QDRANT_CHUNK_COLLECTION_NAME) and \
+                qdrant_client.count(QDRANT_CHUNK_COLLECTION_NAME).count > 0
+            if reindex or not chunks_indexed:
+                index_job_chunks_to_qdrant(jobs, QDRANT_CHUNK_COLLECTION_NAME, recreate=reindex)
+        self.job_corpus_ids = [job['id'] for job in jobs]
+        self.bm25 = build_bm25_index([job['text'] for job in jobs])
+        self.job_field_index = JobFieldIndex([job['payload'] for job in jobs])
+
+        # --- Job rows for candidate ranking --- #
+        try:
+            self.jobs_df = pd.read_csv(para_job_csv)
+        except Exception as e:
+            print(f"Error loading jobs CSV: {e}")
+            self.jobs_df = pd.DataFrame()
+
+        # --- Candidate features (job-independent, computed once) --- #
+        self.candidates = []
+        candidates_df = load_candidates(candidate_csv)
+        linkedin_profiles = load_linkedin_profiles(linkedin_json)
+        if candidates_df is not None:
+            for _, cand_row in candidates_df.iterrows():
+                juicebox_info = cand_row.to_dict()
+                scraped_profile = linkedin_profiles.get(juicebox_info.get('LinkedIn'))
+                candidate_unified = build_candidate_profile(juicebox_info, scraped_profile, {})
+                candidate_unified['skills'] = extract_skills(scraped_profile, juicebox_info)
+                self.candidates.append(candidate_unified)
+
+        self.embedding_batcher = EmbeddingBatcher()
+        print(f"Matching service warmed up in {time.perf_counter() - start:.1f}s "
+              f"({len(self.job_corpus_ids)} jobs, {len(self.candidates)} candidates).")
+
+    def match_resumes(self, resume_texts, top_k=2, justify=False, job_filter=None):
+        """Hybrid-searches each resume against the warm job index; embeddings are requested as one batch."""
+        if self.chunked:
+            query_vectors = self._embed_resume_chunks(resume_texts)
+        else:
+            query_vectors = self.embedding_batcher.embed(resume_texts)
+        sparse_mask = self.job_field_index.mask(job_filter)
+        results = []
+        for resume_text, query_vector in zip(resume_texts, query_vectors):
+            dense_results = []
+            if query_vector is not None and self.chunked:
+                dense_results = perform_multivector_search(query_vector, top_k=DENSE_DEPTH, job_filter=job_filter)
+            elif query_vector is not None:
+                dense_results = perform_dense_search(resume_text, top_k=DENSE_DEPTH, query_vector=query_vector, job_filter=job_filter)
+            sparse_results = []
+            if self.bm25:
+                sparse_results = perform_sparse_search(resume_text, self.bm25, self.job_corpus_ids, top_k=SPARSE_DEPTH, mask=sparse_mask)
+            hybrid_results = combine_results_rrf(dense_results, sparse_results)
+            if self.rerank:
+                hybrid_results = rerank_results(resume_text, hybrid_results)
+
+            matches = []
+            top_matches = hybrid_results[:top_k]
+            fit_scores = score_fit_hybrid([match['fusion_score'] for match in top_matches]).tolist()
+            for match, fit_score in zip(top_matches, fit_scores):
+                job_payload = match['payload'] or {}
+                matches.append({
+                    "id": match['id'],
+                    "rrf_score": match['rrf_score'],
+                    "fusion_score": match['fusion_score'],
+                    "fit_score": fit_score,
+                    "role": job_payload.get('role', 'N/A'),
+                    "company": job_payload.get('company', 'N/A'),
+                    "source": job_payload.get('source', 'N/A'),
+                    "justification": generate_justification_azure(resume_text, job_payload, fit_score) if justify else None
+                })
+            results.append(matches)
+        return results
+
+    def _embed_resume_chunks(self, resume_texts):
+        """Embeds the chunks of every resume in one batched request and regroups them per resume (None if none embedded)."""
+        chunks_per_resume = [chunk_text(text) for text in resume_texts]
+        embeddings = self.embedding_batcher.embed([chunk for chunks in chunks_per_resume for chunk in chunks])
+        query_vectors, offset = [], 0
+        for chunks in chunks_per_resume:
+            vectors = [embedding for embedding in embeddings[offset:offset + len(chunks)] if embedding is not None]
+            query_vectors.append(vectors or None)
+            offset += len(chunks)
+        return query_vectors
+
+    def rank_candidates(self, job_row, top_k=10):
+        """Scores every warm candidate profile against a job and returns the top-k."""
+        job_summary = build_job_summary(job_row)
+        title_similarity_matrix([c.get('current_title') for c in self.candidates], [job_summary['Role']])
+        scored = []
+        for index, candidate_unified in enumerate(self.candidates):
+            score, score_details, _ = score_candidate_fit(candidate_unified, job_summary)
+            scored.append((score, -index, index, score_details))
+        ranked = []
+        for rank, (score, _, index, score_details) in enumerate(heapq.nlargest(top_k, scored), start=1):
+            candidate_unified = self.candidates[index]
+            ranked.append({
+                "rank": rank,
+                "name": candidate_unified.get('name'),
+                "linkedin": candidate_unified.get('linkedin'),
+                "score": score,
+                "details": score_details
+            })
+        return job_summary, ranked
+
+
+def _make_handler(service):
+    class MatchingRequestHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, body):
+            data = json.dumps(body, default=str).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {"status": "ok", "jobs": len(service.job_corpus_ids), "candidates": len(service.candidates)})
+            elif self.path == '/metrics':
+                data = METRICS.to_prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+            except (ValueError, json.JSONDecodeError) as e:
+                self._send_json(400, {"error": f"Invalid JSON body: {e}"})
+                return
+
+            start = time.perf_counter()
+            try:
+                if self.path == '/match-resume':
+                    body = self._match_resume(request)
+                elif self.path == '/rank-candidates':
+                    body = self._rank_candidates(request)
+                else:
+                    self._send_json(404, {"error": f"Unknown path {self.path}"})
+                    return
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            except Exception as e:
+                print(f"Error handling {self.path}: {e}")
+                self._send_json(500, {"error": str(e)})
+                return
+            body['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            self._send_json(200, body)
+
+        def _match_resume(self, request):
+            # Accepts a single resume ('resume_text' or 'resume_path' relative to RESUME_DIR) or a batch under 'resumes'
+            resumes = request.get('resumes') or [request]
+            resume_ids, resume_texts = [], []
+            for i, resume in enumerate(resumes):
+                text = resume.get('resume_text')
+                if not text and resume.get('resume_path'):
+                    text = parse_pdf_resume(resolve_resume_path(resume['resume_path']))
+                if not text:
+                    raise ValueError(f"Resume {i} has no 'resume_text' or readable 'resume_path'.")
+                resume_ids.append(resume.get('id', resume.get('resume_path', i)))
+                resume_texts.append(text)
+            filters = request.get('filters') or {}
+            unknown = set(filters) - set(FILTER_KEYS)
+            if unknown:
+                raise ValueError(f"Unknown filters {sorted(unknown)}; supported: {list(FILTER_KEYS)}.")
+            matches = service.match_resumes(
+                resume_texts, top_k=parse_top_k(request, 2), justify=bool(request.get('justify', False)),
+                job_filter=build_job_filter(**filters)
+            )
+            return {"results": [{"resume_id": rid, "matches": m} for rid, m in zip(resume_ids, matches)]}
+
+        def _rank_candidates(self, request):
+            if 'job' in request:
+                job_row = request['job']
+            elif 'job_index' in request:
+                job_index = int(request['job_index'])
+                if not 0 <= job_index < len(service.jobs_df):
+                    raise ValueError(f"job_index must be between 0 and {len(service.jobs_df) - 1}.")
+                job_row = service.jobs_df.iloc[job_index].to_dict()
+            else:
+                raise ValueError("Provide either 'job' (Paraform-style fields) or 'job_index'.")
+            job_summary, ranked = service.rank_candidates(job_row, top_k=parse_top_k(request, 10))
+            job_summary = {key: (None if pd.isna(value) else value) for key, value in job_summary.items()} # NaN is not valid JSON
+            return {"job": job_summary, "candidates": ranked}
+
+        def log_message(self, format, *args):
+            print(f"[matching-service] {self.address_string()} - {format % args}")
+
+    return MatchingRequestHandler
+
+
+def serve(service, host='127.0.0.1', port=DEFAULT_PORT):
+    """Serves the warm MatchingService over HTTP until interrupted."""
+    server = ThreadingHTTPServer((host, port), _make_handler(service))
+    print(f"Matching service listening on http://{host}:{port} (POST /match-resume, POST /rank-candidates, GET /health, GET /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down matching service.")
+    finally:
+        server.server_close()
+
+
+# --- Run the Service --- #
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resident matching service with warm job and candidate indexes.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--reindex', action='store_true', help="Reload jobs from the data files and rebuild the Qdrant collections from scratch.")
+    parser.add_argument('--chunked', action=argparse.BooleanOptionalAction, default=CHUNKED_EMBEDDINGS, help="Match resume chunks against job chunks (multi-vector MaxSim). Defaults to $CHUNKED_EMBEDDINGS.")
+    parser.add_argument('--rerank', action=argparse.BooleanOptionalAction, default=RERANK, help="Rerank the fused top-N with a local cross-encoder. Defaults to $RERANK.")
+    parser.add_argument('--job-dedup', action=argparse.BooleanOptionalAction, default=JOB_DEDUP, help="Collapse near-duplicate jobs when (re)indexing them. Defaults to $JOB_DEDUP.")
+    parser.add_argument('--profile', default=None, metavar='OUTPUT_PREFIX', help="Sample the service until shutdown and write flamegraph/speedscope output. Defaults to $SYNAPSE_PROFILE.")
+    args = parser.parse_args()
+    with profile_run(args.profile):
+        matching_service = MatchingService(PARA_JOB_CSV, SRN_JOBS_DIR, CANDIDATE_CSV, LINKEDIN_JSON, reindex=args.reindex, chunked=args.chunked,
+                                           rerank=args.rerank, dedup=args.job_dedup)
+        serve(matching_service, host=args.host, port=args.port)
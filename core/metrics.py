@@ -0,0 +1,192 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Constants --- #
+METRICS_PREFIX = "synapse"
+# Histogram bucket upper bounds in seconds, spanning local CPU work up to slow LLM calls
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Process-wide stage timings, counters and gauges, exportable as Prometheus text or JSON."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {} # stage -> {'buckets': [...], 'sum': float, 'count': int, 'max': float}
+            self._counters = {}   # (name, label_key) -> value
+            self._gauges = {}     # (name, label_key) -> value
+            self._started = time.time()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = {'buckets': [0] * len(DURATION_BUCKETS), 'sum': 0.0, 'count': 0, 'max': 0.0}
+                self._histograms[stage] = histogram
+            for i, upper_bound in enumerate(DURATION_BUCKETS):
+                if seconds <= upper_bound:
+                    histogram['buckets'][i] += 1
+                    break
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+            histogram['max'] = max(histogram['max'], seconds)
+
+    def increment(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def to_prometheus_text(self):
+        """Renders all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            if self._histograms:
+                name = f"{METRICS_PREFIX}_stage_duration_seconds"
+                lines.append(f"# HELP {name} Wall-clock duration of pipeline stages.")
+                lines.append(f"# TYPE {name} histogram")
+                for stage, histogram in sorted(self._histograms.items()):
+                    label_key = (('stage', stage),)
+                    cumulative = 0
+                    for upper_bound, count in zip(DURATION_BUCKETS, histogram['buckets']):
+                        cumulative += count
+                        le = "+Inf" if upper_bound == float('inf') else repr(upper_bound)
+                        lines.append(f"{name}_bucket{_format_labels(label_key, [('le', le)])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(label_key)} {histogram['sum']:.6f}")
+                    lines.append(f"{name}_count{_format_labels(label_key)} {histogram['count']}")
+            for kind, values, suffix in (("counter", self._counters, "_total"), ("gauge", self._gauges, "")):
+                seen = set()
+                for (name, label_key), value in sorted(values.items()):
+                    metric = f"{METRICS_PREFIX}_{name}{suffix}"
+                    if metric not in seen:
+                        lines.append(f"# TYPE {metric} {kind}")
+                        seen.add(metric)
+                    lines.append(f"{metric}{_format_labels(label_key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def to_json_report(self):
+        """Summarizes stage latencies (count, total, mean, approximate p50/p95, max), counters and gauges."""
+        with self._lock:
+            stages = {}
+            for stage, histogram in self._histograms.items():
+                stages[stage] = {
+                    'count': histogram['count'],
+                    'total_s': round(histogram['sum'], 6),
+                    'mean_s': round(histogram['sum'] / histogram['count'], 6),
+                    'p50_s': self._bucket_quantile(histogram, 0.50),
+                    'p95_s': self._bucket_quantile(histogram, 0.95),
+                    'max_s': round(histogram['max'], 6),
+                }
+            return {
+                'run_started': self._started,
+                'run_seconds': round(time.time() - self._started, 3),
+                'stages': stages,
+                'counters': [{'name': name, 'labels': dict(label_key), 'value': value}
+                             for (name, label_key), value in sorted(self._counters.items())],
+                'gauges': [{'name': name, 'labels': dict(label_key), 'value': value}
+                           for (name, label_key), value in sorted(self._gauges.items())],
+            }
+
+    @staticmethod
+    def _bucket_quantile(histogram, quantile):
+        """Upper bound of the bucket holding the quantile (capped at the observed max)."""
+        target = quantile * histogram['count']
+        cumulative = 0
+        for upper_bound, count in zip(DURATION_BUCKETS, histogram['buckets']):
+            cumulative += count
+            if cumulative >= target:
+                return round(min(upper_bound, histogram['max']), 6)
+        return round(histogram['max'], 6)
+
+
+METRICS = MetricsRegistry()
+# thread id -> stack of stages currently running on that thread (read by the sampling profiler)
+_active_stages = {}
+
+
+def active_stage(thread_id):
+    """Innermost stage running on the given thread, or None."""
+    stages = _active_stages.get(thread_id)
+    return stages[-1] if stages else None
+
+
+@contextmanager
+def stage_timer(stage):
+    """Times the enclosed block as one observation of `stage`."""
+    stages = _active_stages.setdefault(threading.get_ident(), [])
+    stages.append(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.observe(stage, time.perf_counter() - start)
+        stages.pop()
+
+
+def timed(stage):
+    """Decorator recording each call of the function as one observation of `stage`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def increment(name, value=1, **labels):
+    METRICS.increment(name, value, **labels)
+
+
+def set_gauge(name, value, **labels):
+    METRICS.set_gauge(name, value, **labels)
+
+
+def record_token_usage(call, response):
+    """Adds prompt/completion token counts from an OpenAI response's `usage` block."""
+    usage = getattr(response, 'usage', None)
+    if usage is None:
+        return
+    for kind in ('prompt_tokens', 'completion_tokens'):
+        tokens = getattr(usage, kind, None)
+        if tokens:
+            METRICS.increment("llm_tokens", tokens, call=call, kind=kind.replace('_tokens', ''))
+
+
+def write_metrics_report(path=None):
+    """Writes the metrics to `path` (or $METRICS_REPORT): JSON for *.json, Prometheus text otherwise."""
+    path = path or os.getenv("METRICS_REPORT")
+    if not path:
+        return None
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.json'):
+                json.dump(METRICS.to_json_report(), f, indent=2)
+            else:
+                f.write(METRICS.to_prometheus_text())
+        print(f"Metrics report written to {path}")
+    except Exception as e:
+        print(f"Error writing metrics report to {path}: {e}")
+    return path
@@ -0,0 +1,25 @@
+from html_output import generate_html_table, format_results_for_table
+
+# Notebook-only helpers: IPython and tabulate are imported when a helper is called,
+# so the pipelines and batch workers never pay for them
+
+
+def show_html(html_doc_or_path):
+    """Renders an HTML report (a document string or a path to one) inline in a notebook."""
+    from IPython.display import HTML, display
+    if isinstance(html_doc_or_path, str) and html_doc_or_path.lower().endswith('.html') and '<' not in html_doc_or_path:
+        with open(html_doc_or_path, encoding='utf-8') as f:
+            html_doc_or_path = f.read()
+    display(HTML(html_doc_or_path))
+
+
+def show_task1_results(results):
+    """Displays Task 1 pipeline results as the dark-theme HTML table."""
+    import pandas as pd
+    show_html(generate_html_table(results, pd.DataFrame(format_results_for_table(results))))
+
+
+def print_results_table(rows, tablefmt='github'):
+    """Prints a list of row dicts (e.g. format_results_for_table output) as a plain-text table."""
+    from tabulate import tabulate
+    print(tabulate(rows, headers='keys', tablefmt=tablefmt))
@@ -0,0 +1,176 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from metrics import active_stage
+
+# --- Constants --- #
+DEFAULT_SAMPLE_INTERVAL = 0.005 # Seconds between stack samples
+DEFAULT_TOP_N = 15
+NO_STAGE = "(no stage)"
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+class SamplingProfiler:
+    """Wall-clock stack sampler over all threads that tags each sample with the active metrics stage.
+
+    Samples come from sys._current_frames() on a background thread, so the
+    pipelines run unmodified; only threads inside a stage (plus the main
+    thread) are recorded, which keeps idle worker threads out of the profile.
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter() # (stage, (frame, ...)) -> sample count, frames outermost first
+        self._frame_keys = {}    # code object -> (function, file, line)
+        self._stop = threading.Event()
+        self._thread = None
+        self.started = self.stopped = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.stopped = time.perf_counter()
+
+    def _frame_key(self, code):
+        key = self._frame_keys.get(code)
+        if key is None:
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            self._frame_keys[code] = key
+        return key
+
+    def _run(self):
+        own_id = threading.get_ident()
+        main_id = threading.main_thread().ident
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stage = active_stage(thread_id)
+                if stage is None and thread_id != main_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_key(frame.f_code))
+                    frame = frame.f_back
+                self.samples[(stage or NO_STAGE, tuple(reversed(stack)))] += 1
+
+    # --- Output formats --- #
+    @staticmethod
+    def _frame_label(frame):
+        function, filename, line = frame
+        return f"{function} ({os.path.basename(filename)}:{line})"
+
+    def to_collapsed(self):
+        """Brendan Gregg's collapsed-stack format, one 'stage;frame;...;leaf count' line per stack."""
+        lines = []
+        for (stage, stack), count in sorted(self.samples.items()):
+            frames = [stage] + [self._frame_label(frame).replace(';', ':') for frame in stack]
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self, name="synapse"):
+        """Speedscope 'sampled' profiles, one per stage, with sample weights in seconds."""
+        frame_index = {}
+        frames = []
+        by_stage = defaultdict(list)
+        for (stage, stack), count in self.samples.items():
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    function, filename, line = frame
+                    frames.append({"name": function, "file": filename, "line": line})
+                indices.append(frame_index[frame])
+            by_stage[stage].append((indices, count * self.interval))
+
+        profiles = []
+        for stage, stacks in sorted(by_stage.items(), key=lambda item: -sum(w for _, w in item[1])):
+            total = sum(weight for _, weight in stacks)
+            profiles.append({
+                "type": "sampled", "name": stage, "unit": "seconds",
+                "startValue": 0, "endValue": total,
+                "samples": [indices for indices, _ in stacks],
+                "weights": [weight for _, weight in stacks],
+            })
+        return {"$schema": SPEEDSCOPE_SCHEMA, "name": name, "exporter": "synapse-profiler",
+                "activeProfileIndex": 0, "shared": {"frames": frames}, "profiles": profiles}
+
+    def hot_functions(self, top_n=DEFAULT_TOP_N):
+        """Per stage: total sampled seconds and the top-n functions by self and inclusive time."""
+        summary = {}
+        by_stage = defaultdict(Counter)
+        for (stage, stack), count in self.samples.items():
+            by_stage[stage][stack] += count
+        for stage, stacks in by_stage.items():
+            self_counts, inclusive_counts = Counter(), Counter()
+            for stack, count in stacks.items():
+                if stack:
+                    self_counts[stack[-1]] += count
+                for frame in set(stack):
+                    inclusive_counts[frame] += count
+            total = sum(stacks.values())
+            summary[stage] = {
+                "samples": total,
+                "seconds": total * self.interval,
+                "self": [(self._frame_label(frame), count) for frame, count in self_counts.most_common(top_n)],
+                "inclusive": [(self._frame_label(frame), count) for frame, count in inclusive_counts.most_common(top_n)],
+            }
+        return summary
+
+    def format_summary(self, top_n=DEFAULT_TOP_N):
+        lines = [f"Sampled {sum(self.samples.values())} stacks every {self.interval * 1000:.1f}ms "
+                 f"over {(self.stopped or time.perf_counter()) - self.started:.2f}s."]
+        for stage, entry in sorted(self.hot_functions(top_n).items(), key=lambda item: -item[1]['samples']):
+            lines.append(f"\n[{stage}] {entry['samples']} samples (~{entry['seconds']:.2f}s)")
+            lines.append(f"  {'self %':>7}  function")
+            for label, count in entry['self']:
+                lines.append(f"  {count / entry['samples'] * 100:>6.1f}%  {label}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_prefix, top_n=DEFAULT_TOP_N):
+        """Writes <prefix>.collapsed, <prefix>.speedscope.json and <prefix>.summary.txt."""
+        directory = os.path.dirname(output_prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{output_prefix}.collapsed", 'w', encoding='utf-8') as f:
+            f.write(self.to_collapsed())
+        with open(f"{output_prefix}.speedscope.json", 'w', encoding='utf-8') as f:
+            json.dump(self.to_speedscope(os.path.basename(output_prefix)), f)
+        summary = self.format_summary(top_n)
+        with open(f"{output_prefix}.summary.txt", 'w', encoding='utf-8') as f:
+            f.write(summary)
+        return summary
+
+
+@contextmanager
+def profile_run(output_prefix=None, interval=None, top_n=DEFAULT_TOP_N):
+    """Samples the enclosed block when output_prefix (or $SYNAPSE_PROFILE) is set; otherwise does nothing.
+
+    The sample interval can also be set with $SYNAPSE_PROFILE_INTERVAL (seconds).
+    """
+    output_prefix = output_prefix or os.getenv("SYNAPSE_PROFILE")
+    if not output_prefix:
+        yield None
+        return
+    interval = interval or float(os.getenv("SYNAPSE_PROFILE_INTERVAL", DEFAULT_SAMPLE_INTERVAL))
+    profiler = SamplingProfiler(interval).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        try:
+            summary = profiler.write(output_prefix, top_n)
+            print(f"\n--- Profile ({output_prefix}.collapsed / .speedscope.json / .summary.txt) ---")
+            print(summary)
+        except Exception as e:
+            print(f"Error writing profile to {output_prefix}: {e}")
@@ -0,0 +1,166 @@
+import os
+import re
+import threading
+import numpy as np
+from rank_bm25 import BM25Okapi
+from text_processing import preprocess_text_for_bm25
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- Constants --- #
+# Token budgets for the variable parts of the justification prompts (the fixed instructions come on top)
+JUSTIFICATION_PROMPT_TOKENS = int(os.getenv("JUSTIFICATION_PROMPT_TOKENS", 1200)) # Resume + job snippets (Task 1)
+CANDIDATE_SKILLS_TOKENS = int(os.getenv("CANDIDATE_SKILLS_TOKENS", 120))         # Skills list (Task 2)
+JOB_REQUIREMENTS_TOKENS = int(os.getenv("JOB_REQUIREMENTS_TOKENS", 300))         # Requirements / tech stack (Task 2)
+PASSAGE_WORDS = 40 # Passages are sentences, merged or split to about this many words
+TOKEN_ENCODING = "cl100k_base"
+ELLIPSIS = " ... "
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?;])\s+|\s*[\n•●▪]\s*')
+APPROX_TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+_encoding_lock = threading.Lock()
+_encoding = None
+_encoding_loaded = False
+
+
+def get_encoding():
+    """The tiktoken encoding, loaded on first use (None if unavailable).
+
+    tiktoken downloads the encoding file on first load unless it is cached,
+    so it is not loaded at import time; point TIKTOKEN_CACHE_DIR at a
+    directory holding the file to run fully offline.
+    """
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+            except Exception as e: # Not installed, or the encoding file cannot be fetched offline
+                print(f"tiktoken encoding '{TOKEN_ENCODING}' unavailable ({e}); estimating token counts.")
+                _encoding = None
+            _encoding_loaded = True
+        return _encoding
+
+
+def count_tokens(text):
+    """Token count with tiktoken when available, otherwise a conservative local estimate.
+
+    The estimate counts every word and punctuation mark as at least one token
+    and long words as one token per 4 characters, which is at or above
+    tiktoken's count for English text.
+    """
+    if not text:
+        return 0
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum((len(piece) + 3) // 4 for piece in APPROX_TOKEN_PATTERN.findall(text))
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts text at a word boundary so that it fits in max_tokens."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    low, high = 0, len(words)
+    while low < high: # Longest word prefix that fits
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low])
+
+
+def split_passages(text, max_words=PASSAGE_WORDS):
+    """Splits text into sentence-based passages of up to max_words words."""
+    passages, current = [], []
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        words = sentence.split()
+        if current and len(current) + len(words) > max_words:
+            passages.append(" ".join(current))
+            current = []
+        while len(words) > max_words:
+            passages.append(" ".join(words[:max_words]))
+            words = words[max_words:]
+        current.extend(words)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def rank_passages(passages, query_text):
+    """BM25 relevance of each passage to the query text (all zeros if nothing overlaps)."""
+    tokenized_passages = [preprocess_text_for_bm25(passage) for passage in passages]
+    query_terms = preprocess_text_for_bm25(query_text)
+    if not query_terms or not any(tokenized_passages):
+        return np.zeros(len(passages))
+    return np.asarray(BM25Okapi(tokenized_passages).get_scores(query_terms))
+
+
+def select_passages(text, query_text, max_tokens):
+    """Keeps the passages of text most relevant to query_text that fit in max_tokens, in their original order.
+
+    Text that already fits is returned unchanged; skipped passages are marked with '...'.
+    """
+    if not isinstance(text, str) or max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    passages = split_passages(text)
+    scores = rank_passages(passages, query_text)
+    passage_tokens = [count_tokens(passage) for passage in passages]
+    separator_tokens = count_tokens(ELLIPSIS)
+    selected, used = [], 0
+    # Best first; ties keep the earlier passage, so unrelated text degrades to a plain head cut
+    for index in sorted(range(len(passages)), key=lambda i: (-scores[i], i)):
+        cost = passage_tokens[index] + separator_tokens
+        if used + cost <= max_tokens:
+            selected.append(index)
+            used += cost
+    if not selected:
+        return truncate_to_tokens(passages[int(np.argmax(scores))], max_tokens)
+    selected.sort()
+    snippet = passages[selected[0]]
+    for previous, index in zip(selected, selected[1:]):
+        snippet += (" " if index == previous + 1 else ELLIPSIS) + passages[index]
+    return snippet
+
+
+def budget_snippets(resume_text, job_text, max_tokens=JUSTIFICATION_PROMPT_TOKENS):
+    """Resume and job snippets for a Task 1 prompt, each focused on the other, within max_tokens together.
+
+    The resume gets at least half of the budget plus whatever the job text does not need.
+    """
+    resume_text = resume_text if isinstance(resume_text, str) else ""
+    job_text = job_text if isinstance(job_text, str) else ""
+    resume_budget = max(max_tokens // 2, max_tokens - count_tokens(job_text))
+    resume_snippet = select_passages(resume_text, job_text, resume_budget)
+    job_snippet = select_passages(job_text, resume_text, max_tokens - count_tokens(resume_snippet))
+    return resume_snippet, job_snippet
+
+
+def cap_skills(skills, job_text, max_tokens=CANDIDATE_SKILLS_TOKENS):
+    """Comma-joined distinct skills within max_tokens, skills mentioned in job_text first."""
+    job_terms = set(preprocess_text_for_bm25(job_text))
+    unique_skills, seen = [], set()
+    for skill in skills or []:
+        skill = str(skill).strip()
+        if skill and skill.lower() not in seen:
+            seen.add(skill.lower())
+            unique_skills.append(skill)
+    ranked = sorted(
+        enumerate(unique_skills),
+        key=lambda item: (-len(set(preprocess_text_for_bm25(item[1])) & job_terms), item[0])
+    )
+    kept, used = [], 0
+    for _, skill in ranked:
+        cost = count_tokens(skill) + 1 # Separator
+        if used + cost > max_tokens:
+            continue
+        kept.append(skill)
+        used += cost
+    return ', '.join(kept)
@@ -112,4 +112,40 @@ LINKEDIN_OUTREACH = """
 * **Maximum Length:** The *entire* generated message must **not exceed 250 characters**. Brevity is crucial.
 * **Format:** Provide *only* the text of the LinkedIn message. Do not add any explanations, labels, or introductory text.
 
-"""
\ No newline at end of file
+"""
+
+BATCH_CANDIDATE_PROMPT = """
+**Objective:** For each candidate below, write a concise justification of their calculated Fit Score and a short personalized LinkedIn outreach message for the same job.
+
+**Job Summary (shared by all candidates):**
+* Role: {role}
+* Company: {company}
+* Required YOE: {yoe}
+* Requirements Snippet: {requirements}...
+* Tech Stack Snippet: {tech_stack}...
+
+**Candidates:**
+{candidates}
+
+**Task (for every candidate):**
+
+1.  **Justification:** Using the candidate's summary and Key Factors, explain the Fit Score in strictly 1-2 sentences, citing 1-2 specific matching or missing factors (e.g., "matching YOE", "presence of 'Skill X'", "lacks required 'Technology Y'").
+2.  **LinkedIn Message:** Address the candidate by name, mention one specific point of alignment between their title/skills and the job, briefly introduce the {role} position at {company} and end with a short call to action. The message must **not exceed 250 characters**.
+
+**Output Format:**
+
+Return *only* a JSON object of the form:
+{{"candidates": [{{"id": <candidate id>, "justification": "<1-2 sentences>", "linkedin_message": "<message>"}}]}}
+Include exactly one entry for each of these candidate ids: {candidate_ids}.
+"""
+
+BATCH_CANDIDATE_BLOCK = """### Candidate {id}
+* Name: {name}
+* Title: {title}
+* Location: {location}
+* Years of Experience (YOE): {yoe}
+* Skills Snippet: {skills}...
+* Fit Score: {score}/10
+* Key Factors:
+{details}
+"""
@@ -0,0 +1,86 @@
+from qdrant_client import models
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+# --- Constants --- #
+# Storage layout of the job collection; each can be overridden from the environment
+QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none").lower()     # none | scalar | binary
+VECTORS_ON_DISK = os.getenv("QDRANT_VECTORS_ON_DISK", "false").lower() == "true"
+PAYLOAD_ON_DISK = os.getenv("QDRANT_PAYLOAD_ON_DISK", "false").lower() == "true"
+HNSW_M = int(os.getenv("QDRANT_HNSW_M", 16))
+HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", 100))
+SEARCH_HNSW_EF = int(os.getenv("QDRANT_SEARCH_HNSW_EF", 128))
+# Quantized candidates fetched per requested hit before rescoring with the original vectors
+RESCORE_OVERSAMPLING = float(os.getenv("QDRANT_RESCORE_OVERSAMPLING", 2.0))
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+
+
+def build_quantization_config(mode=QUANTIZATION, always_ram=True):
+    """Qdrant quantization config for 'scalar' (int8, 4x smaller) or 'binary' (1 bit/dim, 32x smaller); None for 'none'.
+
+    With always_ram the compact quantized vectors stay in memory while the
+    float32 originals (used for rescoring) can live on disk.
+    """
+    if mode == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=always_ram)
+        )
+    if mode == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=always_ram))
+    if mode == "none":
+        return None
+    raise ValueError(f"Unknown quantization mode '{mode}'; expected one of {QUANTIZATION_MODES}.")
+
+
+def build_vectors_config(vector_size, distance=models.Distance.COSINE, quantization=QUANTIZATION,
+                         on_disk=VECTORS_ON_DISK, hnsw_m=HNSW_M, hnsw_ef_construct=HNSW_EF_CONSTRUCT, multivector=False):
+    """VectorParams for the layout; multivector=True stores a list of vectors per point, scored by MaxSim."""
+    multivector_config = None
+    if multivector:
+        multivector_config = models.MultiVectorConfig(comparator=models.MultiVectorComparator.MAX_SIM)
+    return models.VectorParams(
+        size=vector_size,
+        distance=distance,
+        on_disk=on_disk,
+        hnsw_config=models.HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct),
+        quantization_config=build_quantization_config(quantization),
+        multivector_config=multivector_config,
+    )
+
+
+def build_search_params(quantization=QUANTIZATION, hnsw_ef=SEARCH_HNSW_EF, oversampling=RESCORE_OVERSAMPLING, exact=False):
+    """Search params matching the collection layout: quantized candidates are rescored with the original vectors."""
+    quantization_params = None
+    if quantization != "none":
+        quantization_params = models.QuantizationSearchParams(ignore=False, rescore=True, oversampling=oversampling)
+    return models.SearchParams(hnsw_ef=hnsw_ef, exact=exact, quantization=quantization_params)
+
+
+def ensure_collection(client, collection_name, vector_size, recreate=False, **layout):
+    """Creates the collection with the configured layout unless it already exists (or drops it first when recreate=True).
+
+    layout accepts the build_vectors_config keywords plus payload_on_disk.
+    Returns True if a collection was created.
+    """
+    payload_on_disk = layout.pop('payload_on_disk', PAYLOAD_ON_DISK)
+    exists = client.collection_exists(collection_name)
+    if exists and not recreate:
+        print(f"Using existing Qdrant collection: {collection_name}")
+        return False
+    if exists:
+        print(f"Dropping existing Qdrant collection: {collection_name}")
+        client.delete_collection(collection_name)
+
+    vectors_config = build_vectors_config(vector_size, **layout)
+    quantization = layout.get('quantization', QUANTIZATION)
+    print(f"Creating Qdrant collection: {collection_name} (quantization={quantization}, "
+          f"vectors_on_disk={vectors_config.on_disk}, payload_on_disk={payload_on_disk}, "
+          f"hnsw m={vectors_config.hnsw_config.m}, ef_construct={vectors_config.hnsw_config.ef_construct})")
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=vectors_config,
+        on_disk_payload=payload_on_disk,
+    )
+    return True
@@ -0,0 +1,100 @@
+import os
+import threading
+import time
+import numpy as np
+from dotenv import load_dotenv
+from metrics import increment, stage_timer
+from prompt_budget import select_passages
+from text_processing import preprocess_text_for_bm25
+
+load_dotenv()
+
+# --- Constants --- #
+# Opt-in: rescore the fused top-N with a local cross-encoder (ONNX on CPU) before picking matches to justify
+RERANK = os.getenv("RERANK", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "Xenova/ms-marco-MiniLM-L-6-v2") # ~80 MB MiniLM-L6 cross-encoder
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", 50))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", 16))     # Pairs per forward pass
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", 500))    # Per query; over budget means fused order is kept
+RERANK_THREADS = int(os.getenv("RERANK_THREADS", 0)) or None    # ONNX Runtime threads (None = all cores)
+RERANK_QUERY_TOKENS = 200 # Resume snippet per pair; the model reads at most 512 tokens of resume + job
+
+
+class CrossEncoderReranker:
+    """Scores resume/job pairs with a cross-encoder in batches, within a latency budget."""
+
+    def __init__(self, model_name=RERANK_MODEL, batch_size=RERANK_BATCH_SIZE, threads=RERANK_THREADS):
+        try:
+            # Imported here: fastembed loads ONNX Runtime, which pipelines without reranking should not pay for
+            from fastembed.rerank.cross_encoder import TextCrossEncoder
+        except ImportError as e:
+            raise ImportError("Reranking needs fastembed (pip install fastembed); run without --rerank instead.") from e
+        start = time.perf_counter()
+        self.model = TextCrossEncoder(model_name=model_name, threads=threads)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        print(f"Loaded cross-encoder {model_name} in {time.perf_counter() - start:.1f}s.")
+
+    def score(self, query_text, documents, budget_ms=RERANK_BUDGET_MS):
+        """Relevance of each document to the query, or None if scoring all of them would exceed budget_ms.
+
+        Batches run one after another; scoring stops as soon as the next batch
+        is projected to end past the budget, so a query overruns it by at most
+        the misprediction of one batch.
+        """
+        start = time.perf_counter()
+        deadline = start + budget_ms / 1000.0
+        scores = []
+        for batch_start in range(0, len(documents), self.batch_size):
+            if batch_start:
+                elapsed = time.perf_counter() - start
+                per_batch = elapsed / (batch_start // self.batch_size)
+                if start + elapsed + per_batch > deadline:
+                    return None
+            scores.extend(self.model.rerank(query_text, documents[batch_start:batch_start + self.batch_size],
+                                            batch_size=self.batch_size))
+        if time.perf_counter() > deadline:
+            return None
+        return np.asarray(scores, dtype=float)
+
+
+_reranker_lock = threading.Lock()
+_reranker = None
+
+
+def get_reranker():
+    """The process-wide cross-encoder, loaded on first use (call at startup so loading is not charged to a query)."""
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = CrossEncoderReranker()
+        return _reranker
+
+
+def rerank_results(resume_text, results, top_n=RERANK_TOP_N, budget_ms=RERANK_BUDGET_MS):
+    """Reorders the first top_n fused results by cross-encoder score, adding 'rerank_score' to them.
+
+    Results past top_n keep their fused order after the reranked ones. If the
+    budget is exceeded or scoring fails, results are returned in fused order.
+    """
+    head, tail = results[:top_n], results[top_n:]
+    if len(head) < 2:
+        return results
+    job_texts = [(result['payload'] or {}).get('text') or "" for result in head]
+    # Cross-encoders truncate long pairs, so the resume side is cut to the passages closest to these jobs
+    job_terms = " ".join(dict.fromkeys(preprocess_text_for_bm25(" ".join(job_texts)))) # Distinct terms keep BM25 cheap
+    query_text = select_passages(resume_text, job_terms, RERANK_QUERY_TOKENS)
+    try:
+        with stage_timer("rerank"):
+            scores = get_reranker().score(query_text, job_texts, budget_ms=budget_ms)
+    except Exception as e:
+        print(f"Error reranking results: {e}. Keeping fused order.")
+        increment("rerank_fallbacks", reason="error")
+        return results
+    if scores is None:
+        print(f"Reranking {len(head)} results exceeded the {budget_ms:.0f} ms budget. Keeping fused order.")
+        increment("rerank_fallbacks", reason="budget")
+        return results
+    order = np.argsort(-scores, kind='stable')
+    reranked = [dict(head[index], rerank_score=float(scores[index])) for index in order]
+    return reranked + tail
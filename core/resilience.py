@@ -0,0 +1,241 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import openai
+from metrics import increment, set_gauge
+
+# --- Constants --- #
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_BASE = 0.5   # Seconds; doubled on each attempt
+DEFAULT_BACKOFF_MAX = 30.0   # Cap for both computed backoff and server-provided Retry-After
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0 # Seconds an open circuit waits before letting a trial call through
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+DEFAULT_LATENCY_TARGET = 2.0 # Seconds per request above which the rate controller backs off
+DEFAULT_DECREASE_COOLDOWN = 1.0 # Minimum seconds between multiplicative decreases
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency after repeated errors, then lets one trial call through after a cooldown."""
+
+    def __init__(self, name, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        """True if a call may proceed now (closed, or the single half-open trial)."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                print(f"Circuit '{self.name}' closed again.")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        """Ends a call that says nothing about the dependency's health: the state is kept, but a half-open trial slot is freed."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            reopen = self._trial_in_flight
+            self._trial_in_flight = False
+            if reopen or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                print(f"Circuit '{self.name}' opened after {self._failures} consecutive failures; "
+                      f"pausing calls for {self.reset_timeout:.0f}s.")
+                increment("circuit_opened", circuit=self.name)
+
+    def seconds_until_trial(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+
+class DeadLetterQueue:
+    """Thread-safe list of (item, error) pairs that failed and should be retried later."""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._items = []
+
+    def add(self, item, error=None):
+        with self._lock:
+            self._items.append((item, error))
+        increment("dead_lettered", queue=self.name)
+
+    def drain(self):
+        """Removes and returns all dead-lettered entries."""
+        with self._lock:
+            items, self._items = self._items, []
+        return items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+
+class AdaptiveRateController:
+    """AIMD control of request batch size and concurrency from observed throttling and latency.
+
+    Every fast success grows the batch size additively and the concurrency by
+    one per window of `concurrency` successes; a 429 or a slow response halves
+    both (at most once per cooldown, so a burst of errors counts as one signal).
+    """
+
+    def __init__(self, name, initial_batch_size=16, min_batch_size=1, max_batch_size=64, batch_step=4,
+                 initial_concurrency=2, max_concurrency=8, latency_target=DEFAULT_LATENCY_TARGET,
+                 decrease_cooldown=DEFAULT_DECREASE_COOLDOWN):
+        self.name = name
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.batch_step = batch_step
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.decrease_cooldown = decrease_cooldown
+        self._lock = threading.Lock()
+        self._batch_size = float(initial_batch_size)
+        self._concurrency = float(initial_concurrency)
+        self._last_decrease = 0.0
+        self._publish()
+
+    @property
+    def batch_size(self):
+        return int(self._batch_size)
+
+    @property
+    def concurrency(self):
+        return int(self._concurrency)
+
+    def _publish(self):
+        set_gauge("rate_batch_size", self.batch_size, controller=self.name)
+        set_gauge("rate_concurrency", self.concurrency, controller=self.name)
+
+    def record_success(self, latency):
+        if latency > self.latency_target:
+            self._decrease("slow")
+            return
+        with self._lock:
+            self._batch_size = min(self.max_batch_size, self._batch_size + self.batch_step)
+            self._concurrency = min(self.max_concurrency, self._concurrency + 1.0 / max(self._concurrency, 1.0))
+            self._publish()
+
+    def record_throttle(self):
+        self._decrease("throttled")
+
+    def _decrease(self, reason):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < self.decrease_cooldown:
+                return
+            self._last_decrease = now
+            self._batch_size = max(self.min_batch_size, self._batch_size / 2)
+            self._concurrency = max(1.0, self._concurrency / 2)
+            self._publish()
+        increment("rate_decreases", controller=self.name, reason=reason)
+
+
+def is_retryable(error):
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in RETRYABLE_STATUS_CODES
+
+
+def retry_after_seconds(error):
+    """Server-requested delay from Retry-After / retry-after-ms headers, or None."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+    retry_after = headers.get('retry-after')
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff_delay(attempt, error=None, base=DEFAULT_BACKOFF_BASE, cap=DEFAULT_BACKOFF_MAX):
+    """Full-jitter exponential backoff, but never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    retry_after = retry_after_seconds(error) if error is not None else None
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+def call_with_retry(func, *args, breaker=None, rate_controller=None, max_attempts=DEFAULT_MAX_ATTEMPTS, api="api", **kwargs):
+    """Calls func, retrying transient API errors with backoff; non-retryable errors are raised immediately.
+
+    Raises CircuitOpenError without calling func while the breaker is open.
+    Latency and 429s are reported to rate_controller when one is given.
+    """
+    for attempt in range(max_attempts):
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(f"Circuit '{breaker.name}' is open; retry in {breaker.seconds_until_trial():.1f}s.")
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if rate_controller is not None and isinstance(e, openai.RateLimitError):
+                rate_controller.record_throttle()
+            if not is_retryable(e):
+                if breaker is not None:
+                    breaker.release() # The request itself was bad, which neither closes nor opens the circuit
+                raise
+            increment("api_errors", api=api)
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt == max_attempts - 1:
+                raise
+            delay = backoff_delay(attempt, e)
+            print(f"Transient {api} error ({type(e).__name__}); retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 2}/{max_attempts}).")
+            increment("api_retries", api=api)
+            time.sleep(delay)
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            if rate_controller is not None:
+                rate_controller.record_success(time.perf_counter() - start)
+            return result
@@ -0,0 +1,210 @@
+import contextlib
+import json
+import math
+import os
+import uuid
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Parquet export is optional; JSONL works without it
+    pa = pq = None
+
+load_dotenv()
+
+# --- Constants --- #
+# Default export paths (.jsonl file or .parquet directory); the tasks have different schemas, so never share one
+TASK1_RESULTS_EXPORT = os.getenv("TASK1_RESULTS_EXPORT")
+TASK2_RESULTS_EXPORT = os.getenv("TASK2_RESULTS_EXPORT")
+EXPORT_BATCH_ROWS = 1000 # Rows buffered before they are appended (one Parquet row group / one JSONL write)
+SCHEMA_VERSION = 2
+
+# Column order and types are part of the export contract: add columns at the end and bump SCHEMA_VERSION
+COMMON_FIELDS = (
+    ('schema_version', 'int'),
+    ('run_id', 'string'),
+    ('created_at', 'timestamp'),
+)
+TASK1_FIELDS = COMMON_FIELDS + (
+    ('resume_id', 'string'),
+    ('job_id', 'string'),
+    ('match_rank', 'int'),
+    ('rrf_score', 'float'),
+    ('dense_rank', 'int'),
+    ('sparse_rank', 'int'),
+    ('fit_score', 'float'),
+    ('job_role', 'string'),
+    ('job_company', 'string'),
+    ('job_source', 'string'),
+    ('justification', 'string'),
+    ('fusion_score', 'float'), # Schema 2: the score matches are ranked (and fit-scored) by
+)
+TASK2_FIELDS = COMMON_FIELDS + (
+    ('job_id', 'string'),
+    ('job_role', 'string'),
+    ('job_company', 'string'),
+    ('candidate_id', 'string'),
+    ('candidate_name', 'string'),
+    ('rank', 'int'),
+    ('fit_score', 'float'),
+    ('score_details', 'string'), # JSON object; its keys depend on the scoring rules
+    ('justification', 'string'),
+    ('linkedin_message', 'string'),
+)
+
+_COERCE = {'string': str, 'int': int, 'float': float, 'timestamp': lambda value: value}
+
+
+def _arrow_type(field_type):
+    return {
+        'string': pa.string(),
+        'int': pa.int64(),
+        'float': pa.float64(),
+        'timestamp': pa.timestamp('ms', tz='UTC'),
+    }[field_type]
+
+
+class ResultExporter:
+    """Appends result rows with a fixed schema to a JSONL file or a Parquet dataset directory.
+
+    Rows are buffered and written every batch_rows rows, so memory stays flat
+    on large runs. A path ending in .parquet is treated as a directory that
+    gets one part file per run (row groups per batch); any other path is a JSONL
+    file that runs append to. Every row is stamped with the run_id and
+    created_at of the exporter.
+    """
+
+    def __init__(self, path, fields, batch_rows=EXPORT_BATCH_ROWS):
+        self.path = path
+        self.fields = fields
+        self.field_names = [name for name, _ in fields]
+        self.batch_rows = batch_rows
+        self.parquet = path.lower().rstrip('/\\').endswith('.parquet')
+        if self.parquet and pa is None:
+            raise ImportError("Parquet export needs pyarrow (pip install pyarrow); use a .jsonl path instead.")
+        self.run_id = uuid.uuid4().hex
+        self.created_at = datetime.now(timezone.utc)
+        self.row_count = 0
+        self.output_path = None
+        self._buffer = []
+        self._writer = None
+        self._file = None
+
+    def _normalize(self, row):
+        unknown = set(row) - set(self.field_names)
+        if unknown:
+            raise ValueError(f"Unknown export columns {sorted(unknown)}.")
+        row = dict(row, schema_version=SCHEMA_VERSION, run_id=self.run_id, created_at=self.created_at)
+        normalized = {}
+        for name, field_type in self.fields:
+            value = row.get(name)
+            if value is None or (isinstance(value, float) and math.isnan(value)): # pandas marks missing values with NaN
+                normalized[name] = None
+            else:
+                normalized[name] = _COERCE[field_type](value)
+        return normalized
+
+    def add_rows(self, rows):
+        for row in rows:
+            self._buffer.append(self._normalize(row))
+        if len(self._buffer) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        if self.parquet:
+            self._write_parquet(self._buffer)
+        else:
+            self._write_jsonl(self._buffer)
+        self.row_count += len(self._buffer)
+        self._buffer = []
+
+    def _write_parquet(self, rows):
+        schema = pa.schema([(name, _arrow_type(field_type)) for name, field_type in self.fields])
+        if self._writer is None:
+            os.makedirs(self.path, exist_ok=True)
+            timestamp = self.created_at.strftime('%Y%m%dT%H%M%S')
+            self.output_path = os.path.join(self.path, f"part-{timestamp}-{self.run_id[:8]}.parquet")
+            self._writer = pq.ParquetWriter(self.output_path, schema)
+        columns = {name: [row[name] for row in rows] for name in self.field_names}
+        self._writer.write_table(pa.table(columns, schema=schema))
+
+    def _write_jsonl(self, rows):
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.output_path = self.path
+            self._file = open(self.path, 'a', encoding='utf-8')
+        for row in rows:
+            self._file.write(json.dumps(dict(row, created_at=row['created_at'].isoformat()), ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.row_count:
+            print(f"Exported {self.row_count} result rows to {self.output_path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+
+def open_exporter(path, fields, batch_rows=EXPORT_BATCH_ROWS):
+    """ResultExporter for path, or a no-op context yielding None when no export was requested."""
+    if not path:
+        return contextlib.nullcontext(None)
+    return ResultExporter(path, fields, batch_rows=batch_rows)
+
+
+def task1_export_rows(result):
+    """Export rows for one Task 1 pipeline result (one per justified match)."""
+    rows = []
+    for match_rank, match in enumerate(result['top_matches'], start=1):
+        rows.append({
+            'resume_id': result['resume_name'],
+            'job_id': match['job_id'],
+            'match_rank': match_rank,
+            'rrf_score': match['rrf_score'],
+            'dense_rank': match.get('dense_rank'),
+            'sparse_rank': match.get('sparse_rank'),
+            'fit_score': match['fit_score'],
+            'job_role': match.get('job_role'),
+            'job_company': match.get('job_company'),
+            'job_source': match.get('job_source'),
+            'justification': match['justification'],
+            'fusion_score': match.get('fusion_score'),
+        })
+    return rows
+
+
+def task2_export_rows(results_table, top_candidates, job_summary, job_id):
+    """Export rows for the ranked Task 2 candidates of one job."""
+    rows = []
+    for row in results_table:
+        cand = top_candidates[row['Rank'] - 1]
+        rows.append({
+            'job_id': job_id,
+            'job_role': job_summary.get('Role'),
+            'job_company': job_summary.get('Company'),
+            'candidate_id': cand['LinkedIn'] or cand['Name'],
+            'candidate_name': cand['Name'],
+            'rank': row['Rank'],
+            'fit_score': row['Score'],
+            'score_details': json.dumps(cand['Details'], default=str, sort_keys=True),
+            'justification': row['Why'],
+            'linkedin_message': row['LinkedIn Message (Optional)'],
+        })
+    return rows
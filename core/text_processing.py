@@ -0,0 +1,41 @@
+import re
+
+# --- Constants --- #
+# NLTK's English stopword list (nltk_data corpora/stopwords/english), vendored so BM25 needs no NLTK data or downloads
+ENGLISH_STOPWORDS = frozenset("""
+    a about above after again against ain all am an and any are aren aren't as at be because been before
+    being below between both but by can couldn couldn't d did didn didn't do does doesn doesn't doing
+    don don't down during each few for from further had hadn hadn't has hasn hasn't have haven haven't
+    having he her here hers herself him himself his how i if in into is isn isn't it it's its itself
+    just ll m ma me mightn mightn't more most mustn mustn't my myself needn needn't no nor not now o of
+    off on once only or other our ours ourselves out over own re s same shan shan't she she's should
+    should've shouldn shouldn't so some such t than that that'll the their theirs them themselves then
+    there these they this those through to too under until up ve very was wasn wasn't we were weren
+    weren't what when where which while who whom why will with won won't wouldn wouldn't y you you'd
+    you'll you're you've your yours yourself yourselves
+""".split())
+PUNCTUATION_PATTERN = re.compile(r'[^\w\s]')
+# Words nltk.word_tokenize (Treebank) splits in two; kept so BM25 tokens match the previous NLTK-based tokenizer
+TREEBANK_SPLITS = {
+    'cannot': ('can', 'not'), 'gimme': ('gim', 'me'), 'gonna': ('gon', 'na'),
+    'gotta': ('got', 'ta'), 'lemme': ('lem', 'me'), 'wanna': ('wan', 'na'),
+}
+
+stop_words = ENGLISH_STOPWORDS
+
+
+def tokenize(text):
+    """Lowercased word tokens with punctuation removed, equivalent to nltk.word_tokenize(preserve_line=True) on such text."""
+    tokens = []
+    for word in PUNCTUATION_PATTERN.sub('', text.lower()).split():
+        tokens.extend(TREEBANK_SPLITS.get(word, (word,)))
+    return tokens
+
+
+def preprocess_text_for_bm25(text):
+    """Basic text cleaning and tokenization for BM25."""
+    if not isinstance(text, str):
+        return []
+    tokens = tokenize(text)
+    tokens = [word for word in tokens if word.isalnum() and word not in stop_words]
+    return tokens
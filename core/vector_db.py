@@ -1,15 +1,26 @@
 from qdrant_client import QdrantClient, models
 from qdrant_client.http.models import Distance, VectorParams, PointStruct
+from qdrant_collections import ensure_collection, build_search_params
+from job_filters import create_job_payload_indexes, to_qdrant_filter, NUMERIC_FIELDS, KEYWORD_FIELDS
+from chunking import chunk_text
+from embedding_providers import (EMBEDDING_PROVIDER, EMBEDDING_PROVIDERS, EMBEDDING_DIMENSION as CONFIGURED_EMBEDDING_DIMENSION,
+                                 AZURE_EMBEDDING_DIMENSION, EmbeddingProvider, LocalEmbeddingProvider, collection_name_for,
+                                 create_azure_embedding_client)
+from calibration import FIT_CALIBRATION_FILE, get_fit_calibration
+from fusion import FUSION_METHOD, RRF_K, DENSE_WEIGHT, SPARSE_WEIGHT, DENSE_DEPTH, SPARSE_DEPTH, FUSION_DEDUP, content_key, fuse_ranked_lists, result_id
+from text_processing import preprocess_text_for_bm25, stop_words
 from rank_bm25 import BM25Okapi
 from dotenv import load_dotenv
-from clients import embedding_client
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
+from metrics import timed, stage_timer, increment, record_token_usage
+from resilience import AdaptiveRateController, CircuitBreaker, CircuitOpenError, DeadLetterQueue, call_with_retry
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import math
 import time
 import os
+import queue
 import re
+import threading
 import numpy as np
-from collections import defaultdict
 
 load_dotenv()
 
@@ -18,12 +29,33 @@ qdrant_url = os.getenv("QDRANT_URL")
 qdrant_api_key = os.getenv("QDRANT_API_KEY")
 
 # --- Constants --- #
-QDRANT_COLLECTION_NAME = "job_postings_v2"
-EMBEDDING_DIMENSION = 1536
+QDRANT_BASE_COLLECTION_NAME = "job_postings_v2" # Suffixed per embedding provider/model/dimension, see collection_name_for
+# Opt-in: match section/window chunks of resumes against job chunks (MaxSim) instead of one vector per document
+CHUNKED_EMBEDDINGS = os.getenv("CHUNKED_EMBEDDINGS", "false").lower() == "true"
+# Chunk points only carry what filtering and display need; full payloads stay in the main collection
+CHUNK_PAYLOAD_FIELDS = ('role', 'company', 'source', 'name') + NUMERIC_FIELDS + KEYWORD_FIELDS
+EMBEDDING_MAX_ATTEMPTS = 5
+DEAD_LETTER_MAX_WAIT_SECONDS = 60 # Longest we wait for an open embedding circuit before the final dead-letter retry
+# AIMD bounds for indexing: embedding requests (texts per request, parallel requests) and Qdrant upserts (points per call)
+EMBEDDING_RATE_LIMITS = {'initial_batch_size': 16, 'max_batch_size': 128, 'initial_concurrency': 2, 'max_concurrency': 8}
+UPSERT_RATE_LIMITS = {'initial_batch_size': 64, 'max_batch_size': 512, 'batch_step': 64, 'latency_target': 1.0}
+UPSERT_WRITERS = 2           # Background threads sending upserts
+UPSERT_QUEUE_BATCHES = 8     # Upsert batches buffered ahead of the writers before embedding blocks
+
+# Only text-embedding-3 deployments accept a vector size, so the default size is requested without one
+AZURE_DIMENSIONS_REQUEST = {'dimensions': CONFIGURED_EMBEDDING_DIMENSION} \
+    if CONFIGURED_EMBEDDING_DIMENSION and CONFIGURED_EMBEDDING_DIMENSION != AZURE_EMBEDDING_DIMENSION else {}
+
+DENSE_SEARCH_PARAMS = build_search_params() # Rescores quantized candidates when quantization is enabled
+
+embedding_breaker = CircuitBreaker("azure_embedding")
 
 # Initialize Qdrant Client
 try:
-    qdrant_client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key, timeout=3000)
+    if qdrant_url == ":memory:":
+        qdrant_client = QdrantClient(location=":memory:") # In-process Qdrant (benchmarks, offline runs)
+    else:
+        qdrant_client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key, timeout=3000)
     print("Qdrant client initialized successfully.")
 except Exception as e:
     print(f"Error initializing Qdrant client: {e}")
@@ -31,72 +63,324 @@ except Exception as e:
     exit()
 
 # --- Helper Functions ---
-stop_words = set(stopwords.words('english'))
 
-def preprocess_text_for_bm25(text):
-    """Basic text cleaning and tokenization for BM25."""
-    if not isinstance(text, str):
-        return []
-    text = text.lower()
-    text = re.sub(r'[^\w\s]', '', text) # Remove punctuation
-    tokens = word_tokenize(text, language='english', preserve_line=True)
-    tokens = [word for word in tokens if word.isalnum() and word not in stop_words]
-    return tokens
+_azure_embedding_client = None
+_azure_embedding_client_lock = threading.Lock()
+
+
+def get_azure_embedding_client():
+    """The Azure embedding client, created on first use so local-embedding runs never need Azure settings."""
+    global _azure_embedding_client
+    with _azure_embedding_client_lock:
+        if _azure_embedding_client is None:
+            # Retries are handled by call_with_retry below, so the SDK's own retry loop is disabled for embeddings
+            _azure_embedding_client = create_azure_embedding_client(max_retries=0)
+    return _azure_embedding_client
 
 
+def create_embeddings(texts, model_deployment=azure_embedding_deployment, rate_controller=None):
+    """Embeds a string or list of strings with retry/backoff and the embedding circuit breaker; raises on failure."""
+    # Azure OpenAI client expects 'input' not 'inputs'
+    response = call_with_retry(
+        get_azure_embedding_client().embeddings.create, input=texts, model=model_deployment, **AZURE_DIMENSIONS_REQUEST,
+        breaker=embedding_breaker, rate_controller=rate_controller, max_attempts=EMBEDDING_MAX_ATTEMPTS, api="embedding"
+    )
+    record_token_usage("embedding", response)
+    return response
+
+
+@timed("embed")
 def get_azure_embedding(text, model_deployment=azure_embedding_deployment):
-    """Generates embedding using Azure OpenAI."""
+    """Generates embedding using Azure OpenAI. Returns None if the text is invalid or the call ultimately fails."""
     if not text or not isinstance(text, str):
         print("Warning: Empty or invalid text passed to get_azure_embedding.")
-        return [0.0] * EMBEDDING_DIMENSION # Return zero vector
+        increment("embedding_failures", reason="invalid_text")
+        return None
     try:
-        # Azure OpenAI client expects 'input' not 'inputs'
-        response = embedding_client.embeddings.create(input=text, model=model_deployment)
-        return response.data[0].embedding
+        return create_embeddings(text, model_deployment).data[0].embedding
+    except CircuitOpenError as e:
+        print(f"Skipping Azure embedding: {e}")
+        increment("embedding_failures", reason="circuit_open")
     except Exception as e:
         print(f"Error getting Azure embedding: {e}")
-        # Retry mechanism could be added here
-        return [0.0] * EMBEDDING_DIMENSION # Return zero vector on error
+        increment("embedding_failures", reason="api_error")
+    return None
 
 
-def index_jobs_to_qdrant(jobs, collection_name=QDRANT_COLLECTION_NAME):
-    """Creates Qdrant collection and indexes jobs with embeddings."""
+@timed("embed_batch")
+def get_azure_embeddings_batch(texts, model_deployment=azure_embedding_deployment, rate_controller=None):
+    """Generates embeddings for several texts in a single Azure OpenAI request, preserving input order (None where it failed)."""
+    embeddings = [None for _ in texts]
+    valid_indices = [i for i, text in enumerate(texts) if text and isinstance(text, str)]
+    if not valid_indices:
+        return embeddings
     try:
-        # Check if collection exists, create if not
-        collections = qdrant_client.get_collections().collections
-        collection_names = [col.name for col in collections]
+        response = create_embeddings([texts[i] for i in valid_indices], model_deployment, rate_controller)
+        for item in response.data:
+            embeddings[valid_indices[item.index]] = item.embedding
+    except CircuitOpenError as e:
+        print(f"Skipping batch Azure embeddings: {e}")
+        increment("embedding_failures", len(valid_indices), reason="circuit_open")
+    except Exception as e:
+        print(f"Error getting batch Azure embeddings: {e}. Retrying individually.")
+        for i in valid_indices:
+            embeddings[i] = get_azure_embedding(texts[i], model_deployment)
+    return embeddings
+
+
+class AzureEmbeddingProvider(EmbeddingProvider):
+    """Azure OpenAI embeddings, with the retries, circuit breaker and rate control of create_embeddings."""
+
+    name = "azure"
+
+    def __init__(self, dimension=CONFIGURED_EMBEDDING_DIMENSION):
+        super().__init__(dimension or AZURE_EMBEDDING_DIMENSION)
+        get_azure_embedding_client() # Fails fast when the embedding settings are missing
+
+    def embed(self, text):
+        return get_azure_embedding(text)
+
+    def embed_batch(self, texts, rate_controller=None):
+        return get_azure_embeddings_batch(texts, rate_controller=rate_controller)
+
+
+def create_embedding_provider(name=EMBEDDING_PROVIDER):
+    """The embedding provider for name ('azure' or 'local')."""
+    if name == "azure":
+        return AzureEmbeddingProvider()
+    if name == "local":
+        return LocalEmbeddingProvider()
+    raise ValueError(f"Unknown embedding provider '{name}'; expected one of {EMBEDDING_PROVIDERS}.")
+
+
+# --- Embedding Provider --- #
+# Everything below embeds through this provider; each provider/model/dimension gets its own collections
+embedding_provider = create_embedding_provider()
+EMBEDDING_DIMENSION = embedding_provider.dimension
+QDRANT_COLLECTION_NAME = collection_name_for(QDRANT_BASE_COLLECTION_NAME, embedding_provider)
+QDRANT_CHUNK_COLLECTION_NAME = f"{QDRANT_COLLECTION_NAME}_chunks" # One multi-vector point (chunk embeddings) per job
+
+
+def embed_text(text):
+    """Embeds one text with the configured provider; None if the text is invalid or embedding failed."""
+    return embedding_provider.embed(text)
+
+
+def embed_texts(texts, rate_controller=None):
+    """Embeds several texts with the configured provider in input order (None where it failed)."""
+    return embedding_provider.embed_batch(texts, rate_controller=rate_controller)
+
+
+@timed("bm25_build")
+def build_bm25_index(job_corpus_texts):
+    """Tokenizes the job texts and builds a BM25 index over them (None if there is no text)."""
+    if not job_corpus_texts:
+        return None
+    tokenized_corpus = [preprocess_text_for_bm25(doc) for doc in job_corpus_texts]
+    return BM25Okapi(tokenized_corpus)
 
-        if collection_name not in collection_names:
-            print(f"Creating Qdrant collection: {collection_name}")
-            qdrant_client.recreate_collection(
+
+def load_job_catalog_from_qdrant(collection_name=QDRANT_COLLECTION_NAME, page_size=256):
+    """Scrolls all indexed jobs out of Qdrant as {'id', 'text', 'payload'} dicts, so BM25 IDs match Qdrant IDs."""
+    jobs = []
+    try:
+        offset = None
+        while True:
+            points, offset = qdrant_client.scroll(
                 collection_name=collection_name,
-                vectors_config=VectorParams(size=EMBEDDING_DIMENSION, distance=Distance.COSINE) # We are handling sparse vectors separately
+                limit=page_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
             )
-        else:
-            print(f"Using existing Qdrant collection: {collection_name}")
+            for point in points:
+                payload = point.payload or {}
+                jobs.append({'id': str(point.id), 'text': payload.get('text', ''), 'payload': payload})
+            if offset is None:
+                break
+    except Exception as e:
+        print(f"Error loading job catalog from Qdrant collection '{collection_name}': {e}")
+    return jobs
 
-        points_to_upsert = []
-        print(f"Generating embeddings and preparing points for {len(jobs)} jobs...")
-        count = 0
-        batch_size = 16 # Process in batches
-        for i in range(0, len(jobs), batch_size):
-            batch_jobs = jobs[i:i+batch_size]
-            job_texts = [job['text'] for job in batch_jobs]
 
-            # Get embeddings in batch (more efficient if API supports it, Azure client handles it)
+class UpsertError(Exception):
+    """Raised when some points could not be written to Qdrant, leaving the collection partially indexed."""
+
+    def __init__(self, message, written, dropped):
+        super().__init__(message)
+        self.written = written
+        self.dropped = dropped
+
+
+class BackgroundUpserter:
+    """Sends Qdrant upserts from writer threads with wait=False, so embedding never waits on Qdrant.
+
+    Batch sizes follow an AIMD controller on upsert latency. The last points
+    are held back and sent with wait=True by close() after every writer has
+    finished. That acknowledgement only covers the shard receiving those
+    points, so it is a consistency barrier for the whole run on single-shard
+    collections (the default) only; on sharded collections earlier batches
+    may still be applying when close() returns. After the first failed
+    upsert the remaining batches are dropped, and close() raises UpsertError.
+    """
+
+    def __init__(self, collection_name, writers=UPSERT_WRITERS, max_queued_batches=UPSERT_QUEUE_BATCHES):
+        if qdrant_url == ":memory:":
+            writers = 1 # The in-process client is not safe for concurrent writes
+        self.collection_name = collection_name
+        self.rate = AdaptiveRateController("index_upsert", **UPSERT_RATE_LIMITS)
+        self.count = 0
+        self.dropped = 0
+        self._buffer = []
+        self._queue = queue.Queue(maxsize=max_queued_batches)
+        self._lock = threading.Lock()
+        self._error = None
+        self._writers = [threading.Thread(target=self._run, name=f"qdrant-writer-{i}", daemon=True) for i in range(writers)]
+        for writer in self._writers:
+            writer.start()
+
+    def add(self, points):
+        """Buffers points and hands full batches to the writers (blocks when they fall behind)."""
+        self._buffer.extend(points)
+        # Strictly greater: at least one point always stays buffered for the final wait=True barrier
+        while len(self._buffer) > self.rate.batch_size:
+            batch, self._buffer = self._buffer[:self.rate.batch_size], self._buffer[self.rate.batch_size:]
+            self._queue.put(batch)
+
+    def _upsert(self, points, wait):
+        start = time.perf_counter()
+        with stage_timer("qdrant_upsert"):
+            qdrant_client.upsert(collection_name=self.collection_name, points=points, wait=wait)
+        self.rate.record_success(time.perf_counter() - start)
+        with self._lock:
+            self.count += len(points)
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if self._error is not None:
+                self._drop(batch) # Keep draining so producers never block on a dead writer
+                continue
+            try:
+                self._upsert(batch, wait=False)
+            except Exception as e:
+                print(f"Error upserting {len(batch)} points to Qdrant: {e}")
+                increment("api_errors", api="qdrant_upsert")
+                self._error = e
+                self._drop(batch)
+
+    def _drop(self, points):
+        with self._lock:
+            self.dropped += len(points)
+        increment("points_dropped", len(points), collection=self.collection_name)
+
+    def close(self):
+        """Waits for the writers, then upserts the remaining points with wait=True. Returns the number of points written.
+
+        Raises UpsertError (with the written and dropped counts) if any upsert failed.
+        """
+        for _ in self._writers:
+            self._queue.put(None)
+        for writer in self._writers:
+            writer.join()
+        if self._error is None and self._buffer:
             try:
-                 embeddings = [get_azure_embedding(text) for text in job_texts]
+                self._upsert(self._buffer, wait=True)
             except Exception as e:
-                 print(f"Error getting batch embeddings: {e}. Retrying individually.")
-                 embeddings = []
-                 for text in job_texts:
-                     # Add slight delay if hitting rate limits
-                     time.sleep(0.1)
-                     embeddings.append(get_azure_embedding(text))
+                increment("api_errors", api="qdrant_upsert")
+                self._error = e
+                self._drop(self._buffer)
+        elif self._buffer:
+            self._drop(self._buffer)
+        self._buffer = []
+        if self._error is not None:
+            raise UpsertError(f"{self.dropped} points were not written to Qdrant collection '{self.collection_name}' "
+                              f"({self.count} were): {self._error}", self.count, self.dropped) from self._error
+        return self.count
+
+
+def embed_texts_adaptively(texts, on_batch, controller_name="embedding"):
+    """Embeds texts in batched, concurrent requests sized by an AIMD controller.
+
+    on_batch(positions, embeddings) is called on the calling thread as each
+    request completes (in completion order); failed embeddings are None.
+    """
+    # Batch size and number of in-flight embedding requests adapt to observed 429s and latency (AIMD)
+    embedding_rate = AdaptiveRateController(controller_name, **EMBEDDING_RATE_LIMITS)
+    pending = list(range(len(texts) - 1, -1, -1)) # Popped from the end, so texts go out in order
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=embedding_rate.max_concurrency, thread_name_prefix="embed") as executor:
+        while pending or in_flight:
+            while pending and len(in_flight) < embedding_rate.concurrency:
+                positions = [pending.pop() for _ in range(min(embedding_rate.batch_size, len(pending)))]
+                future = executor.submit(embed_texts, [texts[p] for p in positions], rate_controller=embedding_rate)
+                in_flight[future] = positions
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                on_batch(in_flight.pop(future), future.result())
+
+
+def embed_texts_in_order(texts, controller_name="embedding"):
+    """Embeds texts with embed_texts_adaptively and returns all vectors in input order (None where it failed)."""
+    embeddings = [None] * len(texts)
+
+    def on_batch(positions, batch):
+        for position, embedding in zip(positions, batch):
+            embeddings[position] = embedding
+
+    embed_texts_adaptively(texts, on_batch, controller_name)
+    return embeddings
+
+
+def _retry_dead_letters(dead_letters):
+    """Re-embeds dead-lettered jobs once the embedding circuit allows it; returns (recovered points, jobs that still failed)."""
+    entries = dead_letters.drain()
+    if not entries:
+        return [], []
+    wait = embedding_breaker.seconds_until_trial()
+    if wait:
+        print(f"Embedding circuit is open; waiting {min(wait, DEAD_LETTER_MAX_WAIT_SECONDS):.0f}s before retrying dead letters.")
+        time.sleep(min(wait, DEAD_LETTER_MAX_WAIT_SECONDS))
+    print(f"Retrying {len(entries)} dead-lettered jobs...")
+    points, failed_jobs = [], []
+    for job, _ in entries:
+        embedding = embed_text(job['text'])
+        if embedding is not None:
+            points.append(PointStruct(id=job['id'], vector=embedding, payload=job['payload']))
+        else:
+            failed_jobs.append(job)
+    return points, failed_jobs
 
 
-            for job, embedding in zip(batch_jobs, embeddings):
-                 if embedding is not None and any(embedding): # Check for valid embedding
+@timed("index_jobs")
+def index_jobs_to_qdrant(jobs, collection_name=QDRANT_COLLECTION_NAME, recreate=False):
+    """Creates Qdrant collection and indexes jobs with embeddings.
+
+    Jobs that already carry an 'embedding' (e.g. from deduplicate_jobs) are
+    not embedded again. recreate=True drops an existing collection first, so
+    no points from earlier runs remain. Jobs whose embedding fails are
+    dead-lettered and retried once at the end of the run; returns the jobs
+    that could still not be indexed. Raises UpsertError if points were
+    embedded but could not be written.
+    """
+    dead_letters = DeadLetterQueue("index_jobs")
+    failed_jobs = []
+    try:
+        # Create the collection if needed (quantization, on-disk storage and HNSW settings come from qdrant_collections)
+        ensure_collection(qdrant_client, collection_name, EMBEDDING_DIMENSION, recreate=recreate) # We are handling sparse vectors separately
+        if qdrant_url != ":memory:": # Local mode filters by scanning and only warns about payload indexes
+            create_job_payload_indexes(qdrant_client, collection_name)
+
+        print(f"Generating embeddings and preparing points for {len(jobs)} jobs...")
+        upserter = BackgroundUpserter(collection_name)
+
+        def on_embedded(positions, embeddings):
+            points_to_upsert = []
+            for position, embedding in zip(positions, embeddings):
+                 job = jobs[position]
+                 if embedding is not None: # Check for valid embedding
                      points_to_upsert.append(
                          PointStruct(
                              id=job['id'],
@@ -105,55 +389,179 @@ def index_jobs_to_qdrant(jobs, collection_name=QDRANT_COLLECTION_NAME):
                          )
                      )
                  else:
-                     print(f"Warning: Skipping job {job['id']} due to embedding failure.")
-
-            if points_to_upsert:
-                 print(f"Upserting batch {i//batch_size + 1} ({len(points_to_upsert)} points)...")
-                 qdrant_client.upsert(collection_name=collection_name, points=points_to_upsert, wait=True)
-                 count += len(points_to_upsert)
-                 points_to_upsert = [] # Reset batch
-            time.sleep(0.5) # Small delay between batches
+                     print(f"Warning: Embedding failed for job {job['id']}; queued for retry.")
+                     dead_letters.add(job)
+            upserter.add(points_to_upsert)
+
+        embedded = [position for position, job in enumerate(jobs) if job.get('embedding') is not None]
+        if embedded:
+            on_embedded(embedded, [jobs[position]['embedding'] for position in embedded])
+        pending = [position for position, job in enumerate(jobs) if job.get('embedding') is None]
+        embed_texts_adaptively([jobs[position]['text'] for position in pending],
+                               lambda positions, embeddings: on_embedded([pending[p] for p in positions], embeddings),
+                               "index_embedding")
+
+        recovered_points, failed_jobs = _retry_dead_letters(dead_letters)
+        upserter.add(recovered_points)
+        print("Waiting for pending Qdrant upserts...")
+        count = upserter.close()
+        for job in failed_jobs:
+            print(f"Warning: Skipping job {job['id']} due to embedding failure.")
+            increment("jobs_skipped", reason="embedding_failure")
+
+        print(f"Successfully indexed {count} jobs into Qdrant collection '{collection_name}'"
+              + (f" ({len(failed_jobs)} failed)." if failed_jobs else "."))
+
+    except UpsertError:
+        raise # A partially indexed collection must not look like a successful run
+    except Exception as e:
+        print(f"Error during Qdrant indexing: {e}")
+    return failed_jobs
 
-        print(f"Successfully indexed {count} jobs into Qdrant collection '{collection_name}'.")
+@timed("index_job_chunks")
+def index_job_chunks_to_qdrant(jobs, collection_name=QDRANT_CHUNK_COLLECTION_NAME, recreate=False):
+    """Chunks each job text, embeds all chunks in adaptive batches and stores them as one multi-vector point per job.
 
+    Jobs keep whichever chunks embedded successfully; returns the jobs with no chunk embedded.
+    """
+    failed_jobs = []
+    try:
+        ensure_collection(qdrant_client, collection_name, EMBEDDING_DIMENSION, recreate=recreate, multivector=True)
+        if qdrant_url != ":memory:":
+            create_job_payload_indexes(qdrant_client, collection_name)
+
+        chunk_texts, owners = [], []
+        chunk_vectors, remaining = [], []
+        for job_position, job in enumerate(jobs):
+            chunks = chunk_text(job['text'])
+            chunk_texts.extend(chunks)
+            owners.extend((job_position, chunk_position) for chunk_position in range(len(chunks)))
+            chunk_vectors.append([None] * len(chunks))
+            remaining.append(len(chunks))
+        print(f"Embedding {len(chunk_texts)} chunks for {len(jobs)} jobs...")
+        upserter = BackgroundUpserter(collection_name)
+
+        def on_embedded(positions, embeddings):
+            points_to_upsert = []
+            for position, embedding in zip(positions, embeddings):
+                job_position, chunk_position = owners[position]
+                chunk_vectors[job_position][chunk_position] = embedding
+                remaining[job_position] -= 1
+                if remaining[job_position]:
+                    continue
+                job = jobs[job_position]
+                vectors = [vector for vector in chunk_vectors[job_position] if vector is not None]
+                missing = len(chunk_vectors[job_position]) - len(vectors)
+                chunk_vectors[job_position] = None # Free the job's vectors once handed to the upserter
+                if missing:
+                    increment("chunk_embedding_failures", missing)
+                if not vectors:
+                    failed_jobs.append(job)
+                    continue
+                payload = {key: job['payload'].get(key) for key in CHUNK_PAYLOAD_FIELDS if key in job['payload']}
+                points_to_upsert.append(PointStruct(id=job['id'], vector=vectors, payload=payload))
+            upserter.add(points_to_upsert)
+
+        embed_texts_adaptively(chunk_texts, on_embedded, "index_chunk_embedding")
+        count = upserter.close()
+        for job in failed_jobs:
+            print(f"Warning: Skipping chunks of job {job['id']} due to embedding failure.")
+            increment("jobs_skipped", reason="chunk_embedding_failure")
+        print(f"Indexed chunk vectors for {count} jobs into Qdrant collection '{collection_name}'.")
+    except UpsertError:
+        raise
     except Exception as e:
-        print(f"Error during Qdrant indexing: {e}")
+        print(f"Error during Qdrant chunk indexing: {e}")
+    return failed_jobs
+
 
 # --- Matching Logic ---
 
-def perform_dense_search(query_text, top_k=10):
-    """Performs dense vector search in Qdrant."""
-    query_vector = get_azure_embedding(query_text)
-    if not any(query_vector):
+@timed("embed_chunks")
+def embed_query_chunks(query_text):
+    """Chunks a query (e.g. a resume) and embeds all chunks in one batched request; None if nothing embedded."""
+    embeddings = embed_texts(chunk_text(query_text))
+    embeddings = [embedding for embedding in embeddings if embedding is not None]
+    return embeddings or None
+
+
+def perform_multivector_search(query_vectors, top_k=10, job_filter=None, collection_name=QDRANT_CHUNK_COLLECTION_NAME):
+    """Late-interaction search: each job scores the sum over query chunks of its best-matching chunk (MaxSim)."""
+    if not query_vectors:
+        print("Error: No query chunk embeddings for multi-vector search.")
+        return []
+    try:
+        with stage_timer("dense_search"):
+            search_result = qdrant_client.query_points(
+                collection_name=collection_name,
+                query=query_vectors,
+                limit=top_k,
+                query_filter=to_qdrant_filter(job_filter),
+                search_params=DENSE_SEARCH_PARAMS,
+                with_payload=True
+            ).points
+        return [{"id": hit.id, "score": hit.score, "payload": hit.payload} for hit in search_result]
+    except Exception as e:
+        print(f"Error during Qdrant multi-vector search: {e}")
+        increment("api_errors", api="qdrant_search")
+        return []
+
+
+def perform_dense_search(query_text, top_k=10, query_vector=None, job_filter=None):
+    """Performs dense vector search in Qdrant. Pass query_vector to reuse an embedding computed upstream.
+
+    job_filter (see job_filters.build_job_filter) is applied server-side against the payload indexes.
+    """
+    if query_vector is None:
+        query_vector = embed_text(query_text)
+    if query_vector is None:
         print("Error: Could not generate query embedding for dense search.")
         return []
     try:
-        search_result = qdrant_client.search(
-            collection_name=QDRANT_COLLECTION_NAME,
-            query_vector=query_vector,
-            limit=top_k
-        )
+        with stage_timer("dense_search"):
+            search_result = qdrant_client.search(
+                collection_name=QDRANT_COLLECTION_NAME,
+                query_vector=query_vector,
+                limit=top_k,
+                query_filter=to_qdrant_filter(job_filter),
+                search_params=DENSE_SEARCH_PARAMS
+            )
         # Convert ScoredPoint to a simpler dict
         return [{"id": hit.id, "score": hit.score, "payload": hit.payload} for hit in search_result]
     except Exception as e:
         print(f"Error during Qdrant dense search: {e}")
+        increment("api_errors", api="qdrant_search")
         return []
 
-def perform_sparse_search(query_text, bm25_index, job_corpus_ids, top_k=10):
-    """Performs sparse search using BM25."""
+@timed("sparse_search")
+def perform_sparse_search(query_text, bm25_index, job_corpus_ids, top_k=10, mask=None):
+    """Performs sparse search using BM25.
+
+    mask (a boolean array over the corpus, see job_filters.JobFieldIndex) restricts
+    scoring to the matching jobs.
+    """
     tokenized_query = preprocess_text_for_bm25(query_text)
     if not tokenized_query:
         return []
     try:
-        # Get scores for all documents in the corpus
-        doc_scores = bm25_index.get_scores(tokenized_query)
+        if mask is None:
+            # Get scores for all documents in the corpus
+            doc_scores = np.asarray(bm25_index.get_scores(tokenized_query))
+            candidate_indices = np.arange(len(doc_scores))
+        else:
+            # Only score the jobs that pass the filter
+            candidate_indices = np.flatnonzero(mask)
+            if not len(candidate_indices):
+                return []
+            doc_scores = np.asarray(bm25_index.get_batch_scores(tokenized_query, candidate_indices))
 
         # Get top N indices and their scores
-        top_n_indices = np.argsort(doc_scores)[::-1][:top_k]
+        top_n_positions = np.argsort(doc_scores)[::-1][:top_k]
         results = []
-        for idx in top_n_indices:
+        for position in top_n_positions:
+             idx = candidate_indices[position]
              # Ensure score is not negative infinity or NaN
-             score = doc_scores[idx]
+             score = doc_scores[position]
              if np.isfinite(score):
                  results.append({
                      "id": job_corpus_ids[idx], # Map index back to job ID
@@ -165,9 +573,10 @@ def perform_sparse_search(query_text, bm25_index, job_corpus_ids, top_k=10):
         return []
 
 
-def combine_results_rrf(dense_results, sparse_results, k=60):
+def combine_results_rrf(dense_results, sparse_results, k=RRF_K, weights=(DENSE_WEIGHT, SPARSE_WEIGHT),
+                        method=FUSION_METHOD, depths=(DENSE_DEPTH, SPARSE_DEPTH), dedup=FUSION_DEDUP):
     """
-    Combines dense and sparse search results using Reciprocal Rank Fusion (RRF),
+    Combines dense and sparse search results with the fusion engine (see fusion.py),
     handling string-based UUIDs as document IDs.
 
     Args:
@@ -175,90 +584,99 @@ def combine_results_rrf(dense_results, sparse_results, k=60):
                        Each result must have an 'id' attribute/key.
         sparse_results: List of search results (e.g., ScoredPoint objects or dicts) from sparse vector search.
                         Each result must have an 'id' attribute/key.
-        k (int): The ranking constant for RRF (default: 60).
+        k (float): The ranking constant for RRF (default: $RRF_K, 60).
+        weights: Weights of the dense and sparse legs.
+        method (str): 'rrf', or 'minmax' / 'zscore' to combine normalized raw scores.
+        depths: How many hits of each leg are fused.
+        dedup (bool): Collapse jobs with identical text (e.g. re-indexed under a new UUID) into one result.
 
     Returns:
         list: A list of dictionaries, each containing the 'id' (string UUID),
-              'rrf_score', and 'payload' of the combined and ranked results.
+              'rrf_score', 'fusion_score' (the ranking score; equal to rrf_score
+              for method='rrf'), 'dense_rank' and 'sparse_rank' (1-based, None if
+              absent from that list), 'duplicate_ids' and 'payload' of the
+              combined and ranked results.
               Returns results with payload=None if retrieval fails.
     """
-    combined_scores = defaultdict(float)
-
-    # Helper function to process results and ensure ID is string
-    def process_results(results, current_rank_offset=0):
-        # Start enumeration from 0 for rank calculation relative to the list start
-        for rank, result in enumerate(results):
-            # Handle both ScoredPoint objects and dictionaries for flexibility
-            doc_id_raw = getattr(result, 'id', None) or result.get('id')
-            if doc_id_raw is None:
-                print(f"Warning: Skipping result at rank {rank} due to missing ID.")
-                continue
-
-            # Ensure doc_id is a string for consistency (handles UUID objects or strings)
-            doc_id = str(doc_id_raw)
-
-            # RRF formula uses the rank within its own list (0-based)
-            combined_scores[doc_id] += 1.0 / (k + rank + 1)
-
-    # Process dense and sparse results
-    process_results(dense_results)
-    process_results(sparse_results)
-
-
-    # Sort by combined RRF score in descending order
-    # combined_scores.items() -> [('uuid-str-1', score1), ('uuid-str-3', score3), ...]
-    sorted_results = sorted(combined_scores.items(), key=lambda item: item[1], reverse=True)
-
-    # Retrieve payloads for the top results from Qdrant
-    final_results = []
-    # Ensure top_ids contains strings
-    top_ids = [doc_id for doc_id, score in sorted_results]
-
-    if not top_ids:
+    # Payloads are needed up front: deduplication keys on the job text
+    candidate_ids = list(dict.fromkeys(
+        str(result_id(result))
+        for results, depth in zip((dense_results, sparse_results), depths) for result in results[:depth]
+        if result_id(result) is not None
+    ))
+    if not candidate_ids:
         return [] # No results to combine or retrieve
 
+    payload_map = None
     try:
         # Fetch points from Qdrant using the string UUIDs
-        qdrant_points = qdrant_client.retrieve(
-            collection_name=QDRANT_COLLECTION_NAME,
-            ids=top_ids, # Pass the list of string UUIDs
-            with_payload=True,
-            with_vectors=False
-        )
-
+        with stage_timer("retrieve"):
+            qdrant_points = qdrant_client.retrieve(
+                collection_name=QDRANT_COLLECTION_NAME,
+                ids=candidate_ids, # Pass the list of string UUIDs
+                with_payload=True,
+                with_vectors=False
+            )
         # Create a map for quick payload lookup using string UUIDs
-        # Ensure point.id is also treated as string for map keys
         payload_map = {str(point.id): point.payload for point in qdrant_points}
-
-        # Build final results list, preserving the RRF order
-        for doc_id, rrf_score in sorted_results: # doc_id is already a string here from the initial processing/sorting
-            payload = payload_map.get(doc_id)
-            # Include result even if payload is missing (was None or retrieve failed for that ID)
-            final_results.append({
-                "id": doc_id,
-                "rrf_score": rrf_score,
-                "payload": payload # Will be None if not found in payload_map or if originally None
-            })
-
     except Exception as e:
         print(f"Error retrieving payloads for RRF results: {e}. Returning results without payloads.")
-        # Fallback: return IDs and scores only
-        final_results = [{"id": str(doc_id), "rrf_score": rrf_score, "payload": None}
-                         for doc_id, rrf_score in sorted_results]
+        increment("api_errors", api="qdrant_retrieve")
 
+    with stage_timer("rrf"):
+        keys = {}
+        if dedup and payload_map:
+            keys = {doc_id: content_key(payload, doc_id) for doc_id, payload in payload_map.items()}
+        fused = fuse_ranked_lists([dense_results, sparse_results], weights, keys=keys, method=method,
+                                  k=k, depths=depths, dedup=dedup)
+
+    # Build final results list, preserving the fused order
+    final_results = []
+    for result in fused:
+        dense_rank, sparse_rank = result['ranks']
+        final_results.append({
+            "id": result['id'],
+            "rrf_score": result['rrf_score'],
+            "fusion_score": result['fusion_score'],
+            "dense_rank": dense_rank,
+            "sparse_rank": sparse_rank,
+            "duplicate_ids": result['duplicate_ids'],
+            # None if not found in payload_map or if the retrieve failed
+            "payload": payload_map.get(result['id']) if payload_map is not None else None
+        })
+    duplicates = sum(len(result['duplicate_ids']) for result in fused)
+    if duplicates:
+        increment("fusion_duplicates_collapsed", duplicates)
     return final_results
 
-def score_fit_hybrid(rrf_score):
-    """Converts RRF score to a 1-10 scale with significant differentiation between scores."""
-    # Typical RRF scores are small but meaningful differences matter
-    # Using a logarithmic scale to amplify differences
-    max_observed_rrf = 0.04  # Base calibration value
-    
-    if rrf_score <= 0:
-        return 1.0
-
-    log_score = np.log1p(rrf_score * 100) / np.log1p(max_observed_rrf * 100)
-    scaled_score = 1.0 + 9.0 * (log_score ** 1.5)
-    fit_score = round(scaled_score * 2) / 2.0
-    
-    return max(1.0, min(10.0, fit_score))  # Ensure score is within [1, 10]
+def score_fit_hybrid(fusion_score, calibration_path=FIT_CALIBRATION_FILE, method=FUSION_METHOD,
+                     weights=(DENSE_WEIGHT, SPARSE_WEIGHT)):
+    """Converts fused scores (one score or an array of the 'fusion_score' results are sorted by) to a 1-10 scale.
+
+    Uses the calibration fitted on past matches (see calibration.py) when one
+    exists for this fusion method; otherwise a fixed curve per method: a log
+    curve that assumes RRF scores up to ~0.04, a linear one over the minmax
+    range, or the normal CDF of the weighted z-score sum. Either way a lower
+    ranked match never gets a higher fit score.
+    """
+    calibration = get_fit_calibration(calibration_path)
+    scores = np.asarray(fusion_score, dtype=float)
+    if calibration is not None and calibration.fusion.get('method') == method:
+        fit_scores = calibration.apply(scores)
+    elif method == "rrf":
+        # Typical RRF scores are small but meaningful differences matter
+        # Using a logarithmic scale to amplify differences
+        max_observed_rrf = 0.04  # Base calibration value
+        log_score = np.log1p(np.maximum(scores, 0) * 100) / np.log1p(max_observed_rrf * 100)
+        scaled_score = 1.0 + 9.0 * (log_score ** 1.5)
+        fit_scores = np.where(scores <= 0, 1.0, np.clip(np.round(scaled_score * 2) / 2.0, 1.0, 10.0))  # Ensure score is within [1, 10]
+    else:
+        weights = np.asarray(weights, dtype=float)
+        if method == "minmax":
+            fraction = scores / (weights.sum() or 1.0) # Each leg adds at most its weight
+        else:
+            # A weighted sum of standard scores has a standard deviation of about the weights' norm
+            z = scores / (np.sqrt((weights ** 2).sum()) or 1.0)
+            fraction = 0.5 * (1.0 + np.vectorize(math.erf, otypes=[float])(z / math.sqrt(2)))
+        fit_scores = np.clip(np.round((1.0 + 9.0 * fraction) * 2) / 2.0, 1.0, 10.0)
+    return float(fit_scores) if np.ndim(fit_scores) == 0 else fit_scores
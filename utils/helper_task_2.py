@@ -9,7 +9,50 @@ from dotenv import load_dotenv
 from openai import AzureOpenAI
 from thefuzz import fuzz # For fuzzy string matching
 import numpy as np
-import nltk # Using NLTK for tokenization if needed
+from utils.skill_matcher import default_skill_matcher, extract_job_skills
+from utils.title_matcher import title_similarity
+
+def load_candidates(candidate_csv):
+    """Loads the Juicebox candidate export, adding a 'Full Name' column. Returns None on error."""
+    try:
+        candidates_df = pd.read_csv(candidate_csv)
+        candidates_df['Full Name'] = candidates_df['First name'].fillna('') + ' ' + candidates_df['Last name'].fillna('')
+        candidates_df['LinkedIn'] = candidates_df['LinkedIn'].str.strip()
+        print(f"Loaded {len(candidates_df)} candidates.")
+        return candidates_df
+    except FileNotFoundError:
+        print(f"Error: Candidate CSV not found at {candidate_csv}")
+    except Exception as e:
+        print(f"Error loading candidates CSV: {e}")
+    return None
+
+def load_linkedin_profiles(linkedin_json):
+    """Loads scraped LinkedIn profiles keyed by their linkedin.com/in/ URL."""
+    linkedin_profiles = {}
+    try:
+        with open(linkedin_json, 'r') as f:
+            linkedin_data_list = json.load(f)
+        for profile in linkedin_data_list:
+            profile_url = f"https://linkedin.com/in/{profile.get('public_identifier', '')}".strip()
+            if profile_url:
+                 linkedin_profiles[profile_url] = profile
+        print(f"Loaded {len(linkedin_profiles)} scraped LinkedIn profiles.")
+    except FileNotFoundError:
+        print(f"Warning: LinkedIn JSON not found at {linkedin_json}. Enhancement will be limited.")
+    except Exception as e:
+        print(f"Error loading LinkedIn JSON: {e}")
+    return linkedin_profiles
+
+def build_job_summary(job_row):
+    """Selects the job fields used for candidate scoring from a Paraform job row (dict)."""
+    return {
+        'Role': job_row.get('Role'),
+        'Company': job_row.get('Company'),
+        'YOE': job_row.get('YOE'),
+        'Requirements': job_row.get('Requirements', ''),
+        'Tech Stack': job_row.get('Tech Stack', ''),
+        'Industry': job_row.get('Industry', '')
+    }
 
 def parse_yoe_string(yoe_str):
     """Parses YOE strings like '5-10 years', '3+ years', '2 years' into min/max."""
@@ -81,44 +124,33 @@ def calculate_experience_details(experiences):
     return total_yoe, job_hopping_flag
 
 def extract_skills(profile_data, juicebox_data):
-    """Extracts skills from combined profile data."""
+    """Extracts canonical skills from combined profile data using the skill taxonomy."""
     skills = set()
+    text_parts = []
 
     # From LinkedIn data (if available)
     if profile_data:
         if profile_data.get('skills'): # Direct skills list
              for skill in profile_data['skills']:
-                 if isinstance(skill, str): # Proxycurl sometimes returns list of strings
-                      skills.add(skill.lower())
-                 elif isinstance(skill, dict) and 'name' in skill: # Or list of dicts
-                      skills.add(skill['name'].lower())
-
-        if profile_data.get('headline'):
-            # Simple tokenization of headline
-            tokens = re.findall(r'\b\w+\b', profile_data['headline'].lower())
-            skills.update(tokens) # Add individual words
-
-        if profile_data.get('summary'):
-             tokens = re.findall(r'\b\w+\b', profile_data['summary'].lower())
-             skills.update(tokens)
-
-        if profile_data.get('experiences'):
-            for exp in profile_data['experiences']:
-                if exp.get('title'):
-                    tokens = re.findall(r'\b\w+\b', exp['title'].lower())
-                    skills.update(tokens)
-                if exp.get('description'):
-                    tokens = re.findall(r'\b\w+\b', exp['description'].lower())
-                    skills.update(tokens)
+                 if isinstance(skill, dict): # Proxycurl sometimes returns list of dicts
+                      skill = skill.get('name')
+                 if isinstance(skill, str) and len(skill.strip()) > 1:
+                      # Keep self-reported skills even if they are not in the taxonomy
+                      skills.add(default_skill_matcher.canonicalize(skill) or skill.strip().lower())
+
+        text_parts.append(profile_data.get('headline') or '')
+        text_parts.append(profile_data.get('summary') or '')
+        for exp in profile_data.get('experiences') or []:
+            text_parts.append(exp.get('title') or '')
+            text_parts.append(exp.get('description') or '')
 
     # From Juicebox data (fallback or supplement)
-    if juicebox_data.get('Current Title'):
-        tokens = re.findall(r'\b\w+\b', juicebox_data['Current Title'].lower())
-        skills.update(tokens)
+    current_title = juicebox_data.get('Current Title')
+    if isinstance(current_title, str):
+        text_parts.append(current_title)
 
-    # Basic cleanup (remove generic terms, could use NLTK stopwords)
-    common_words = {'at', 'and', 'the', 'of', 'in', 'on', 'engineer', 'software', 'developer', 'manager', 'senior', 'lead', 'data', 'product'}
-    skills = {skill for skill in skills if skill not in common_words and len(skill) > 1}
+    # Single automaton pass over the whole profile document
+    skills.update(default_skill_matcher.match('\n'.join(text_parts)))
 
     return list(skills)
 
@@ -163,70 +195,124 @@ def check_startup_fit(experiences, job_company_context):
              return 0.5 # Unclear / Mixed
          
 ####### SCORING ########
-         
+
+SCORE_WEIGHTS = {
+    "title": 0.25,
+    "yoe": 0.20,
+    "tech_stack": 0.35,
+    "startup_fit": 0.10,
+    "tenure_penalty": 0.10 # Penalty weight if job hopping detected
+}
+
+
+def build_candidate_profile(juicebox_info, scraped_profile, job_summary):
+    """Builds the unified candidate summary (without skills) from Juicebox and scraped LinkedIn data."""
+    candidate_unified = {
+        'name': juicebox_info.get('Full Name'),
+        'linkedin': juicebox_info.get('LinkedIn'),
+        'location': juicebox_info.get('Location'),
+        'current_title': juicebox_info.get('Current Title')
+    }
+    if scraped_profile:
+         candidate_unified['current_title'] = scraped_profile.get('occupation', candidate_unified['current_title'])
+         candidate_unified['headline'] = scraped_profile.get('headline')
+         candidate_unified['summary'] = scraped_profile.get('summary')
+         candidate_unified['experiences'] = scraped_profile.get('experiences', [])
+         candidate_unified['skills_direct'] = scraped_profile.get('skills', [])
+         yoe, hopping = calculate_experience_details(candidate_unified['experiences'])
+         candidate_unified['yoe'] = yoe
+         candidate_unified['job_hopping'] = hopping
+         candidate_unified['startup_fit'] = check_startup_fit(candidate_unified['experiences'], job_summary)
+    else:
+         candidate_unified['yoe'] = 0
+         candidate_unified['job_hopping'] = False
+         candidate_unified['startup_fit'] = 0.5
+    return candidate_unified
+
+
+def title_match_score(candidate_data, job_data):
+    """Similarity (0-1) of the candidate's current title to the job role."""
+    candidate_title, job_role = candidate_data.get('current_title', ''), job_data.get('Role', '')
+    if not candidate_title or not job_role:
+        return 0.0
+    return title_similarity(candidate_title, job_role) # Memoized token-set ratio / 100
+
+
+def yoe_match_score(cand_yoe, job_yoe_min, job_yoe_max):
+    """How well the candidate's years of experience meet the job's range (0-1; 0.5 if the requirement is unclear)."""
+    if job_yoe_min is None:
+        return 0.5 # Cannot determine requirement, neutral score
+    if cand_yoe >= job_yoe_min:
+        yoe_score = 1.0 # Meets minimum
+        if job_yoe_max is not None and job_yoe_max != float('inf') and cand_yoe > job_yoe_max * 1.5:
+             yoe_score *= 0.8 # Slight penalty for being vastly overqualified
+        return yoe_score
+    # Penalize based on how far below minimum
+    return max(0, 1.0 - (job_yoe_min - cand_yoe) / job_yoe_min) # Linear penalty
+
+
+def score_upper_bound(candidate_data, job_data):
+    """Best score (1-10) score_candidate_fit can give the candidate before its skills are known.
+
+    Title, YOE, startup fit and tenure are scored exactly; only the tech
+    stack match is assumed perfect. A candidate whose bound does not beat the
+    current top-k cutoff can be skipped before skill extraction.
+    """
+    weights = SCORE_WEIGHTS
+    job_yoe_min, job_yoe_max = parse_yoe_string(job_data.get('YOE', ''))
+    best_score = title_match_score(candidate_data, job_data) * weights['title']
+    best_score += yoe_match_score(candidate_data.get('yoe', 0), job_yoe_min, job_yoe_max) * weights['yoe']
+    best_score += weights['tech_stack']
+    best_score += candidate_data.get('startup_fit', 0.5) * weights['startup_fit']
+    if candidate_data.get('job_hopping', False):
+        best_score -= weights['tenure_penalty']
+    return round(1 + max(0, best_score) * 9, 1)
+
+
 def score_candidate_fit(candidate_data, job_data):
     """Scores a candidate against a job based on multiple criteria."""
     score_details = {}
     final_score = 0.0
-
-    weights = {
-        "title": 0.25,
-        "yoe": 0.20,
-        "tech_stack": 0.35,
-        "startup_fit": 0.10,
-        "tenure_penalty": 0.10 # Penalty weight if job hopping detected
-    }
+    weights = SCORE_WEIGHTS
 
     # --- 1. Title Match --- #
     candidate_title = candidate_data.get('current_title', '')
     job_role = job_data.get('Role', '')
-    title_score = 0.0
-    if candidate_title and job_role:
-        match_ratio = fuzz.token_set_ratio(candidate_title.lower(), job_role.lower())
-        title_score = match_ratio / 100.0
+    title_score = title_match_score(candidate_data, job_data)
     score_details['title'] = f"{title_score:.2f} (Cand: '{candidate_title}' vs Job: '{job_role}')"
     final_score += title_score * weights['title']
 
     # --- 2. YOE Match --- #
     cand_yoe, job_hopping = candidate_data.get('yoe', 0), candidate_data.get('job_hopping', False)
     job_yoe_min, job_yoe_max = parse_yoe_string(job_data.get('YOE', ''))
-    yoe_score = 0.0
     yoe_detail = f"Cand YOE: {cand_yoe}, Job Req: {job_data.get('YOE', 'N/A')}"
 
+    yoe_score = yoe_match_score(cand_yoe, job_yoe_min, job_yoe_max)
     if job_yoe_min is not None:
-        if cand_yoe >= job_yoe_min:
-            yoe_score = 1.0 # Meets minimum
-            if job_yoe_max is not None and job_yoe_max != float('inf') and cand_yoe > job_yoe_max * 1.5:
-                 yoe_score *= 0.8 # Slight penalty for being vastly overqualified
-        else:
-            # Penalize based on how far below minimum
-            yoe_score = max(0, 1.0 - (job_yoe_min - cand_yoe) / job_yoe_min) # Linear penalty
         yoe_detail += f" -> Score: {yoe_score:.2f}"
     else:
-        yoe_score = 0.5 # Cannot determine requirement, neutral score
         yoe_detail += " -> Score: 0.5 (Job YOE unclear)"
     score_details['yoe'] = yoe_detail
     final_score += yoe_score * weights['yoe']
 
     # --- 3. Tech Stack Match --- #
     candidate_skills = candidate_data.get('skills', [])
-    job_req_text = f"{job_data.get('Requirements', '')} {job_data.get('Tech Stack', '')}".lower()
+    job_req_text = f"{job_data.get('Requirements', '')} {job_data.get('Tech Stack', '')}"
     tech_score = 0.0
     overlap_skills = []
-    if candidate_skills and job_req_text:
-        job_req_tokens = set(re.findall(r'\b\w+\b', job_req_text))
+    if candidate_skills and job_req_text.strip():
+        job_skills = extract_job_skills(job_req_text)
         candidate_skills_set = set(s.lower() for s in candidate_skills) # Ensure lowercase
 
-        # Find intersection
-        overlap_skills = list(candidate_skills_set.intersection(job_req_tokens))
+        # Find intersection of canonical skills
+        overlap_skills = sorted(candidate_skills_set.intersection(job_skills))
 
-        # Score based on number of overlapping skills relative to candidate skills or job requirements
-        relevant_job_tokens = {token for token in job_req_tokens if len(token) > 2 and token not in ['and', 'or', 'the', 'with', 'experience', 'required']}
-        if relevant_job_tokens:
-             tech_score = min(1.0, len(overlap_skills) / max(5, len(relevant_job_tokens)*0.5))
+        # Score based on the share of the job's required skills the candidate covers
+        if job_skills:
+             tech_score = min(1.0, len(overlap_skills) / len(job_skills))
         else:
              tech_score = 0.0
-             
+
     score_details['tech_stack'] = f"{tech_score:.2f} (Overlap: {len(overlap_skills)} skills - {', '.join(overlap_skills[:5])}..)"
     final_score += tech_score * weights['tech_stack']
 
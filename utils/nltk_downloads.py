@@ -1,13 +1,31 @@
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
+import argparse
 import nltk
 
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    print("Downloading NLTK data (punkt, stopwords)...")
-    nltk.download('punkt', quiet=True)
-    nltk.download('stopwords', quiet=True)
-    nltk.download('punkt_tab')
-    print("NLTK data downloaded.")
\ No newline at end of file
+# --- Constants --- #
+# The pipelines no longer need NLTK at runtime (BM25 uses core/text_processing.py); these are
+# only for ad-hoc NLTK use, e.g. test.py
+NLTK_PACKAGES = ('punkt', 'punkt_tab', 'stopwords')
+
+
+def download_nltk_data(download_dir=None, packages=NLTK_PACKAGES):
+    """Downloads the NLTK packages that are missing; pass download_dir to build an offline cache (point NLTK_DATA at it)."""
+    if download_dir:
+        nltk.data.path.insert(0, download_dir)
+    for package in packages:
+        resource = f"corpora/{package}" if package == 'stopwords' else f"tokenizers/{package}"
+        try:
+            nltk.data.find(resource)
+            print(f"NLTK package '{package}' already available.")
+        except LookupError:
+            print(f"Downloading NLTK package '{package}'...")
+            if not nltk.download(package, download_dir=download_dir, quiet=True):
+                raise RuntimeError(f"Could not download NLTK package '{package}'.")
+    print("NLTK data ready.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Explicit, one-off download of NLTK data (nothing is downloaded on import).")
+    parser.add_argument('--download-dir', default=None, help="Target directory, e.g. a cache baked into a container image.")
+    parser.add_argument('--packages', default=",".join(NLTK_PACKAGES))
+    args = parser.parse_args()
+    download_nltk_data(args.download_dir, tuple(args.packages.split(',')))
@@ -0,0 +1,223 @@
+import re
+from collections import deque
+from functools import lru_cache
+
+# Curated skill taxonomy: canonical skill -> aliases (all lowercase).
+# Multi-word skills are matched as token sequences, so "machine learning" only
+# matches the two words in order and never inside another word.
+# Names that are also common words (see AMBIGUOUS_PHRASES) get qualified aliases.
+SKILL_TAXONOMY = {
+    # Languages
+    'python': ['python3'],
+    'java': [],
+    'javascript': ['js', 'ecmascript', 'es6'],
+    'typescript': [],
+    'go': ['golang', 'go lang', 'go programming'],
+    'rust': [],
+    'c++': ['cpp', 'cplusplus'],
+    'c#': ['csharp', 'c sharp'],
+    'ruby': [],
+    'php': [],
+    'scala': [],
+    'kotlin': [],
+    'swift': [],
+    'objective-c': ['objective c', 'objc'],
+    'sql': [],
+    'bash': ['shell scripting'],
+    'elixir': [],
+    'haskell': [],
+    'solidity': [],
+    # Frontend
+    'react': ['reactjs', 'react.js'],
+    'react native': [],
+    'next.js': ['nextjs', 'next js'],
+    'vue': ['vuejs', 'vue.js'],
+    'angular': ['angularjs'],
+    'svelte': ['sveltekit'],
+    'html': ['html5'],
+    'css': ['css3'],
+    'tailwind css': ['tailwind', 'tailwindcss'],
+    'redux': [],
+    'graphql': ['apollo'],
+    # Backend frameworks
+    'node.js': ['nodejs', 'node js', 'node'],
+    'express': ['expressjs', 'express.js'],
+    'django': [],
+    'flask': [],
+    'fastapi': ['fast api'],
+    'spring': ['spring boot', 'springboot', 'spring framework', 'spring mvc'],
+    '.net': ['dotnet', '.net core', 'asp.net'],
+    'rails': ['ruby on rails', 'ror'],
+    'rest api': ['restful', 'rest apis', 'restful apis'],
+    'grpc': [],
+    'microservices': ['micro services', 'microservice'],
+    # Data stores
+    'postgresql': ['postgres', 'psql'],
+    'mysql': [],
+    'mongodb': ['mongo'],
+    'redis': [],
+    'elasticsearch': ['elastic search', 'opensearch'],
+    'snowflake': [],
+    'bigquery': ['big query'],
+    'dynamodb': ['dynamo'],
+    'cassandra': [],
+    'sqlite': [],
+    'kafka': ['apache kafka'],
+    'rabbitmq': [],
+    'spark': ['apache spark', 'pyspark'],
+    'airflow': ['apache airflow'],
+    'dbt': [],
+    'qdrant': [],
+    'pinecone': [],
+    'vector databases': ['vector database', 'vector db'],
+    # Cloud & infra
+    'aws': ['amazon web services', 'ec2', 's3', 'aws lambda'],
+    'gcp': ['google cloud', 'google cloud platform'],
+    'azure': ['microsoft azure'],
+    'docker': ['containerization'],
+    'kubernetes': ['k8s', 'kube', 'eks', 'gke', 'aks'],
+    'terraform': ['infrastructure as code', 'iac'],
+    'ci/cd': ['ci cd', 'cicd', 'continuous integration', 'continuous delivery', 'continuous deployment'],
+    'circleci': ['circle ci'],
+    'github actions': [],
+    'jenkins': [],
+    'git': [],
+    'github': [],
+    'gitlab': [],
+    'linux': ['unix'],
+    'prometheus': [],
+    'grafana': [],
+    'datadog': [],
+    'distributed systems': ['distributed system'],
+    # ML / AI
+    'machine learning': ['ml'],
+    'deep learning': [],
+    'artificial intelligence': ['ai'],
+    'nlp': ['natural language processing'],
+    'computer vision': [],
+    'llm': ['llms', 'large language models', 'large language model'],
+    'generative ai': ['genai', 'gen ai'],
+    'rag': ['retrieval augmented generation'],
+    'pytorch': ['torch'],
+    'tensorflow': ['keras'],
+    'scikit-learn': ['sklearn', 'scikit learn'],
+    'pandas': [],
+    'numpy': [],
+    'hugging face': ['huggingface', 'transformers'],
+    'langchain': [],
+    'openai': ['gpt', 'chatgpt'],
+    'reinforcement learning': [],
+    'mlops': ['ml ops'],
+    'data engineering': ['etl', 'data pipelines', 'data pipeline'],
+}
+
+# Common words that name a skill only in a skills list ("Go", "Spring"); in free text
+# ("go to market", "spring 2020", "express delivery") only their qualified aliases match.
+AMBIGUOUS_PHRASES = frozenset({'go', 'node', 'express', 'spring', 'ai'})
+
+# Tokens keep the characters that appear in skill names (c++, c#, node.js, .net, ci/cd).
+SKILL_TOKEN_PATTERN = re.compile(r"\.?[a-z0-9][a-z0-9+#]*(?:[./-][a-z0-9+#]+)*")
+
+
+def tokenize_for_skills(text, vocabulary=frozenset()):
+    """Lowercases and splits text into skill-matching tokens in a single regex pass.
+
+    Tokens joined by '/' or '-' ("python/django", "machine-learning") are split
+    into their parts, first on '/' then on '-', unless the whole token is in
+    vocabulary (skill names such as "ci/cd" or "scikit-learn").
+    """
+    if not isinstance(text, str) or not text:
+        return []
+    tokens = []
+    for token in SKILL_TOKEN_PATTERN.findall(text.lower()):
+        if token in vocabulary or ('/' not in token and '-' not in token):
+            tokens.append(token)
+            continue
+        for part in token.split('/'):
+            if part in vocabulary or '-' not in part:
+                tokens.append(part)
+            else:
+                tokens.extend(part.split('-'))
+    return tokens
+
+
+class SkillMatcher:
+    """Aho-Corasick automaton over token sequences compiled from a skill taxonomy.
+
+    Each document is scanned once, left to right, and every taxonomy phrase
+    (canonical name or alias) occurring in it is reported as its canonical skill.
+    """
+
+    def __init__(self, taxonomy=None):
+        taxonomy = SKILL_TAXONOMY if taxonomy is None else taxonomy
+        self._goto = [{}]   # state -> {token: next_state}
+        self._fail = [0]
+        self._output = [set()]
+        self.aliases = {}   # phrase -> canonical skill
+        # Compound tokens that are (part of) a skill name and must not be split
+        self.vocabulary = frozenset(token for canonical, aliases in taxonomy.items() for phrase in [canonical, *aliases]
+                                    for token in SKILL_TOKEN_PATTERN.findall(phrase) if '/' in token or '-' in token)
+        for canonical, aliases in taxonomy.items():
+            for phrase in [canonical, *aliases]:
+                tokens = tuple(tokenize_for_skills(phrase, self.vocabulary))
+                if tokens:
+                    self.aliases[' '.join(tokens)] = canonical
+                    if phrase not in AMBIGUOUS_PHRASES:
+                        self._add_pattern(tokens, canonical)
+        self._build_failure_links()
+
+    def _add_pattern(self, tokens, canonical):
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+                self._goto[state][token] = next_state
+            state = next_state
+        self._output[state].add(canonical)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def match_tokens(self, tokens):
+        """Returns the set of canonical skills found in a token sequence."""
+        found = set()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+    def match(self, text):
+        """Returns the set of canonical skills mentioned in free text."""
+        return self.match_tokens(tokenize_for_skills(text, self.vocabulary))
+
+    def canonicalize(self, skill):
+        """Maps a single skill label (e.g. 'K8s') to its canonical name, or None if unknown."""
+        return self.aliases.get(' '.join(tokenize_for_skills(skill, self.vocabulary)))
+
+
+default_skill_matcher = SkillMatcher()
+
+
+@lru_cache(maxsize=1024)
+def extract_job_skills(job_req_text):
+    """Canonical skills required by a job; cached since every candidate is scored against the same text."""
+    return frozenset(default_skill_matcher.match(job_req_text))
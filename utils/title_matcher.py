@@ -0,0 +1,77 @@
+import numpy as np
+from rapidfuzz import fuzz, process
+from rapidfuzz.utils import default_process
+
+# --- Constants --- #
+TITLE_CACHE_MAX_SIZE = 200_000
+
+# (normalized title, normalized role) -> token-set ratio (0-100)
+_title_score_cache = {}
+_title_cache_stats = {'hits': 0, 'misses': 0}
+
+
+def normalize_title(title):
+    """Normalizes a title the way thefuzz does before scoring (ASCII only, lowercase, alphanumerics only)."""
+    if not isinstance(title, str):
+        return ''
+    title = title.encode('ascii', errors='ignore').decode('ascii')
+    return ' '.join(default_process(title).split())
+
+
+def _cache_title_score(key, score):
+    if len(_title_score_cache) >= TITLE_CACHE_MAX_SIZE:
+        _title_score_cache.clear()
+    _title_score_cache[key] = score
+
+
+def title_similarity(candidate_title, job_role):
+    """Title match score on a 0-1 scale, identical to thefuzz's token_set_ratio(...) / 100, memoized per pair."""
+    key = (normalize_title(candidate_title), normalize_title(job_role))
+    score = _title_score_cache.get(key)
+    if score is None:
+        _title_cache_stats['misses'] += 1
+        score = int(round(fuzz.token_set_ratio(*key))) if all(key) else 0
+        _cache_title_score(key, score)
+    else:
+        _title_cache_stats['hits'] += 1
+    return score / 100.0
+
+
+def title_cache_info():
+    """Hit/miss counts and current size of the title score cache."""
+    return dict(_title_cache_stats, size=len(_title_score_cache))
+
+
+def title_similarity_matrix(candidate_titles, job_roles, score_cutoff=0, workers=1):
+    """Computes a full candidate-title x job-role similarity matrix (0-1 scale) in bulk.
+
+    Titles and roles are normalized and deduplicated first, so the vectorized
+    rapidfuzz cdist only runs over unique strings; the result is expanded back
+    to the input order. Pairs scoring below score_cutoff (0-100) are blocked
+    to 0. Without a cutoff the unique pair scores also warm the cache used by
+    title_similarity, so later per-candidate calls are dictionary lookups.
+    """
+    norm_titles = [normalize_title(t) for t in candidate_titles]
+    norm_roles = [normalize_title(r) for r in job_roles]
+    if not norm_titles or not norm_roles:
+        return np.zeros((len(norm_titles), len(norm_roles)), dtype=np.float32)
+
+    unique_titles, title_index = np.unique(np.array(norm_titles, dtype=object), return_inverse=True)
+    unique_roles, role_index = np.unique(np.array(norm_roles, dtype=object), return_inverse=True)
+
+    unique_scores = process.cdist(
+        unique_titles.tolist(), unique_roles.tolist(),
+        scorer=fuzz.token_set_ratio, processor=None,
+        score_cutoff=score_cutoff, dtype=np.float32, workers=workers
+    )
+    unique_scores = np.rint(unique_scores)
+    # Empty titles/roles score 0, matching the pairwise path
+    unique_scores[unique_titles == '', :] = 0
+    unique_scores[:, unique_roles == ''] = 0
+
+    if not score_cutoff:
+        for i, norm_title in enumerate(unique_titles):
+            for j, norm_role in enumerate(unique_roles):
+                _cache_title_score((norm_title, norm_role), int(unique_scores[i, j]))
+
+    return unique_scores[np.ix_(title_index.ravel(), role_index.ravel())] / 100.0